@@ -0,0 +1,6 @@
+# ./benchmarks/__init__.py
+
+"""Benchmarks of the SDK hot paths against the local fake orchestrator and chain.
+
+Run with `python -m benchmarks`, see benchmarks/README.md.
+"""
@@ -0,0 +1,46 @@
+# ./benchmarks/__main__.py
+
+import argparse
+import os
+import sys
+
+from benchmarks import bench_sdk  # noqa: F401, registers the benchmarks
+from benchmarks.environment import FakeEnvironment
+from benchmarks.harness import DEFAULT_THRESHOLD, compare, format_seconds, load_baseline, run, save_baseline
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the SDK against a local fake orchestrator and chain.")
+    parser.add_argument("-k", dest="name_filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file to compare with or save to")
+    parser.add_argument("--save", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown of the best round, 0.5 is 50%%")
+    parser.add_argument("--latency", type=float, default=0, help="seconds added to every fake orchestrator request")
+    args = parser.parse_args(argv)
+
+    with FakeEnvironment(latency=args.latency) as env:
+        results = run(env, args.name_filter)
+
+    baseline = load_baseline(args.baseline) if os.path.exists(args.baseline) and not args.save else {}
+    rows, regressions = compare(results, baseline, args.threshold)
+    changes = {name: change for name, _, _, change in rows}
+    for name, stats in results.items():
+        change = f"{changes[name]:+.0%}" if name in changes else "new"
+        print(f"{name:42} {format_seconds(stats['median']):>10} {stats['ops_per_second']:>12.1f}/s  {change}")
+
+    if args.save:
+        if args.name_filter and os.path.exists(args.baseline):
+            results = dict(load_baseline(args.baseline), **results)
+        save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    for name, base, median, change in regressions:
+        print(f"REGRESSION {name}: {format_seconds(base)} -> {format_seconds(median)} ({change:+.0%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# ./benchmarks/bench_sdk.py
+
+import subprocess
+import sys
+
+from swan.api_client import APIClient
+from swan.common import codec
+from swan.common.concurrency import run_bounded
+from swan.common.constant import CLIENT_CONTRACT_ABI, GET, GET_CP_CONFIG
+from swan.common.utils import get_contract_abi
+
+from benchmarks.harness import benchmark
+
+
+CREATE_BATCH = 32
+FANOUT_TASKS = 100
+# calls per round of the benchmarks below the timer's useful resolution
+MICRO_OPS = 1000
+
+
+class _Response:
+    status_code = 200
+
+    def json(self):
+        return {"status": "success", "data": {}}
+
+
+class _Transport:
+    """requests.Session stand-in answering instantly, isolates the SDK's own cost."""
+
+    def get(self, url, headers=None):
+        return _Response()
+
+
+@benchmark("api_client.request_overhead", rounds=50, warmup=2, ops=MICRO_OPS)
+def request_overhead(env):
+    client = APIClient(_Transport())
+    path = "/v2/task_deployment/0f3b1a52-3c1e-4a6b-9d6a-2b1f0c9e8d7a"
+
+    def requests():
+        for _ in range(MICRO_OPS):
+            client._request_without_params(GET, path, "https://orchestrator", "token")
+    return requests
+
+
+@benchmark("api_client.request_local", rounds=200, warmup=10)
+def request_local(env):
+    orchestrator = env.orchestrator
+    return lambda: orchestrator._request_without_params(GET, GET_CP_CONFIG, orchestrator.swan_url, orchestrator.token)
+
+
+@benchmark("catalog.refresh", rounds=100, warmup=5)
+def catalog_refresh(env):
+    return lambda: env.orchestrator.get_hardware_config(refresh=True)
+
+
+@benchmark("catalog.lookup", rounds=50, warmup=2, ops=MICRO_OPS)
+def catalog_lookup(env):
+    orchestrator = env.orchestrator
+    orchestrator.get_hardware_config(refresh=True)
+
+    def lookups():
+        for _ in range(MICRO_OPS):
+            orchestrator.get_cfg_name(12)
+    return lookups
+
+
+def _create_throughput(workers):
+    def setup(env):
+        def create_batch():
+            results = run_bounded(lambda _: env.create_task(), range(CREATE_BATCH), max_workers=workers)
+            assert all(error is None for _, _, error in results)
+        return create_batch
+    return setup
+
+
+for _workers in (1, 4, 16):
+    benchmark(f"create_task.throughput[workers={_workers}]", rounds=10, warmup=1, ops=CREATE_BATCH)(_create_throughput(_workers))
+
+
+@benchmark(f"status.fanout[tasks={FANOUT_TASKS}]", rounds=10, warmup=1)
+def status_fanout(env):
+    task_uuids = [env.create_task() for _ in range(FANOUT_TASKS)]
+    return lambda: run_bounded(env.orchestrator.get_deployment_info, task_uuids, max_workers=16)
+
+
+@benchmark("payment.pipeline", rounds=30, warmup=2)
+def payment_pipeline(env):
+    def pay():
+        task_uuid = env.create_task()
+        tx_hash = env.orchestrator.submit_payment(task_uuid, env.private_key, duration=3600, hardware_id=1)
+        assert env.orchestrator.validate_payment(tx_hash, task_uuid)["status"] == "success"
+    return pay
+
+
+@benchmark("codec.decode_payments[2000]", rounds=50, warmup=2)
+def decode_payments(env):
+    payment = {
+        "task_uuid": "0f3b1a52-3c1e-4a6b-9d6a-2b1f0c9e8d7a", "tx_hash": "0x" + "ab" * 32, "amount": "1000000000000000",
+        "duration": 3600, "created_at": 1700000000, "status": "paid", "hardware_id": 12,
+    }
+    raw = codec.dumps({"status": "success", "data": {"payments": [payment] * 2000}}).encode()
+    return lambda: codec.loads(raw)
+
+
+@benchmark("codec.decode_wei_payments[2000]", rounds=50, warmup=2)
+def decode_wei_payments(env):
+    payment = {
+        "task_uuid": "0f3b1a52-3c1e-4a6b-9d6a-2b1f0c9e8d7a", "tx_hash": "0x" + "ab" * 32, "amount": 25 * 10 ** 18,
+        "duration": 3600, "created_at": 1700000000, "status": "paid", "hardware_id": 12,
+    }
+    raw = codec.dumps({"status": "success", "data": {"payments": [payment] * 2000}}).encode()
+    return lambda: codec.loads(raw)
+
+
+@benchmark("abi.load", rounds=200, warmup=5)
+def abi_load(env):
+    return lambda: get_contract_abi.__wrapped__(CLIENT_CONTRACT_ABI)
+
+
+@benchmark("contract.build", rounds=200, warmup=5)
+def contract_build(env):
+    from swan.contract.swan_contract import SwanContract
+    w3 = env.chain.web3()
+    return lambda: SwanContract(env.private_key, env.chain.contract_info, w3=w3)
+
+
+def _import_seconds(statement):
+    code = f"import time\nstarted = time.perf_counter()\n{statement}\nprint(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    return float(output.stdout.splitlines()[-1])
+
+
+@benchmark("import.swan", rounds=5, warmup=1, self_timed=True)
+def import_swan(env):
+    return lambda: _import_seconds("import swan")
+
+
+@benchmark("import.orchestrator", rounds=5, warmup=1, self_timed=True)
+def import_orchestrator(env):
+    return lambda: _import_seconds("from swan import Orchestrator")
@@ -0,0 +1,45 @@
+# ./benchmarks/environment.py
+
+from swan.api.orchestrator import Orchestrator
+from swan.testing import FakeChain, FakeOrchestrator
+
+
+class FakeEnvironment:
+    """Fake orchestrator and chain shared by the benchmarks, with a funded wallet."""
+
+    def __init__(self, latency: float = 0):
+        self.chain = FakeChain()
+        self.server = FakeOrchestrator(chain=self.chain, latency=latency)
+        self.orchestrator = None
+        self.account = None
+
+    def start(self):
+        self.server.start()
+        self.orchestrator = self.new_orchestrator()
+        self.account = self.chain.new_account(10**12 * 10**18)
+        return self
+
+    def stop(self):
+        self.server.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def private_key(self):
+        return self.account.key.hex()
+
+    def new_orchestrator(self):
+        return self.chain.attach(Orchestrator(api_key="key", url_endpoint=self.server.url, verification=False))
+
+    def create_task(self, hardware_id: int = 1):
+        """Create an unpaid task, returns its uuid."""
+        return self.orchestrator.create_task(
+            wallet_address=self.account.address,
+            hardware_id=hardware_id,
+            region="North Carolina-US",
+            app_repo_image="hello_world",
+        )["task_uuid"]
@@ -0,0 +1,119 @@
+# ./benchmarks/harness.py
+
+import gc
+import json
+import statistics
+import time
+
+
+# a benchmark whose best round is slower than the baseline's by more than this share is a regression,
+# the best round is the least disturbed by other load on the machine
+DEFAULT_THRESHOLD = 0.5
+
+BENCHMARKS = []
+
+
+class Benchmark:
+    """A registered benchmark.
+
+    `setup(env)` runs once and returns the callable to time, one call of it
+    does `ops` operations, results are reported per operation. A self timed
+    callable returns its own duration in seconds, e.g. of work done in a
+    subprocess.
+    """
+
+    def __init__(self, name: str, setup, rounds: int, warmup: int, ops: int, self_timed: bool):
+        self.name = name
+        self.setup = setup
+        self.rounds = rounds
+        self.warmup = warmup
+        self.ops = ops
+        self.self_timed = self_timed
+
+
+def benchmark(name: str = None, rounds: int = 20, warmup: int = 2, ops: int = 1, self_timed: bool = False):
+    """Register the decorated setup function as a benchmark."""
+    def decorator(setup):
+        BENCHMARKS.append(Benchmark(name or setup.__name__, setup, rounds, warmup, ops, self_timed))
+        return setup
+    return decorator
+
+
+def measure(func, rounds: int = 20, warmup: int = 2, ops: int = 1, self_timed: bool = False):
+    """Time `rounds` calls of func, returns stats in seconds per operation."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            seconds = func()
+            if not self_timed:
+                seconds = time.perf_counter() - started
+            timings.append(seconds / ops)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    median = statistics.median(timings)
+    return {
+        "min": min(timings),
+        "median": median,
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "rounds": rounds,
+        "ops_per_second": 1 / median if median else float("inf"),
+    }
+
+
+def run(env, name_filter: str = ""):
+    """Run the registered benchmarks whose name contains name_filter, returns name -> stats."""
+    results = {}
+    for bench in BENCHMARKS:
+        if name_filter not in bench.name:
+            continue
+        func = bench.setup(env)
+        results[bench.name] = measure(func, bench.rounds, bench.warmup, bench.ops, bench.self_timed)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD):
+    """Compare the best rounds with a baseline.
+
+    Returns:
+        list of (name, baseline min, min, change) of every benchmark
+        in both, change is the relative slowdown, and the list of regressions
+        whose change is above threshold.
+    """
+    rows = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]["min"]
+        change = stats["min"] / base - 1 if base else 0.0
+        rows.append((name, base, stats["min"], change))
+    return rows, [row for row in rows if row[3] > threshold]
+
+
+def load_baseline(path: str):
+    with open(path) as file:
+        return json.load(file)["benchmarks"]
+
+
+def save_baseline(path: str, results: dict):
+    import platform
+    data = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform()},
+        "benchmarks": results,
+    }
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def format_seconds(seconds: float):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
@@ -11,7 +11,7 @@ with open("README.md", "r") as fh:
 setup(
         name="swan-sdk",
         version="0.0.5",
-        packages=['swan', 'swan.api', 'swan.common', 'swan.contract', 'swan.object', 'swan.contract.abi'],
+        packages=['swan', 'swan.api', 'swan.common', 'swan.contract', 'swan.object', 'swan.contract.abi', 'swan.testing'],
         # package_data={'swan.contract.abi': ['swan/contract/abi/PaymentContract.json', 'swan/contract/abi/SwanToken.json']},
         include_package_data=True,
         description="A python developer tool kit for Swan Orchestrator services.",
@@ -31,6 +31,6 @@ setup(
             "web3>=6.15.1"
             ],
         entry_points={
-            # placeholder
+            "console_scripts": ["swan=swan.cli:main"],
         },
         )
\ No newline at end of file
@@ -1,21 +1,57 @@
 # ./swan/__init__.py
 
-from swan.api.orchestrator import Orchestrator
-from swan.api_client import APIClient
-from swan.contract.swan_contract import SwanContract
-from swan.session import Session
+import importlib
+import threading
+
+# public names are imported on first use, so `import swan` does not load
+# requests or the web3 stack
+_LAZY_ATTRIBUTES = {
+    "Orchestrator": "swan.api.orchestrator",
+    "APIClient": "swan.api_client",
+    "SwanContract": "swan.contract.swan_contract",
+    "Session": "swan.session",
+    "SessionPool": "swan.session",
+}
 
 DEFAULT_SESSION = None
+_DEFAULT_SESSION_POOL = None
+_DEFAULT_SESSION_LOCK = threading.RLock()
+
+def __getattr__(name):
+    if name == "DEFAULT_SESSION_POOL":
+        return _get_default_session_pool()
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | {"DEFAULT_SESSION_POOL"})
+
+def _get_default_session_pool():
+    global _DEFAULT_SESSION_POOL
+    if _DEFAULT_SESSION_POOL is None:
+        with _DEFAULT_SESSION_LOCK:
+            if _DEFAULT_SESSION_POOL is None:
+                from swan.session import SessionPool
+                _DEFAULT_SESSION_POOL = SessionPool()
+    return _DEFAULT_SESSION_POOL
 
 def setup_default_session(api_key=None, network='testnet', login_url=None, **kwargs):
     """
     Set up a default session, passing through any parameters to the session constructor.
     """
     global DEFAULT_SESSION
+    from swan.session import Session
+    pool = _get_default_session_pool()
+    kwargs.setdefault('http_session', pool.http_session)
     session = Session(api_key=api_key, network=network, login_url=login_url, **kwargs)
     if session.login and session.token == None:
         return 
-    DEFAULT_SESSION = session
+    with _DEFAULT_SESSION_LOCK:
+        DEFAULT_SESSION = session
+    pool.put(session)
 
 def _get_default_session(api_key=None, network='testnet', login_url=None):
     """
@@ -24,10 +60,20 @@ def _get_default_session(api_key=None, network='testnet', login_url=None):
     :return: The default session
     """
     global DEFAULT_SESSION
-    if DEFAULT_SESSION is None or (api_key is not None and DEFAULT_SESSION.api_key != api_key):
-        setup_default_session(api_key=api_key, network=network, login_url=login_url)
+    from swan.session import SessionPool
+    session = DEFAULT_SESSION
+    if session is not None:
+        if api_key is None:
+            return session
+        if SessionPool.key(session.api_key, session.network, session.login_url) == SessionPool.key(api_key, network, login_url):
+            return session
 
-    return DEFAULT_SESSION
+    # sessions of other tenants are kept in the pool, switching back does not log in again
+    session = _get_default_session_pool().get(api_key=api_key, network=network, login_url=login_url)
+    if session is not None:
+        with _DEFAULT_SESSION_LOCK:
+            DEFAULT_SESSION = session
+    return session
 
 def resource(api_key=None, login_url=None, *args, **kwargs):
     """
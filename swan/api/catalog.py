@@ -0,0 +1,123 @@
+# ./swan/api/catalog.py
+
+import threading
+import time
+
+from swan.common.constant import HARDWARE_CACHE_TTL
+from swan.object import HardwareConfig
+
+
+class HardwareSnapshot(tuple):
+    """Immutable hardware list with lookups by id and name.
+
+    A snapshot is never changed after it is built, a refresh swaps in a new one,
+    so it can be read from many threads without locking.
+    """
+
+    def __new__(cls, hardware=()):
+        snapshot = super().__new__(cls, hardware)
+        snapshot.by_id = {h.id: h for h in snapshot}
+        by_name = {}
+        for h in snapshot:
+            by_name.setdefault(h.name, []).append(h)
+        snapshot.by_name = {name: tuple(items) for name, items in by_name.items()}
+        by_type = {}
+        for h in snapshot:
+            by_type.setdefault((h.type or "").upper(), []).append(h)
+        snapshot.by_type = {hardware_type: tuple(items) for hardware_type, items in by_type.items()}
+        return snapshot
+
+    def get(self, hardware_id):
+        return self.by_id.get(hardware_id)
+
+    def named(self, hardware_name: str):
+        return self.by_name.get(hardware_name, ())
+
+    def of_type(self, hardware_type: str):
+        return self.by_type.get(hardware_type.upper(), ())
+
+
+class HardwareCatalog:
+    """Cached hardware list shared by every resource of a session.
+
+    The catalog does not talk to the orchestrator itself, callers pass the
+    fetch function so that each resource keeps using its own token and url.
+    """
+
+    def __init__(self, ttl: float = HARDWARE_CACHE_TTL):
+        """Initialize an empty catalog.
+
+        Args:
+            ttl: seconds a fetched hardware list stays fresh.
+        """
+        self.ttl = ttl
+        # (HardwareSnapshot, monotonic fetch time), replaced as a whole
+        self._state = (None, 0.0)
+        self._watcher = None
+        self._lock = threading.Lock()
+
+    @property
+    def hardware(self):
+        return self._state[0]
+
+    @property
+    def fetched_at(self):
+        return self._state[1]
+
+    def _fresh(self, state, max_age: float = None):
+        snapshot, fetched_at = state
+        if snapshot is None:
+            return False
+        max_age = self.ttl if max_age is None else max_age
+        return time.monotonic() - fetched_at < max_age
+
+    def is_fresh(self, max_age: float = None):
+        return self._fresh(self._state, max_age)
+
+    def get(self, fetch, max_age: float = None, force: bool = False):
+        """Get the hardware list, refreshing it with `fetch` when stale.
+
+        Args:
+            fetch: callable returning the raw `/cp/machines` response.
+            max_age: Optional. Override the catalog ttl for this lookup.
+            force: Optional. Always refresh.
+
+        Returns:
+            HardwareSnapshot of HardwareConfig object.
+        """
+        state = self._state
+        if not force and self._fresh(state, max_age):
+            return state[0]
+        with self._lock:
+            # another caller may have refreshed while we waited
+            state = self._state
+            if not force and self._fresh(state, max_age):
+                return state[0]
+            response = fetch()
+            return self.set([HardwareConfig(hardware) for hardware in response["data"]["hardware"]])
+
+    def set(self, hardware):
+        """Replace the cached hardware list.
+
+        Returns:
+            the new HardwareSnapshot.
+        """
+        snapshot = hardware if isinstance(hardware, HardwareSnapshot) else HardwareSnapshot(hardware)
+        self._state = (snapshot, time.monotonic())
+        return snapshot
+
+    def invalidate(self):
+        self._state = (self._state[0], 0.0)
+
+    def watcher(self, fetch, **options):
+        """The HardwareWatcher of this catalog, created on first use and shared by all callers.
+
+        Args:
+            fetch: callable returning the raw `/cp/machines` response.
+            options: HardwareWatcher options, only used when the watcher is created.
+        """
+        with self._lock:
+            if self._watcher is None:
+                from swan.api.watcher import HardwareWatcher
+                self._watcher = HardwareWatcher(self, fetch, **options)
+            return self._watcher
@@ -0,0 +1,320 @@
+# ./swan/api/fleet.py
+
+import hashlib
+import json
+import logging
+import time
+
+from swan.common import deadlines
+from swan.common.concurrency import run_bounded
+from swan.common.constant import *
+from swan.common.exception import SwanAPIException
+
+
+# fields that decide which task a deployment runs, a change replaces its tasks
+SPEC_FIELDS = (
+    "hardware_id", "region", "app_repo_image", "job_source_uri",
+    "repo_uri", "repo_branch", "repo_owner", "repo_name", "preferred_cp_list",
+)
+
+
+class DeploymentSpec:
+    """Desired state of one named deployment of a fleet manifest."""
+
+    def __init__(self, spec: dict, defaults: dict = None):
+        spec = dict(defaults or {}, **spec)
+        if not spec.get("name"):
+            raise SwanAPIException(f"Deployment without name in manifest")
+        if not (spec.get("app_repo_image") or spec.get("job_source_uri") or spec.get("repo_uri")):
+            raise SwanAPIException(f"Deployment {spec['name']} needs app_repo_image, job_source_uri or repo_uri")
+        self.name = spec["name"]
+        self.replicas = int(spec.get("replicas", 1))
+        self.duration = int(spec.get("duration", 3600))
+        self.wallet_address = spec.get("wallet_address")
+        self.hardware_id = spec.get("hardware_id", 0)
+        self.region = spec.get("region", "global")
+        self.task_args = {field: spec[field] for field in SPEC_FIELDS if spec.get(field) is not None}
+        self.task_args["hardware_id"] = self.hardware_id
+        self.task_args["region"] = self.region
+        self.spec_hash = hashlib.sha256(json.dumps(self.task_args, sort_keys=True).encode()).hexdigest()[:16]
+
+    def to_dict(self):
+        return dict(self.task_args, name=self.name, replicas=self.replicas, duration=self.duration)
+
+
+class FleetManifest:
+    """Declarative description of a fleet.
+
+    e.g. manifest JSON ->
+    {
+        "wallet_address": "0x...",
+        "deployments": [
+            {"name": "web", "app_repo_image": "hello_world", "hardware_id": 0, "region": "global", "replicas": 2, "duration": 3600}
+        ]
+    }
+    Top level fields other than 'deployments' are defaults of every deployment.
+    """
+
+    def __init__(self, manifest: dict):
+        defaults = {key: value for key, value in manifest.items() if key != "deployments"}
+        self.deployments = [DeploymentSpec(spec, defaults) for spec in manifest.get("deployments", [])]
+        names = [deployment.name for deployment in self.deployments]
+        if len(names) != len(set(names)):
+            raise SwanAPIException(f"Duplicate deployment names in manifest")
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "r") as manifest_file:
+            return cls(json.load(manifest_file))
+
+
+class FleetAction:
+    """One mutating step of a plan: create, renew or terminate."""
+
+    def __init__(self, op: str, deployment: str, task_uuid: str = None, spec: DeploymentSpec = None, reason: str = ""):
+        self.op = op
+        self.deployment = deployment
+        self.task_uuid = task_uuid
+        self.spec = spec
+        self.reason = reason
+
+    def __str__(self):
+        symbol = {"create": "+", "renew": "~", "terminate": "-"}[self.op]
+        target = self.task_uuid or f"{self.spec.task_args.get('hardware_id')}@{self.spec.region}"
+        reason = f" ({self.reason})" if self.reason else ""
+        return f"{symbol} {self.op} {self.deployment} {target}{reason}"
+
+
+class FleetPlan:
+    """Actions needed to move the live fleet to the manifest."""
+
+    def __init__(self, actions):
+        self.actions = list(actions)
+
+    def of(self, op: str):
+        return [action for action in self.actions if action.op == op]
+
+    @property
+    def is_empty(self):
+        return not self.actions
+
+    def __str__(self):
+        if self.is_empty:
+            return "No changes. Fleet matches the manifest."
+        lines = [str(action) for action in self.actions]
+        lines.append(
+            f"Plan: {len(self.of('create'))} to create, {len(self.of('renew'))} to renew, "
+            f"{len(self.of('terminate'))} to terminate."
+        )
+        return "\n".join(lines)
+
+
+class FleetReconciler:
+    """Plan and apply the changes between a FleetManifest and the live fleet.
+
+    Tasks of the fleet are tracked in a TaskInventory, tagged with their
+    deployment name and spec hash. Planning only reads: it syncs stale tasks
+    from the orchestrator and diffs them against the manifest. Tasks without
+    a recorded payment are not counted as replicas, they are terminated and
+    replaced. Applying runs the terminates alongside the creates, then sends
+    the payments and renewals of the wallet as one batch.
+    """
+
+    def __init__(
+            self,
+            orchestrator,
+            inventory,
+            private_key: str = None,
+            renew_before: float = 600,
+            prune: bool = True,
+            max_workers: int = BULK_MAX_WORKERS,
+        ):
+        """Initialize the reconciler.
+
+        Args:
+            orchestrator: Orchestrator used for all calls.
+            inventory: TaskInventory tracking the tasks of the fleet.
+            private_key: Optional. Wallet private key paying for creates and renews, both are skipped without it.
+            renew_before: Optional. Renew tasks expiring within this many seconds (Default = 600).
+            prune: Optional. Terminate tasks of deployments missing from the manifest (Default = True).
+            max_workers: Optional. Maximum number of requests in flight.
+        """
+        self.orchestrator = orchestrator
+        self.inventory = inventory
+        self.private_key = private_key
+        self.renew_before = renew_before
+        self.prune = prune
+        self.max_workers = max_workers
+
+    def plan(self, manifest, now: float = None):
+        """Diff the manifest against the live fleet.
+
+        Args:
+            manifest: FleetManifest, manifest dict or path of a manifest JSON file.
+            now: Optional. Unix time used for renewal decisions.
+
+        Returns:
+            FleetPlan object.
+        """
+        if isinstance(manifest, str):
+            manifest = FleetManifest.load(manifest)
+        elif isinstance(manifest, dict):
+            manifest = FleetManifest(manifest)
+        now = time.time() if now is None else now
+        self.inventory.sync(self.orchestrator, max_workers=self.max_workers)
+
+        actions = []
+        for spec in manifest.deployments:
+            live = []
+            for task in self.inventory.query(deployment=spec.name, include_final=False):
+                if self.inventory.payments(task["task_uuid"]):
+                    live.append(task)
+                else:
+                    # created but never paid, it would never run
+                    actions.append(FleetAction("terminate", spec.name, task["task_uuid"], spec, "unpaid"))
+            current = [task for task in live if task["spec_hash"] == spec.spec_hash]
+            for task in live:
+                if task["spec_hash"] != spec.spec_hash:
+                    actions.append(FleetAction("terminate", spec.name, task["task_uuid"], spec, "spec changed"))
+            # keep the tasks that live longest
+            current.sort(key=lambda task: task["expires_at"] or 0, reverse=True)
+            for task in current[spec.replicas:]:
+                actions.append(FleetAction("terminate", spec.name, task["task_uuid"], spec, "scale down"))
+            for _ in range(spec.replicas - len(current)):
+                actions.append(FleetAction("create", spec.name, spec=spec))
+            for task in current[:spec.replicas]:
+                if task["expires_at"] is not None and task["expires_at"] - now < self.renew_before:
+                    actions.append(FleetAction("renew", spec.name, task["task_uuid"], spec, "expiring"))
+
+        if self.prune:
+            wanted = {spec.name for spec in manifest.deployments}
+            for deployment in self.inventory.deployments():
+                if deployment not in wanted:
+                    for task in self.inventory.query(deployment=deployment, include_final=False):
+                        actions.append(FleetAction("terminate", deployment, task["task_uuid"], reason="not in manifest"))
+        return FleetPlan(actions)
+
+    def apply(self, plan):
+        """Run the actions of a plan.
+
+        Args:
+            plan: FleetPlan from `plan`.
+
+        Returns:
+            dict of 'created', 'renewed', 'terminated' and 'failed' lists.
+        """
+        report = {"created": [], "renewed": [], "terminated": [], "failed": []}
+        if plan.is_empty:
+            return report
+
+        creates = plan.of("create")
+        renews = plan.of("renew")
+        if (creates or renews) and not self.private_key:
+            # an unpaid task never runs, creating it would only leave it to be terminated
+            logging.warning("No private_key given, creates and renewals skipped")
+            report["failed"].extend(("create", action.deployment, "no private_key") for action in creates)
+            report["failed"].extend(("renew", action.task_uuid, "no private_key") for action in renews)
+            creates, renews = [], []
+
+        # terminates and creates touch different tasks, neither waits for the other
+        (_, _, terminate_error), (_, created, create_error) = run_bounded(
+            lambda phase: phase(),
+            [lambda: self._terminate(plan.of("terminate"), report), lambda: self._create(creates, report)],
+            max_workers=2,
+            retries=0
+        )
+        if terminate_error is not None:
+            report["failed"].extend(("terminate", action.task_uuid, str(terminate_error)) for action in plan.of("terminate"))
+        if create_error is not None:
+            report["failed"].extend(("create", action.deployment, str(create_error)) for action in creates)
+        payments = [(task_uuid, action.spec.hardware_id, action.spec.duration) for action, task_uuid in created or []]
+        renewals = [(action.task_uuid, action.spec.hardware_id, action.spec.duration) for action in renews]
+
+        if payments:
+            tx_hashes = self._pay("submit_payments", payments)
+            if not all(isinstance(tx_hash, Exception) for tx_hash in tx_hashes):
+                # give the orchestrator time to see the payments before validating
+                deadlines.sleep(VALIDATE_PAYMENT_DELAY, what="payment validation")
+            self._confirm(
+                payments, tx_hashes,
+                lambda task_uuid, tx_hash, duration: self.orchestrator.validate_payment(tx_hash=tx_hash, task_uuid=task_uuid),
+                "created", report
+            )
+        if renewals:
+            self._confirm(
+                renewals, self._pay("renew_payments", renewals),
+                lambda task_uuid, tx_hash, duration: self.orchestrator.renew_task(task_uuid=task_uuid, duration=duration, tx_hash=tx_hash),
+                "renewed", report
+            )
+        return report
+
+    def _pay(self, method: str, payments):
+        """Send a payment batch, a batch that raises fails each of its payments."""
+        try:
+            contract = self.orchestrator.contract_factory.get(self.private_key)
+            return getattr(contract, method)(payments)
+        except Exception as e:
+            logging.error(f"{method} of {len(payments)} tasks failed: {e}")
+            return [e] * len(payments)
+
+    def _terminate(self, actions, report):
+        terminates = [action.task_uuid for action in actions]
+        if not terminates:
+            return
+        for task_uuid, result in self.orchestrator.terminate_tasks(terminates, max_workers=self.max_workers).items():
+            if result and result.get("status") != "failed":
+                self.inventory.record_task(task_uuid, {"status": "terminated"})
+                report["terminated"].append(task_uuid)
+            else:
+                report["failed"].append(("terminate", task_uuid, result))
+
+    def _create(self, actions, report):
+        def create(action):
+            result = self.orchestrator.create_task(
+                wallet_address=action.spec.wallet_address,
+                duration=action.spec.duration,
+                auto_pay=False,
+                **action.spec.task_args
+            )
+            if not result or not result.get("task_uuid"):
+                raise SwanAPIException(f"Task creation failed for {action.deployment}")
+            task_uuid = result["task_uuid"]
+            self.inventory.record_task(
+                task_uuid,
+                result["data"]["task"],
+                hardware_id=action.spec.hardware_id,
+                wallet=action.spec.wallet_address,
+                deployment=action.deployment,
+                spec_hash=action.spec.spec_hash
+            )
+            return task_uuid
+
+        created = []
+        # no retries, a retried create could start a second task
+        for action, task_uuid, error in run_bounded(create, actions, max_workers=self.max_workers, retries=0):
+            if error is not None:
+                report["failed"].append(("create", action.deployment, str(error)))
+            else:
+                created.append((action, task_uuid))
+        return created
+
+    def _confirm(self, payments, tx_hashes, confirm, done_key, report):
+        """Report the paid transactions to the orchestrator concurrently."""
+        paid = []
+        for (task_uuid, _, duration), tx_hash in zip(payments, tx_hashes):
+            if isinstance(tx_hash, Exception):
+                report["failed"].append((done_key, task_uuid, str(tx_hash)))
+            else:
+                self.inventory.record_payment(task_uuid, tx_hash, kind="payment" if done_key == "created" else "renewal")
+                paid.append((task_uuid, tx_hash, duration))
+
+        for (task_uuid, _, duration), result, error in run_bounded(
+            lambda item: confirm(*item), paid, max_workers=self.max_workers, retries=0
+        ):
+            if error is not None or not result or result.get("status") == "failed":
+                report["failed"].append((done_key, task_uuid, str(error) if error else result))
+            else:
+                if done_key == "renewed":
+                    # a plan before the next sync must not see the task as expiring again
+                    self.inventory.record_renewal(task_uuid, duration)
+                report[done_key].append(task_uuid)
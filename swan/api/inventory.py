@@ -0,0 +1,315 @@
+# ./swan/api/inventory.py
+
+import json
+import sqlite3
+import threading
+import time
+
+from swan.common import codec
+from swan.common.concurrency import run_bounded
+from swan.common.constant import BULK_MAX_WORKERS, FINAL_TASK_STATUSES, INVENTORY_SYNC_MAX_AGE
+from swan.common.exception import SwanAPIException
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_uuid TEXT PRIMARY KEY,
+    status TEXT,
+    region TEXT,
+    hardware TEXT,
+    hardware_id INTEGER,
+    wallet TEXT,
+    created_at REAL,
+    expires_at REAL,
+    synced_at REAL,
+    final INTEGER NOT NULL DEFAULT 0,
+    job_uris TEXT,
+    deployment_info TEXT,
+    deployment TEXT,
+    spec_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_tasks_status ON tasks (status);
+CREATE INDEX IF NOT EXISTS ix_tasks_region ON tasks (region);
+CREATE INDEX IF NOT EXISTS ix_tasks_hardware ON tasks (hardware);
+CREATE INDEX IF NOT EXISTS ix_tasks_expires_at ON tasks (expires_at);
+CREATE INDEX IF NOT EXISTS ix_tasks_sync ON tasks (final, synced_at);
+CREATE INDEX IF NOT EXISTS ix_tasks_deployment ON tasks (deployment);
+CREATE TABLE IF NOT EXISTS payments (
+    tx_hash TEXT PRIMARY KEY,
+    task_uuid TEXT NOT NULL,
+    kind TEXT,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_payments_task_uuid ON payments (task_uuid);
+"""
+
+_TASK_COLUMNS = (
+    "task_uuid", "status", "region", "hardware", "hardware_id", "wallet",
+    "created_at", "expires_at", "synced_at", "final", "job_uris", "deployment_info",
+    "deployment", "spec_hash",
+)
+
+
+def is_final_status(status):
+    return bool(status) and status.lower() in FINAL_TASK_STATUSES
+
+
+class TaskInventory:
+    """Local SQLite inventory of tasks created through the SDK.
+
+    Keeps the latest deployment info, job uris and payment tx hashes of every
+    task, indexed by status, region, hardware and expiry, so fleet questions
+    are answered locally. `sync` refreshes only tasks that are stale and not
+    in a final state.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        """Open or create an inventory.
+
+        Args:
+            path: SQLite database file, ':memory:' for a throwaway inventory.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._migrate()
+            self._conn.executescript(_SCHEMA)
+
+    def _migrate(self):
+        """Add columns missing from inventories created by older versions."""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if not columns:
+            return
+        for column in ("deployment", "spec_hash"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE tasks ADD COLUMN {column} TEXT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _upsert(self, task_uuid: str, fields: dict):
+        fields = {key: value for key, value in fields.items() if value is not None}
+        columns = ["task_uuid"] + list(fields)
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in fields) or "task_uuid = task_uuid"
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO tasks ({', '.join(columns)}) VALUES ({placeholders}) "
+                f"ON CONFLICT (task_uuid) DO UPDATE SET {updates}",
+                [task_uuid] + list(fields.values())
+            )
+
+    def record_task(
+            self, 
+            task_uuid: str, 
+            task: dict = None, 
+            region: str = None, 
+            hardware: str = None, 
+            hardware_id: int = None, 
+            wallet: str = None, 
+            deployment: str = None, 
+            spec_hash: str = None
+        ):
+        """Add a newly created task, or update the given fields of a known one.
+
+        Args:
+            task_uuid: uuid of the task.
+            task: Optional. 'task' object of the create response.
+            region, hardware, hardware_id, wallet: Optional. Creation parameters of the task.
+            deployment: Optional. Name of the fleet deployment the task belongs to.
+            spec_hash: Optional. Hash of the deployment spec the task was created from.
+        """
+        task = task or {}
+        status = task.get("status")
+        self._upsert(task_uuid, {
+            "status": status,
+            "region": region,
+            "hardware": hardware or (task.get("task_detail") or {}).get("hardware"),
+            "hardware_id": hardware_id,
+            "wallet": wallet,
+            "created_at": task.get("created_at") or time.time(),
+            "expires_at": task.get("end_at"),
+            "final": int(is_final_status(status)) if status else None,
+            "deployment": deployment,
+            "spec_hash": spec_hash,
+        })
+
+    def record_payment(self, task_uuid: str, tx_hash: str, kind: str = "payment"):
+        """Add the payment tx hash of a task.
+
+        Args:
+            task_uuid: uuid of the task.
+            tx_hash: transaction hash of the payment.
+            kind: Optional. 'payment' or 'renewal'.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO payments (tx_hash, task_uuid, kind, created_at) VALUES (?, ?, ?, ?)",
+                (tx_hash, task_uuid, kind, time.time())
+            )
+
+    def record_renewal(self, task_uuid: str, duration: float):
+        """Move the expiry of a task by a confirmed renewal, until the next sync reads the new one."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE tasks SET expires_at = expires_at + ? WHERE task_uuid = ? AND expires_at IS NOT NULL",
+                (duration, task_uuid)
+            )
+
+    def update_from_deployment_info(self, task_uuid: str, deployment_info: dict):
+        """Store the deployment info of a task, nothing is written when it has no task.
+
+        Args:
+            task_uuid: uuid of the task.
+            deployment_info: response of `Orchestrator.get_deployment_info`.
+        """
+        data = deployment_info.get("data") or {}
+        task = data.get("task")
+        if not task:
+            # an error answer, the task would look synced and final without a status
+            return
+        jobs = data.get("jobs") or []
+        status = task.get("status")
+        region = task.get("region")
+        for order in data.get("config_orders") or []:
+            region = region or order.get("region")
+        self._upsert(task_uuid, {
+            "status": status,
+            "region": region,
+            "hardware": (task.get("task_detail") or {}).get("hardware"),
+            "expires_at": task.get("end_at"),
+            "synced_at": time.time(),
+            "final": int(is_final_status(status)),
+            "job_uris": json.dumps([job["job_real_uri"] for job in jobs if job.get("job_real_uri")]),
+            "deployment_info": codec.dumps(deployment_info),
+        })
+
+    def _row_to_dict(self, row):
+        task = dict(row)
+        task["final"] = bool(task["final"])
+        task["job_uris"] = json.loads(task["job_uris"]) if task["job_uris"] else []
+        task["deployment_info"] = codec.loads(task["deployment_info"]) if task["deployment_info"] else None
+        return task
+
+    def get(self, task_uuid: str):
+        """Get a task, None if it is not in the inventory."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM tasks WHERE task_uuid = ?", (task_uuid,)).fetchone()
+        return self._row_to_dict(row) if row is not None else None
+
+    def payments(self, task_uuid: str):
+        """Get the payments of a task, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM payments WHERE task_uuid = ? ORDER BY created_at", (task_uuid,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def query(
+            self,
+            status: str = None,
+            region: str = None,
+            hardware: str = None,
+            deployment: str = None,
+            wallet: str = None,
+            expires_before: float = None,
+            expires_after: float = None,
+            created_before: float = None,
+            created_after: float = None,
+            include_final: bool = True,
+            with_deployment_info: bool = False,
+        ):
+        """Find tasks by status, region, hardware, wallet and expiry.
+
+        Args:
+            status, region, hardware, deployment, wallet: Optional. Exact values to match.
+            expires_before, expires_after: Optional. Unix time bounds of the expiry.
+            created_before, created_after: Optional. Unix time bounds of the creation.
+            include_final: Optional. Include tasks in a final state (Default = True).
+            with_deployment_info: Optional. Also load the stored deployment info (Default = False).
+
+        Returns:
+            list of task dicts, soonest expiry first.
+        """
+        clauses = []
+        args = []
+        for column, value in (("status", status), ("region", region), ("hardware", hardware), ("deployment", deployment), ("wallet", wallet)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        if expires_before is not None:
+            clauses.append("expires_at < ?")
+            args.append(expires_before)
+        if expires_after is not None:
+            clauses.append("expires_at >= ?")
+            args.append(expires_after)
+        if created_before is not None:
+            clauses.append("created_at < ?")
+            args.append(created_before)
+        if created_after is not None:
+            clauses.append("created_at >= ?")
+            args.append(created_after)
+        if not include_final:
+            clauses.append("final = 0")
+        columns = "*" if with_deployment_info else ", ".join(
+            column if column != "deployment_info" else "NULL AS deployment_info" for column in _TASK_COLUMNS
+        )
+        sql = f"SELECT {columns} FROM tasks"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY expires_at"
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def deployments(self):
+        """Names of fleet deployments with tasks not in a final state."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT deployment FROM tasks WHERE final = 0 AND deployment IS NOT NULL"
+            ).fetchall()
+        return [row["deployment"] for row in rows]
+
+    def stale(self, max_age: float = INVENTORY_SYNC_MAX_AGE, now: float = None):
+        """uuids of tasks not in a final state and not synced in the last max_age seconds."""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_uuid FROM tasks WHERE final = 0 AND (synced_at IS NULL OR synced_at < ?)",
+                (now - max_age,)
+            ).fetchall()
+        return [row["task_uuid"] for row in rows]
+
+    def sync(self, orchestrator, max_age: float = INVENTORY_SYNC_MAX_AGE, max_workers: int = BULK_MAX_WORKERS):
+        """Refresh stale tasks from the orchestrator.
+
+        Only tasks that are not in a final state and were not synced in the
+        last max_age seconds are fetched, concurrently. A task the
+        orchestrator returns no deployment info for counts as failed and
+        stays stale.
+
+        Args:
+            orchestrator: Orchestrator to fetch deployment info from.
+            max_age: Optional. Seconds a synced task stays fresh.
+            max_workers: Optional. Maximum number of requests in flight.
+
+        Returns:
+            dict with the number of 'refreshed' and 'failed' tasks.
+        """
+        def refresh(task_uuid):
+            deployment_info = orchestrator.get_deployment_info(task_uuid)
+            if not deployment_info or deployment_info.get("status") == "failed" or not (deployment_info.get("data") or {}).get("task"):
+                message = deployment_info.get("message") if deployment_info else None
+                raise SwanAPIException(f"No deployment info of {task_uuid}: {message}")
+            # get_deployment_info already stored it in the orchestrator's own inventory
+            if orchestrator.inventory is not self:
+                self.update_from_deployment_info(task_uuid, deployment_info)
+
+        results = run_bounded(refresh, self.stale(max_age), max_workers=max_workers)
+        failed = sum(1 for _, _, error in results if error is not None)
+        return {"refreshed": len(results) - failed, "failed": failed}
@@ -0,0 +1,304 @@
+# ./swan/api/lifecycle.py
+
+import logging
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from swan.common import deadlines
+from swan.common.constant import *
+from swan.common.exception import SwanAPIException
+from swan.common.journal import TaskJournal
+
+
+class TaskLifecycle:
+    """Resumable task launch pipeline.
+
+    A launch walks through explicit states, each one written to a TaskJournal
+    before the next step starts:
+
+        pending -> creating -> created -> approved -> paying -> paid -> validated -> deployed
+
+    Running a launch again continues from its last journaled state, so a
+    restarted batch never creates or pays for the same launch twice. The
+    create request is journaled as a 'creating' intent before it is sent. A
+    launch resumed from that state adopts the task the orchestrator's
+    inventory recorded for it, or stops until `resolve_creating` says whether
+    the task exists. The payment transaction is signed and journaled before
+    it is broadcast, a resumed launch re-sends that same transaction instead
+    of a new one.
+    """
+
+    def __init__(
+            self,
+            orchestrator,
+            journal,
+            private_key: str,
+            wait_deployed: bool = False,
+            deploy_timeout: float = 600,
+            poll_interval: float = 10,
+            validate_delay: float = VALIDATE_PAYMENT_DELAY,
+        ):
+        """Initialize the pipeline.
+
+        Args:
+            orchestrator: Orchestrator used for task creation and payment validation.
+            journal: TaskJournal object or path of the journal file.
+            private_key: private key of the paying wallet.
+            wait_deployed: Optional. Wait until the task has a deployed url (Default = False).
+            deploy_timeout: Optional. Seconds to wait for the deployment.
+            poll_interval: Optional. Seconds between deployment checks.
+            validate_delay: Optional. Seconds to wait between payment and validation.
+        """
+        if not private_key:
+            raise SwanAPIException(f"No private_key provided.")
+        self.orchestrator = orchestrator
+        self.journal = journal if isinstance(journal, TaskJournal) else TaskJournal(journal)
+        self.private_key = private_key
+        self.wait_deployed = wait_deployed
+        self.deploy_timeout = deploy_timeout
+        self.poll_interval = poll_interval
+        self.validate_delay = validate_delay
+        # chain steps of one wallet must not interleave their nonces and allowance
+        self._chain_lock = threading.Lock()
+        # launch_id -> AllowanceReservation of the wallet, approved and not yet paid
+        self._reserved = {}
+        self._steps = {
+            TASK_STATE_PENDING: self._create,
+            TASK_STATE_CREATING: self._reconcile_creating,
+            TASK_STATE_CREATED: self._approve,
+            TASK_STATE_APPROVED: self._pay,
+            TASK_STATE_PAYING: self._confirm_payment,
+            TASK_STATE_PAID: self._validate,
+            TASK_STATE_VALIDATED: self._deploy,
+        }
+
+    def _final_state(self):
+        return TASK_STATE_DEPLOYED if self.wait_deployed else TASK_STATE_VALIDATED
+
+    def launch(self, launch_id: str, wallet_address: str, **task_args):
+        """Launch a task, or resume it from its journaled state.
+
+        Args:
+            launch_id: caller chosen unique id of the launch, the journal key.
+            wallet_address: The user's wallet address.
+            task_args: arguments of `Orchestrator.create_task`, e.g. hardware_id, region, duration, app_repo_image.
+
+        Returns:
+            dict journal record of the launch, with 'state', 'task_uuid', 'tx_hash' and 'error' if a step failed.
+        """
+        record = self.journal.get(launch_id) or {"launch_id": launch_id, "state": TASK_STATE_PENDING}
+        final_state = self._final_state()
+        while record["state"] != final_state and record["state"] in self._steps:
+            state = record["state"]
+            try:
+                record = self._steps[state](launch_id, record, wallet_address, task_args)
+            except Exception as e:
+                logging.error(f"Launch {launch_id} failed after state {state}: " + str(e) + traceback.format_exc())
+                # a step may have journaled a later state before failing, e.g. a sent payment
+                state = (self.journal.get(launch_id) or {}).get("state", state)
+                if state != TASK_STATE_PAYING:
+                    self._release(launch_id)
+                return self.journal.record(launch_id, state, error=str(e))
+        return record
+
+    def resolve_creating(self, launch_id: str, task_uuid: str = None):
+        """Settle a launch that stopped while its task was being created.
+
+        Args:
+            launch_id: id of a launch in the 'creating' state.
+            task_uuid: Optional. uuid of the task the create request made, the launch continues with it.
+            If not given the task was not created, the next run creates it.
+
+        Returns:
+            dict journal record of the launch.
+        """
+        record = self.journal.get(launch_id)
+        if not record or record["state"] != TASK_STATE_CREATING:
+            raise SwanAPIException(f"Launch {launch_id} is not being created")
+        if task_uuid is None:
+            return self.journal.record(launch_id, TASK_STATE_PENDING)
+        return self._created(launch_id, record, task_uuid)
+
+    def run(self, launches, max_workers: int = 1):
+        """Launch or resume a batch of tasks.
+
+        Network steps run on up to max_workers threads, chain steps of the
+        wallet are serialized.
+
+        Args:
+            launches: dict of launch_id -> kwargs of `launch` (wallet_address and task arguments).
+            max_workers: Optional. Number of launches in flight (Default = 1).
+
+        Returns:
+            dict of launch_id -> journal record.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                launch_id: executor.submit(self.launch, launch_id, **launch_args)
+                for launch_id, launch_args in launches.items()
+            }
+            return {launch_id: future.result() for launch_id, future in futures.items()}
+
+    def _contract(self):
+        return self.orchestrator.contract_factory.get(self.private_key)
+
+    def _create(self, launch_id, record, wallet_address, task_args):
+        task_args = dict(task_args)
+        task_args.pop("private_key", None)
+        task_args["auto_pay"] = False
+        # the orchestrator has no idempotency key, the intent tells a resumed launch a task may exist
+        record = self.journal.record(
+            launch_id,
+            TASK_STATE_CREATING,
+            intent_id=uuid.uuid4().hex,
+            creating_since=time.time(),
+            task_uuid=None,
+            duration=task_args.get("duration", 3600)
+        )
+        result = self.orchestrator.create_task(wallet_address=wallet_address, **task_args)
+        if not result or not result.get("task_uuid"):
+            # a lost response looks the same as a refused request, the launch stays 'creating'
+            raise SwanAPIException(f"Task creation failed")
+        # with a placement the orchestrator picked the hardware, task_args has none
+        hardware_id = result.get("hardware_id")
+        if hardware_id is None:
+            hardware_id = task_args.get("hardware_id")
+        return self._created(launch_id, record, result["task_uuid"], hardware_id)
+
+    def _created(self, launch_id, record, task_uuid, hardware_id=None):
+        if hardware_id is None:
+            hardware_id = self.orchestrator.hardware_id_free
+        return self.journal.record(
+            launch_id,
+            TASK_STATE_CREATED,
+            task_uuid=task_uuid,
+            hardware_id=hardware_id,
+            duration=record.get("duration", 3600)
+        )
+
+    def _reconcile_creating(self, launch_id, record, wallet_address, task_args):
+        """Find the task of a launch that stopped during its create request."""
+        candidates = []
+        inventory = getattr(self.orchestrator, "inventory", None)
+        if inventory is not None:
+            owned = {other.get("task_uuid") for other in self.journal.records().values()}
+            candidates = [
+                task for task in inventory.query(
+                    wallet=wallet_address,
+                    created_after=record["creating_since"] - CREATING_RECONCILE_SLACK,
+                    created_before=record["creating_since"] + CREATING_RECONCILE_SLACK,
+                )
+                if task["task_uuid"] not in owned
+                and task_args.get("hardware_id") in (None, task.get("hardware_id"))
+            ]
+        if len(candidates) != 1:
+            raise SwanAPIException(
+                f"Launch {launch_id} stopped while creating its task (intent {record.get('intent_id')}), "
+                f"{len(candidates)} matching tasks in the inventory. "
+                f"Call resolve_creating with the task_uuid it created, or without one if it created none."
+            )
+        task = candidates[0]
+        logging.info(f"Launch {launch_id} adopts task {task['task_uuid']} created before it stopped")
+        return self._created(launch_id, record, task["task_uuid"], task.get("hardware_id"))
+
+    def _cover_reserved(self, contract, launch_id, amount):
+        """Reserve amount for launch_id in the wallet's allowance, under _chain_lock.
+
+        The wallet's AllowanceTracker approves what every unpaid payment of
+        the wallet needs, launches and other payments of the same key alike.
+
+        Returns:
+            tx_hash of the approval, None when the allowance already covered it.
+        """
+        reservation = contract.allowance.reserve(amount)
+        self._reserved[launch_id] = reservation
+        return reservation.approve_tx_hash
+
+    def _release(self, launch_id):
+        with self._chain_lock:
+            reservation = self._reserved.pop(launch_id, None)
+        if reservation is not None:
+            self._contract().allowance.release(reservation)
+
+    def _approve(self, launch_id, record, wallet_address, task_args):
+        contract = self._contract()
+        amount = int(contract.estimate_payment(record["hardware_id"], record["duration"]/3600))
+        with self._chain_lock:
+            approve_tx_hash = self._cover_reserved(contract, launch_id, amount)
+        return self.journal.record(launch_id, TASK_STATE_APPROVED, amount=amount, approve_tx_hash=approve_tx_hash)
+
+    def _pay(self, launch_id, record, wallet_address, task_args):
+        contract = self._contract()
+        with self._chain_lock:
+            if launch_id not in self._reserved:
+                # resumed after the approval, other launches may have approved less since
+                self._cover_reserved(contract, launch_id, record["amount"])
+            # the nonce manager counts pending transactions, unmined payments of other launches included
+            signed_tx = contract.sign_transaction(
+                contract.client_contract.functions.submitPayment(
+                    record["task_uuid"], record["hardware_id"], record["duration"]
+                )
+            )
+            record = self.journal.record(
+                launch_id,
+                TASK_STATE_PAYING,
+                tx_hash=contract.w3.to_hex(signed_tx.hash),
+                raw_tx=contract.w3.to_hex(signed_tx.rawTransaction)
+            )
+            try:
+                contract.send_signed_transaction(signed_tx, wait=False)
+            except Exception:
+                # the nonce may be unused, a resume re-sends the journaled transaction
+                contract.nonce_manager.reset()
+                raise
+        return self._confirm_payment(launch_id, record, wallet_address, task_args, resend=False)
+
+    def _confirm_payment(self, launch_id, record, wallet_address, task_args, resend=True):
+        contract = self._contract()
+        if resend:
+            with self._chain_lock:
+                if launch_id not in self._reserved:
+                    self._cover_reserved(contract, launch_id, record["amount"])
+            # the journaled transaction may never have reached the node, sending it again is safe
+            try:
+                contract.send_raw_transaction(record["raw_tx"], wait=False)
+            except Exception as e:
+                if "nonce too low" in str(e).lower() and not self._known(contract, record["tx_hash"]):
+                    # another transaction took the nonce, the payment was never sent
+                    logging.warning(f"Payment transaction of {launch_id} was replaced, signing it again")
+                    return self.journal.record(launch_id, TASK_STATE_APPROVED, tx_hash=None, raw_tx=None)
+                logging.info(f"Payment transaction of {launch_id} not re-sent: {e}")
+        receipt = contract.wait_for_receipt(record["tx_hash"])
+        self._release(launch_id)
+        if receipt["status"] != 1:
+            raise SwanAPIException(f"Payment transaction {record['tx_hash']} reverted")
+        return self.journal.record(launch_id, TASK_STATE_PAID)
+
+    @staticmethod
+    def _known(contract, tx_hash):
+        from web3.exceptions import TransactionNotFound
+
+        try:
+            return contract.w3.eth.get_transaction(tx_hash) is not None
+        except TransactionNotFound:
+            return False
+
+    def _validate(self, launch_id, record, wallet_address, task_args):
+        deadlines.sleep(self.validate_delay, what="payment validation")
+        result = self.orchestrator.validate_payment(tx_hash=record["tx_hash"], task_uuid=record["task_uuid"])
+        if not result or result.get("status") == "failed":
+            raise SwanAPIException(f"Payment validation failed, {result=}")
+        return self.journal.record(launch_id, TASK_STATE_VALIDATED)
+
+    def _deploy(self, launch_id, record, wallet_address, task_args):
+        deadline = time.monotonic() + self.deploy_timeout
+        while True:
+            urls = self.orchestrator.get_real_url(record["task_uuid"])
+            if urls:
+                return self.journal.record(launch_id, TASK_STATE_DEPLOYED, urls=urls)
+            if time.monotonic() >= deadline:
+                raise SwanAPIException(f"Task {record['task_uuid']} not deployed after {self.deploy_timeout} seconds")
+            deadlines.sleep(self.poll_interval, what="deployment wait")
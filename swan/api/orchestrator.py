@@ -1,28 +1,53 @@
 import logging
 import traceback
 import json
+import threading
 import time
-
-from eth_account import Account
-from eth_account.messages import encode_defunct
+from collections import OrderedDict
 
 from swan.api_client import APIClient
+from swan.api.catalog import HardwareCatalog
+from swan.api.placement import rank
+from swan.common import deadlines, metrics, tracing
+from swan.common.concurrency import run_bounded
 from swan.common.constant import *
-from swan.object import HardwareConfig
-from swan.common.exception import SwanAPIException
-from swan.contract.swan_contract import SwanContract
+from swan.common.exception import SwanAPIException, SwanDeadlineExceeded
+from swan.object.response import DeploymentInfo, PaymentInfo, TaskCreation, as_model
+
+
+def _incomplete(deadline, error, progress):
+    """Result of a call the deadline ended, with what was done before it."""
+    tx_hash = getattr(error, "tx_hash", None) or progress.get("tx_hash")
+    result = TaskCreation(progress.get("result") or {})
+    task_uuid = progress.get("task_uuid")
+    result.update({
+        "status": INCOMPLETE_STATUS,
+        "message": getattr(error, "message", None) or str(error),
+        "cancelled": deadline.cancelled,
+        "phase": progress["phase"],
+        "id": task_uuid,
+        "task_uuid": task_uuid,
+        "tx_hash": tx_hash,
+    })
+    return result
 
 class Orchestrator(APIClient):
   
-    def __init__(self, api_key: str, login: bool = True, network="testnet", verification: bool = True, token = None, url_endpoint: str = None):
+    def __init__(self, api_key: str, login: bool = True, network="testnet", verification: bool = True, token = None, url_endpoint: str = None, session = None, inventory = None, rpc_urls = None):
         """Initialize user configuration and login.
 
         Args:
             api_key: Orchestrator API key, generated through website
             login: Login into Orchestrator or Not
-            url_endpoint: Selected server 'production/calibration'
+            url_endpoint: Selected server 'production/calibration', or a list of equivalent servers,
+            requests then go to the fastest healthy one, slow reads are hedged and errors fail over.
+            session: Optional. Session sharing its transport, token, contract info, hardware catalog and contract factory.
+            inventory: Optional. TaskInventory recording every task created and paid through this object.
+            rpc_urls: Optional. More rpc urls of the chain, contract calls fail over between them and the contract info rpc_url.
         """
-        self.token = token
+        APIClient.__init__(self, session.http_session if session is not None else None)
+        self.session = session
+        self.token = token if token or session is None else session.token
         self.api_key = api_key
         self.contract_info = None
         self.url_endpoint = url_endpoint
@@ -30,9 +55,19 @@ class Orchestrator(APIClient):
         self.hardware_id_free = 0
         self.wallet_address = None
         self.region = "global"
-        self.all_hardware = None
+        self._contract_factory = None
+        self.rpc_urls = rpc_urls
+        self.inventory = inventory
+        # hardware_id of tasks created by this instance, used as renewal default
+        self._task_hardware = OrderedDict()
+        self._lock = threading.Lock()
     
-        if url_endpoint:
+        if url_endpoint and isinstance(url_endpoint, (list, tuple)):
+            from swan.common.endpoints import EndpointPool
+            self.endpoints = EndpointPool(url_endpoint)
+            self.swan_url = self.endpoints.urls[0]
+            logging.info(f"Using {', '.join(self.endpoints.urls)}")
+        elif url_endpoint:
             self.swan_url = url_endpoint
             logging.info(f"Using {url_endpoint}")
         elif network == "mainnet":
@@ -42,13 +77,68 @@ class Orchestrator(APIClient):
             self.swan_url = ORCHESTRATOR_API_TESTNET
             logging.info("Using Testnet")
 
+        if session is not None:
+            self.hardware_catalog = session.get_hardware_catalog(self.swan_url)
+        else:
+            self.hardware_catalog = HardwareCatalog()
+
         if login:
             self.api_key_login()
         if self.token:
             pub_addr = ORCHESTRATOR_PUBLIC_ADDRESS_MAINNET if network == "mainnet" else ORCHESTRATOR_PUBLIC_ADDRESS_TESTNET
             self.get_contract_info(verification, orchestrator_public_address=pub_addr)
         
-        self.get_hardware_config()
+        self.get_hardware_config(refresh=False)
+
+    @property
+    def all_hardware(self):
+        return self.hardware_catalog.hardware
+
+    @all_hardware.setter
+    def all_hardware(self, hardware):
+        self.hardware_catalog.set(hardware)
+
+    @property
+    def contract_factory(self):
+        """SwanContractFactory for the current contract info, shared with the session if any."""
+        factory = self._contract_factory
+        if factory is None or factory.contract_info is not self.contract_info:
+            with self._lock:
+                factory = self._contract_factory
+                if factory is None or factory.contract_info is not self.contract_info:
+                    if self.session is not None:
+                        factory = self.session.get_contract_factory(self.contract_info, self.rpc_urls)
+                    else:
+                        # the web3 stack is only loaded once a contract is needed
+                        from swan.contract.factory import SwanContractFactory
+                        factory = SwanContractFactory(self.contract_info, rpc_urls=self.rpc_urls)
+                    self._contract_factory = factory
+        return factory
+
+    def wallet_pool(self, private_keys):
+        """WalletPool spreading payments over several wallets.
+
+        Args:
+            private_keys: private keys of the funded pool wallets.
+
+        Returns:
+            WalletPool using this object's contract factory, validate its payments with `validate_payment`.
+        """
+        from swan.contract.wallet_pool import WalletPool
+        return WalletPool(self.contract_factory, private_keys)
+
+    def payment_indexer(self, path: str = ":memory:", **options):
+        """PaymentIndexer keeping the Payment events of the client contract in a local index.
+
+        Args:
+            path: Optional. SQLite file of the index, kept in memory if not given.
+            options: PaymentIndexer options, e.g. start_block, chunk_blocks, confirmations.
+
+        Returns:
+            PaymentIndexer, call `sync` or `follow` to read the chain.
+        """
+        from swan.contract.indexer import PaymentIndexer
+        return PaymentIndexer(self.contract_factory.get(), path, **options)
 
 
     def api_key_login(self):
@@ -72,6 +162,7 @@ class Orchestrator(APIClient):
         except Exception as e:
             logging.error(str(e) + traceback.format_exc())
 
+    @tracing.traced()
     def get_source_uri(
             self, 
             repo_uri,
@@ -108,6 +199,12 @@ class Orchestrator(APIClient):
 
 
     def get_contract_info(self, verification: bool = True, orchestrator_public_address = ORCHESTRATOR_PUBLIC_ADDRESS_TESTNET):
+        if self.session is not None:
+            contract_info = self.session.get_contract_info(self.swan_url, verification)
+            if contract_info:
+                self.contract_info = contract_info
+                return True
+
         response = self._request_without_params(GET, GET_CONTRACT_INFO, self.swan_url, self.token)
         if verification:
             if not self.contract_info_verified(
@@ -117,6 +214,8 @@ class Orchestrator(APIClient):
             ):
                 return False
         self.contract_info = response["data"]["contract_info"]["contract_detail"]
+        if self.session is not None:
+            self.session.set_contract_info(self.swan_url, self.contract_info, verification)
         return True
     
     def contract_info_verified(
@@ -125,6 +224,10 @@ class Orchestrator(APIClient):
             signature, 
             orchestrator_public_address = ORCHESTRATOR_PUBLIC_ADDRESS_TESTNET
         ):
+        from eth_account import Account
+        from eth_account.messages import encode_defunct
+
+        # the signature covers the standard library encoding, never use the pluggable codec here
         message_json = json.dumps(contract_info)
         msghash = encode_defunct(text=message_json)
         public_address = Account.recover_message(msghash, signature=signature)
@@ -132,8 +235,12 @@ class Orchestrator(APIClient):
             return True
         return False
         
-    def get_hardware_config(self, available = True):
+    def get_hardware_config(self, available = True, refresh = True):
         """Query current hardware list object.
+
+        Args:
+            available: Only return available hardware.
+            refresh: Fetch a new hardware list, otherwise use the cached one while it is fresh.
         
         Returns:
             list of HardwareConfig object.
@@ -149,22 +256,103 @@ class Orchestrator(APIClient):
             }
         """
         try:
-            response = self._request_without_params(GET, GET_CP_CONFIG, self.swan_url, self.token)
-            self.all_hardware = [HardwareConfig(hardware) for hardware in response["data"]["hardware"]]
+            all_hardware = self._get_all_hardware(force=refresh)
             if available:
-                hardwares_info = [hardware.to_dict() for hardware in self.all_hardware if hardware.status == "available"]
+                hardwares_info = [hardware.to_dict() for hardware in all_hardware if hardware.status == "available"]
             else:
-                hardwares_info = [hardware.to_dict() for hardware in self.all_hardware]
+                hardwares_info = [hardware.to_dict() for hardware in all_hardware]
             return hardwares_info
         except Exception:
             logging.error("Failed to fetch hardware configurations.")
             return None
+
+    def _get_all_hardware(self, force: bool = False):
+        """Get all hardware from the catalog, fetching it only when the cached list is stale."""
+        cached = not force and self.hardware_catalog.is_fresh()
+        metrics.CATALOG_LOOKUPS.labels("hit" if cached else "miss").inc()
+        with tracing.span("hardware_catalog", cached=cached):
+            return self.hardware_catalog.get(self._fetch_hardware, force=force)
+
+    def _fetch_hardware(self):
+        return self._request_without_params(GET, GET_CP_CONFIG, self.swan_url, self.token)
+
+    def hardware_watcher(self, **options):
+        """HardwareWatcher polling the hardware list, shared by every resource using the same catalog.
+
+        Args:
+            options: HardwareWatcher options, e.g. min_interval, max_interval, used when it is first created.
+
+        Returns:
+            HardwareWatcher to subscribe to or wait on.
+        """
+        return self.hardware_catalog.watcher(self._fetch_hardware, **options)
+
+    def place(self, requirements=None, **kwargs):
+        """Rank the hardware and regions a task can be created on.
+
+        Args:
+            requirements: Optional. PlacementRequirements, or give its arguments as keywords,
+            e.g. hardware_type="GPU", min_memory=8, regions=["Quebec-CA"], max_price=12.
+
+        Returns:
+            list of Placement, best first, with hardware, region and price. None on failure.
+        """
+        try:
+            return rank(self._get_all_hardware(), requirements if requirements is not None else kwargs)
+        except Exception as e:
+            logging.error(str(e) + traceback.format_exc())
+            return None
+
+    def preflight(self, specs, private_key: str = None, wallet_address: str = None, require_allowance: bool = False):
+        """Check a batch of tasks before creating or paying any of them.
+
+        Args:
+            specs: list of dicts of `create_task` arguments.
+            private_key: Optional. Private key of the wallet paying for the tasks.
+            wallet_address: Optional. Paying wallet address when no private key is given.
+            require_allowance: Optional. Report an allowance below the total cost as an issue.
+
+        Returns:
+            PreflightReport listing every issue, `report.ok` is True when there is none. None on failure.
+        """
+        try:
+            from swan.api.preflight import Preflight
+            return Preflight(self, private_key, wallet_address, require_allowance).run(specs)
+        except Exception as e:
+            logging.error(str(e) + traceback.format_exc())
+            return None
+
+    def wait_for_capacity(self, hardware_id: int = None, region: str = "global", hardware_name: str = None, timeout: float = None):
+        """Wait until hardware is available in a region, polling through the shared watcher.
+
+        Args:
+            hardware_id: Optional. id of cp/hardware configuration set.
+            region: Optional. Region the hardware has to be in, any for 'global'. (Default: global)
+            hardware_name: Optional. cfg name instead of hardware_id, e.g. 'C1ae.medium'.
+            timeout: Optional. Seconds to wait at most, forever if not given.
+
+        Returns:
+            HardwareConfig of the available hardware, None on timeout or failure.
+        """
+        try:
+            if hardware_id is None and hardware_name is None:
+                raise SwanAPIException("hardware_id or hardware_name required")
+            hardware = self.hardware_watcher().wait_for_capacity(hardware_name, region, hardware_id, timeout)
+            if hardware is None:
+                logging.warning(f"No capacity for {hardware_name or hardware_id} in {region} after {timeout} seconds")
+            return hardware
+        except SwanAPIException as e:
+            logging.error(e.message)
+            return None
+        except Exception as e:
+            logging.error(str(e) + traceback.format_exc())
+            return None
     
-    def get_cfg_name(self, hardware_id=0):
+    def get_cfg_name(self, hardware_id=0, hardware_snapshot=None):
         try:
-            self.get_hardware_config()  # make sure all_hardware is updated all the time
-            hardware = [hardware for hardware in self.all_hardware if hardware.id == hardware_id][0]
-            cfg_name = hardware.name
+            if hardware_snapshot is None:
+                hardware_snapshot = self._get_all_hardware()
+            cfg_name = hardware_snapshot.get(hardware_id).name
             return cfg_name
         except:
             logging.error("Failed to set hardware configurations.")
@@ -201,7 +389,7 @@ class Orchestrator(APIClient):
                     self.token, 
                     None
                 )
-            
+            self._forget_terminated(task_uuid, result)
             return result
         except Exception as e:
             logging.error(str(e) + traceback.format_exc())
@@ -237,6 +425,127 @@ class Orchestrator(APIClient):
             logging.error(str(e) + traceback.format_exc())
             return None
     
+    def terminate_tasks(self, task_uuids, max_workers: int = BULK_MAX_WORKERS, rate_limit: float = None, retries: int = BULK_RETRIES):
+        """
+        Terminate many tasks concurrently
+
+        Args:
+            task_uuids: list of task uuids.
+            max_workers: Optional. Maximum number of requests in flight.
+            rate_limit: Optional. Maximum requests started per second.
+            retries: Optional. Retries of a request failing with an error.
+
+        Returns:
+            dict of task_uuid -> JSON response, {'status': 'failed', 'message': error} for a task whose request failed.
+        """
+        return self._bulk_task_action(
+            lambda task_uuid: self._post_task_action(TERMINATE_TASK, task_uuid),
+            task_uuids, max_workers, rate_limit, retries
+        )
+
+    def claim_reviews(self, task_uuids, max_workers: int = BULK_MAX_WORKERS, rate_limit: float = None, retries: int = BULK_RETRIES):
+        """
+        Review the uptime of many tasks concurrently
+
+        Args:
+            task_uuids: list of task uuids.
+            max_workers: Optional. Maximum number of requests in flight.
+            rate_limit: Optional. Maximum requests started per second.
+            retries: Optional. Retries of a request failing with an error.
+
+        Returns:
+            dict of task_uuid -> JSON response, {'status': 'failed', 'message': error} for a task whose request failed.
+        """
+        return self._bulk_task_action(
+            lambda task_uuid: self._post_task_action(CLAIM_REVIEW, task_uuid),
+            task_uuids, max_workers, rate_limit, retries
+        )
+
+    def teardown_tasks(self, task_uuids, max_workers: int = BULK_MAX_WORKERS, rate_limit: float = None, retries: int = BULK_RETRIES):
+        """
+        Terminate many tasks and claim their review, concurrently
+
+        Each task is claimed right after its own termination, a task failing
+        does not stop the others.
+
+        Args:
+            task_uuids: list of task uuids.
+            max_workers: Optional. Maximum number of tasks in flight.
+            rate_limit: Optional. Maximum requests started per second.
+            retries: Optional. Retries of a request failing with an error.
+
+        Returns:
+            dict of task_uuid -> {'terminate': JSON response, 'claim_review': JSON response}.
+        """
+        terminated = {}
+
+        def teardown(task_uuid):
+            # a retry after a failed claim must not terminate again
+            if task_uuid not in terminated:
+                terminated[task_uuid] = self._post_task_action(TERMINATE_TASK, task_uuid)
+            return {
+                "terminate": terminated[task_uuid],
+                "claim_review": self._post_task_action(CLAIM_REVIEW, task_uuid)
+            }
+
+        results = self._bulk_task_action(teardown, task_uuids, max_workers, rate_limit, retries)
+        for task_uuid, result in results.items():
+            if result.get("status") == "failed":
+                results[task_uuid] = {"terminate": terminated.get(task_uuid, result), "claim_review": result}
+        return results
+
+    def _post_task_action(self, request_path: str, task_uuid: str):
+        result = self._request_with_params(
+            POST, 
+            request_path, 
+            self.swan_url, 
+            {"task_uuid": task_uuid}, 
+            self.token, 
+            None
+        )
+        if request_path == TERMINATE_TASK:
+            self._forget_terminated(task_uuid, result)
+        return result
+
+    def _remember_hardware(self, task_uuid: str, hardware_id: int):
+        """Keep the hardware_id of a created task, dropping the least recently used beyond TASK_HARDWARE_CACHE_SIZE."""
+        with self._lock:
+            self._task_hardware[task_uuid] = hardware_id
+            self._task_hardware.move_to_end(task_uuid)
+            while len(self._task_hardware) > TASK_HARDWARE_CACHE_SIZE:
+                self._task_hardware.popitem(last=False)
+
+    def _task_hardware_id(self, task_uuid: str):
+        """hardware_id a task was created with by this instance, None if unknown or dropped."""
+        with self._lock:
+            hardware_id = self._task_hardware.get(task_uuid)
+            if hardware_id is not None:
+                self._task_hardware.move_to_end(task_uuid)
+            return hardware_id
+
+    def _forget_terminated(self, task_uuid: str, result):
+        """Drop the hardware_id of a task terminated successfully, it is never renewed again."""
+        if isinstance(result, dict) and result.get("status") == "success":
+            with self._lock:
+                self._task_hardware.pop(task_uuid, None)
+
+    def _bulk_task_action(self, action, task_uuids, max_workers, rate_limit, retries):
+        results = {}
+        for task_uuid, result, error in run_bounded(
+            action,
+            task_uuids,
+            max_workers=max_workers,
+            retries=retries,
+            rate_limit=rate_limit
+        ):
+            if error is not None:
+                result = {"status": "failed", "message": str(error)}
+            results[task_uuid] = result
+        failed = sum(1 for result in results.values() if result.get("status") == "failed")
+        logging.info(f"Bulk request done, {len(results)} tasks, {failed} failed")
+        return results
+    
+    @tracing.traced()
     def get_app_repo_image(self, name: str = ""):
         if not name:
             return self._request_without_params(
@@ -256,6 +565,7 @@ class Orchestrator(APIClient):
                 None
             )
 
+    @tracing.traced()
     def create_task(
             self,
             wallet_address, 
@@ -272,6 +582,8 @@ class Orchestrator(APIClient):
             private_key = None,
             start_in: int = 300,
             preferred_cp_list=None,
+            placement=None,
+            deadline=None,
         ):
         """
         Create a task via the orchestrator.
@@ -292,110 +604,202 @@ class Orchestrator(APIClient):
             If True, the private key and wallet must be in .env (Default = False). Otherwise, the user must call the submit payment method on the contract and validate payment.
             private_key: Optional. The wallet's private key, only used if auto_pay is True.
             preferred_cp_list: Optional. A list of preferred cp account address(es).
+            placement: Optional. PlacementRequirements or a dict of its arguments, used when hardware_id is not given.
+            The task is created on the best ranked hardware and region that takes it, see `place`.
+            deadline: Optional. Deadline or seconds, the time budget of the whole call including payment.
+            Cancelling the Deadline from another thread stops the call.
         
         Raises:
             SwanExceptionError: If neither app_repo_image nor job_source_uri is provided.
             
         Returns:
-            JSON response from the backend server including the 'task_uuid'.
+            TaskCreation, the JSON response from the backend server including the 'task_uuid'.
+            When the deadline ends the call, a TaskCreation with status "incomplete", the `phase` reached,
+            and the `task_uuid` and `tx_hash` of what was done so far.
         """
-        try:
-            if not wallet_address:
-                raise SwanAPIException(f"No wallet_address provided, please pass in a wallet_address")
+        progress = {"phase": "create"}
+        with deadlines.scope(deadline) as current:
+            try:
+                return self._create_task(
+                    progress,
+                    wallet_address, 
+                    hardware_id, 
+                    region, 
+                    duration, 
+                    app_repo_image, 
+                    auto_pay, 
+                    job_source_uri, 
+                    repo_uri, 
+                    repo_branch, 
+                    repo_owner, 
+                    repo_name, 
+                    private_key, 
+                    start_in, 
+                    preferred_cp_list, 
+                    placement
+                )
+            except Exception as e:
+                if current is not None and current.expired:
+                    # raised here or swallowed by a step, the deadline ended the call either way
+                    logging.error(f"{e} after phase {progress['phase']}")
+                    return _incomplete(current, e, progress)
+                logging.error(str(e) + traceback.format_exc())
+                return None
 
-            if auto_pay:
-                if not private_key:
-                    raise SwanAPIException(f"please provide private_key if using auto_pay")
+    def _create_task(self, progress, wallet_address, hardware_id, region, duration, app_repo_image, auto_pay, job_source_uri, repo_uri, repo_branch, repo_owner, repo_name, private_key, start_in, preferred_cp_list, placement):
+        """Body of `create_task`, raises on failure and keeps `progress` up to date."""
+        if not wallet_address:
+            raise SwanAPIException(f"No wallet_address provided, please pass in a wallet_address")
 
-            if not region:
-                region = 'global'
+        if auto_pay:
+            if not private_key:
+                raise SwanAPIException(f"please provide private_key if using auto_pay")
 
-            if hardware_id is None:
-                hardware_id = 0
-                self.hardware_id_free = 0  # to save the default hardware_id for possible task renewals
-            else:
-                self.hardware_id_free = None
+        if not region:
+            region = 'global'
 
-            if cfg_name := self.get_cfg_name(hardware_id):
+        # a single catalog snapshot serves every lookup of this call
+        hardware_snapshot = self._get_all_hardware()
+        if placement is not None and hardware_id is None:
+            placements = rank(hardware_snapshot, placement)
+            if not placements:
+                raise SwanAPIException(f"No hardware meets the placement requirements")
+            candidates = [(item.hardware_id, item.hardware.name, item.region) for item in placements]
+        else:
+            if hardware_id is None:
+                hardware_id = self.hardware_id_free
+            if cfg_name := self.get_cfg_name(hardware_id, hardware_snapshot):
                 logging.info(f"Using {cfg_name} machine, {hardware_id=} {region=} {duration=} (seconds)")
             else:
                 raise SwanAPIException(f"Invalid hardware_id selected")
-            
-            if not job_source_uri:
-                if app_repo_image:
-                    if auto_pay == None and private_key:
-                        auto_pay = True
-                    repo_res = self.get_app_repo_image(app_repo_image)
-                    if repo_res and repo_res.get("status", "") == "success":
-                        repo_uri = repo_res.get("data", {}).get("url", "")
-                        if repo_uri == "":
-                            raise SwanAPIException(f"Invalid app_repo_image url")
-                    else:
-                        raise SwanAPIException(f"Invalid app_repo_image")
-
-                if repo_uri:
-                    job_source_uri = self.get_source_uri(
-                            repo_uri=repo_uri,
-                            wallet_address=wallet_address, 
-                            hardware_id=hardware_id,
-                            repo_branch=repo_branch,
-                            repo_owner=repo_owner,
-                            repo_name=repo_name
-                        )
+            candidates = [(hardware_id, cfg_name, region)]
+        
+        if not job_source_uri:
+            if app_repo_image:
+                if auto_pay == None and private_key:
+                    auto_pay = True
+                repo_res = self.get_app_repo_image(app_repo_image)
+                if repo_res and repo_res.get("status", "") == "success":
+                    repo_uri = repo_res.get("data", {}).get("url", "")
+                    if repo_uri == "":
+                        raise SwanAPIException(f"Invalid app_repo_image url")
                 else:
-                    raise SwanAPIException(f"Please provide app_repo_image, or job_source_uri, or repo_uri")
+                    raise SwanAPIException(f"Invalid app_repo_image")
 
-            if not job_source_uri:
-                raise SwanAPIException(f"cannot get job_source_uri. make sure `app_repo_image` or `repo_uri` or `job_source_uri` is correct.")
+            if not repo_uri:
+                raise SwanAPIException(f"Please provide app_repo_image, or job_source_uri, or repo_uri")
 
-            preferred_cp = None
-            if preferred_cp_list and isinstance(preferred_cp_list, list):
-                preferred_cp = ','.join(preferred_cp_list)
-            
-            if self._verify_hardware_region(cfg_name, region):
-                params = {
-                    "duration": duration,
-                    "cfg_name": cfg_name,
-                    "region": region,
-                    "start_in": start_in,
-                    "wallet": wallet_address,
-                    "job_source_uri": job_source_uri
-                }
-                if preferred_cp:
-                    params["preferred_cp"] = preferred_cp
-                result = self._request_with_params(
-                    POST, 
-                    CREATE_TASK, 
-                    self.swan_url, 
-                    params, 
-                    self.token, 
-                    None
-                )
-                task_uuid = result['data']['task']['uuid']
-            else:
-                err_msg = f"No {cfg_name} machine in {region}."
-                raise SwanAPIException(err_msg)
-        
-            tx_hash = None
-            if auto_pay:
-                result = self.make_payment(
-                    task_uuid=task_uuid, 
+        preferred_cp = None
+        if preferred_cp_list and isinstance(preferred_cp_list, list):
+            preferred_cp = ','.join(preferred_cp_list)
+
+        result = None
+        for hardware_id, cfg_name, region in candidates:
+            try:
+                result = self._create_task_on(
+                    hardware_id, 
+                    cfg_name, 
+                    region, 
+                    hardware_snapshot, 
+                    wallet_address=wallet_address, 
                     duration=duration, 
-                    private_key=private_key, 
-                    hardware_id=hardware_id
+                    start_in=start_in, 
+                    job_source_uri=job_source_uri, 
+                    repo_uri=repo_uri, 
+                    repo_branch=repo_branch, 
+                    repo_owner=repo_owner, 
+                    repo_name=repo_name, 
+                    preferred_cp=preferred_cp
                 )
-                tx_hash = result.get('tx_hash')
+                break
+            except SwanAPIException as e:
+                if len(candidates) == 1 or isinstance(e, SwanDeadlineExceeded):
+                    raise
+                # the next ranked placement may still have capacity
+                logging.warning(f"{e.message} Trying the next placement.")
+        if result is None:
+            raise SwanAPIException(f"None of {len(candidates)} placements could take the task")
+        task_uuid = result['data']['task']['uuid']
+        progress.update(phase="payment", task_uuid=task_uuid, result=result)
+    
+        tx_hash = None
+        if auto_pay:
+            result = self.make_payment(
+                task_uuid=task_uuid, 
+                duration=duration, 
+                private_key=private_key, 
+                hardware_id=hardware_id
+            )
+            if result is not None and result.get("status") == INCOMPLETE_STATUS:
+                # the current deadline ended the payment, report it as part of the task
+                progress.update(phase=result["phase"], tx_hash=result.get("tx_hash"))
+                raise SwanDeadlineExceeded(result["message"], tx_hash=result.get("tx_hash"), cancelled=result["cancelled"])
+            tx_hash = result.get('tx_hash')
 
-            if result and isinstance(result, dict):
-                result['id'] = task_uuid
-                result['task_uuid'] = task_uuid
+        if result and isinstance(result, dict):
+            result['id'] = task_uuid
+            result['task_uuid'] = task_uuid
+            # the placement chosen when hardware_id was not given
+            result['hardware_id'] = hardware_id
+            result['region'] = region
 
-            logging.info(f"Task created successfully, {task_uuid=}, {tx_hash=}")
-            return result
+        logging.info(f"Task created successfully, {task_uuid=}, {tx_hash=}")
+        return result
 
-        except Exception as e:
-            logging.error(str(e) + traceback.format_exc())
-            return None
+
+    def _create_task_on(self, hardware_id, cfg_name, region, hardware_snapshot, wallet_address, duration, start_in, job_source_uri, repo_uri, repo_branch, repo_owner, repo_name, preferred_cp):
+        """Create a task on one hardware and region, raises SwanAPIException when it is not taken."""
+        # checked against the snapshot first, a placement without the machine costs no source upload
+        if not self._verify_hardware_region(cfg_name, region, hardware_snapshot):
+            raise SwanAPIException(f"No {cfg_name} machine in {region}.")
+
+        if not job_source_uri:
+            job_source_uri = self.get_source_uri(
+                    repo_uri=repo_uri,
+                    wallet_address=wallet_address, 
+                    hardware_id=hardware_id,
+                    repo_branch=repo_branch,
+                    repo_owner=repo_owner,
+                    repo_name=repo_name
+                )
+        if not job_source_uri:
+            raise SwanAPIException(f"cannot get job_source_uri. make sure `app_repo_image` or `repo_uri` or `job_source_uri` is correct.")
+
+        params = {
+            "duration": duration,
+            "cfg_name": cfg_name,
+            "region": region,
+            "start_in": start_in,
+            "wallet": wallet_address,
+            "job_source_uri": job_source_uri
+        }
+        if preferred_cp:
+            params["preferred_cp"] = preferred_cp
+        result = as_model(TaskCreation, self._request_with_params(
+            POST, 
+            CREATE_TASK, 
+            self.swan_url, 
+            params, 
+            self.token, 
+            None
+        ))
+        data = result.get('data') if isinstance(result, dict) else None
+        task = data.get('task') if isinstance(data, dict) else None
+        if not task:
+            message = result.get('message') if isinstance(result, dict) else result
+            raise SwanAPIException(f"No task created on {cfg_name} in {region}: {message}.")
+        task_uuid = task['uuid']
+        self._remember_hardware(task_uuid, hardware_id)  # default for possible task renewals
+        if self.inventory is not None:
+            self.inventory.record_task(
+                task_uuid, 
+                task, 
+                region=region, 
+                hardware=cfg_name, 
+                hardware_id=hardware_id, 
+                wallet=wallet_address
+            )
+        return result
 
     def estimate_payment(self, duration : float = 3600, hardware_id = None):
         """Estimate required funds.
@@ -415,7 +819,7 @@ class Orchestrator(APIClient):
             if not self.contract_info:
                 raise SwanAPIException(f"No contract info on record, please verify contract first.")
             
-            contract = SwanContract("", self.contract_info)
+            contract = self.contract_factory.get()
 
             duration_hour = duration/3600
             amount = contract.estimate_payment(hardware_id, duration_hour)
@@ -424,6 +828,7 @@ class Orchestrator(APIClient):
             logging.error(str(e) + traceback.format_exc())
             return None
     
+    @tracing.traced()
     def submit_payment(self, task_uuid, private_key, duration = 3600, hardware_id = None):
         """
         Submit payment for a task
@@ -437,23 +842,12 @@ class Orchestrator(APIClient):
             tx_hash
         """
         try:
-            if hardware_id is None:
-                raise SwanAPIException(f"Invalid hardware_id")
-            
-            if not private_key:
-                raise SwanAPIException(f"No private_key provided.")
-            if not self.contract_info:
-                raise SwanAPIException(f"No contract info on record, please verify contract first.")
-            
-            contract = SwanContract(private_key, self.contract_info)
-        
-            tx_hash = contract.submit_payment(task_uuid=task_uuid, hardware_id=hardware_id, duration=duration)
-            logging.info(f"Payment submitted, {task_uuid=}, {duration=}, {hardware_id=}. Got {tx_hash=}")
-            return tx_hash
+            return self._send_payment(task_uuid, private_key, duration, hardware_id)
         except Exception as e:
             logging.error(str(e) + traceback.format_exc())
             return None
 
+    @tracing.traced()
     def renew_payment(self, task_uuid, private_key, duration = 3600, hardware_id = None):
         """
         Submit payment for a task
@@ -467,23 +861,29 @@ class Orchestrator(APIClient):
             tx_hash
         """
         try:
-            if hardware_id is None:
-                raise SwanAPIException(f"Invalid hardware_id")
-            
-            if not private_key:
-                raise SwanAPIException(f"No private_key provided.")
-            if not self.contract_info:
-                raise SwanAPIException(f"No contract info on record, please verify contract first.")
-            
-            contract = SwanContract(private_key, self.contract_info)
-        
-            tx_hash = contract.renew_payment(task_uuid=task_uuid, hardware_id=hardware_id, duration=duration)
-            logging.info(f"Payment submitted, {task_uuid=}, {duration=}, {hardware_id=}. Got {tx_hash=}")
-            return tx_hash
+            return self._send_payment(task_uuid, private_key, duration, hardware_id, renew=True)
         except Exception as e:
             logging.error(str(e) + traceback.format_exc())
             return None
 
+    def _send_payment(self, task_uuid, private_key, duration, hardware_id, renew: bool = False):
+        """Body of `submit_payment` and `renew_payment`, raises on failure."""
+        if hardware_id is None:
+            raise SwanAPIException(f"Invalid hardware_id")
+        
+        if not private_key:
+            raise SwanAPIException(f"No private_key provided.")
+        if not self.contract_info:
+            raise SwanAPIException(f"No contract info on record, please verify contract first.")
+        
+        contract = self.contract_factory.get(private_key)
+        pay = contract.renew_payment if renew else contract.submit_payment
+    
+        tx_hash = pay(task_uuid=task_uuid, hardware_id=hardware_id, duration=duration)
+        logging.info(f"Payment submitted, {task_uuid=}, {duration=}, {hardware_id=}. Got {tx_hash=}")
+        return tx_hash
+
+    @tracing.traced()
     def validate_payment(
             self,
             tx_hash,
@@ -501,28 +901,33 @@ class Orchestrator(APIClient):
         """
         
         try:
-            if tx_hash and task_uuid:
-                params = {
-                    "tx_hash": tx_hash,
-                    "task_uuid": task_uuid
-                }
-                result = self._request_with_params(
-                    POST, 
-                    '/v2/task_payment_validate', 
-                    self.swan_url, 
-                    params, 
-                    self.token, 
-                    None
-                )
-                logging.info(f"Payment validation request sent, {task_uuid=}, {tx_hash=}")
-                return result
-            else:
-                raise SwanAPIException(f"{tx_hash=} or {task_uuid=} invalid")
+            return self._validate_payment(tx_hash, task_uuid)
         except Exception as e:
             logging.error(str(e) + traceback.format_exc())
             return None
+
+    def _validate_payment(self, tx_hash, task_uuid):
+        """Body of `validate_payment`, raises on failure."""
+        if tx_hash and task_uuid:
+            params = {
+                "tx_hash": tx_hash,
+                "task_uuid": task_uuid
+            }
+            result = self._request_with_params(
+                POST, 
+                '/v2/task_payment_validate', 
+                self.swan_url, 
+                params, 
+                self.token, 
+                None
+            )
+            logging.info(f"Payment validation request sent, {task_uuid=}, {tx_hash=}")
+            return result
+        else:
+            raise SwanAPIException(f"{tx_hash=} or {task_uuid=} invalid")
     
-    def make_payment(self, task_uuid, private_key, duration=3600, hardware_id = None):
+    @tracing.traced()
+    def make_payment(self, task_uuid, private_key, duration=3600, hardware_id = None, deadline=None):
         """
         Submit payment for a task and validate it on SWAN backend
 
@@ -530,38 +935,45 @@ class Orchestrator(APIClient):
             task_uuid: unique id returned by `swan_api.create_task`
             hardware_id: id of cp/hardware configuration set
             duration: duration of service runtime (seconds).
+            deadline: Optional. Deadline or seconds, the time budget of payment and validation.
         
         Returns:
             JSON response from backend server including 'task_uuid'.
+            When the deadline ends the call, a response with status "incomplete" and the `tx_hash` if sent.
         """
+        progress = {"phase": "payment", "task_uuid": task_uuid}
+        with deadlines.scope(deadline) as current:
+            try:
+                return self._make_payment(task_uuid, private_key, duration, hardware_id, progress)
+            except Exception as e:
+                if current is not None and current.expired:
+                    logging.error(f"{e} after phase {progress['phase']}")
+                    return _incomplete(current, e, progress)
+                logging.error(str(e) + traceback.format_exc())
+                return None
+
+    def _make_payment(self, task_uuid, private_key, duration, hardware_id, progress):
+        """Body of `make_payment`, raises on failure and records the phase and tx_hash in `progress`."""
         try:
-            if hardware_id is None:
-                raise SwanAPIException(f"Invalid hardware_id") 
-            
-            if not private_key:
-                raise SwanAPIException(f"No private_key provided.")
-            if not self.contract_info:
-                raise SwanAPIException(f"No contract info on record, please verify contract first.")
-            
-            if tx_hash := self.submit_payment(
-                task_uuid=task_uuid, 
-                duration=duration, 
-                private_key=private_key, 
-                hardware_id=hardware_id
-            ):
-                time.sleep(3)
-                if res := self.validate_payment(
-                    tx_hash=tx_hash, 
-                    task_uuid=task_uuid
-                ):
-                    res['tx_hash'] = tx_hash
-                    logging.info(f"Payment submitted and validated successfully, {task_uuid=}, {tx_hash=}")
-                    return res
-        except Exception as e:
-            logging.error(str(e) + traceback.format_exc())
-        return None
+            tx_hash = self._send_payment(task_uuid, private_key, duration, hardware_id)
+        except SwanDeadlineExceeded as e:
+            # sent but not seen mined, the caller may still validate it later
+            progress["tx_hash"] = e.tx_hash
+            raise
+        progress.update(phase="validation", tx_hash=tx_hash)
+        with tracing.span("make_payment.wait", seconds=VALIDATE_PAYMENT_DELAY):
+            deadlines.sleep(VALIDATE_PAYMENT_DELAY, what="payment validation")
+        res = self._validate_payment(tx_hash=tx_hash, task_uuid=task_uuid)
+        if not res:
+            raise SwanAPIException(f"Payment validation failed, {task_uuid=}, {tx_hash=}")
+        res['tx_hash'] = tx_hash
+        if self.inventory is not None:
+            self.inventory.record_payment(task_uuid, tx_hash)
+        logging.info(f"Payment submitted and validated successfully, {task_uuid=}, {tx_hash=}")
+        return res
     
 
+    @tracing.traced()
     def renew_task(
             self, 
             task_uuid: str, 
@@ -569,7 +981,8 @@ class Orchestrator(APIClient):
             tx_hash = "", 
             auto_pay = False, 
             private_key = None, 
-            hardware_id = None
+            hardware_id = None,
+            deadline = None
         ):
         """
         Submit payment for a task renewal and renew a task
@@ -578,51 +991,70 @@ class Orchestrator(APIClient):
             task_uuid: unique id returned by `swan_api.create_task`
             hardware_id: id of cp/hardware configuration set
             duration: duration of service runtime (seconds).
+            deadline: Optional. Deadline or seconds, the time budget of payment and renewal.
         
         Returns:
             JSON response from backend server including 'task_uuid'.
+            When the deadline ends the call, a response with status "incomplete" and the `tx_hash` if sent.
         """
-        try:
+        progress = {"phase": "payment", "task_uuid": task_uuid}
+        with deadlines.scope(deadline) as current:
+            try:
+                return self._renew_task(progress, task_uuid, duration, tx_hash, auto_pay, private_key, hardware_id)
+            except Exception as e:
+                if current is not None and current.expired:
+                    logging.error(f"{e} after phase {progress['phase']}")
+                    return _incomplete(current, e, progress)
+                logging.error(str(e) + traceback.format_exc())
+                return None
+
+    def _renew_task(self, progress, task_uuid, duration, tx_hash, auto_pay, private_key, hardware_id):
+        """Body of `renew_task`, raises on failure and records the phase and tx_hash in `progress`."""
+        if hardware_id is None:
+            hardware_id = self._task_hardware_id(task_uuid)
             if hardware_id is None:
                 hardware_id = self.hardware_id_free
-                if hardware_id is None:
-                    raise SwanAPIException(f"Invalid hardware_id")
-            
-            if not (auto_pay and private_key) and not tx_hash:
-                raise SwanAPIException(f"auto_pay off or tx_hash not provided, please provide a tx_hash or set auto_pay to True and provide private_key")
+            if hardware_id is None:
+                raise SwanAPIException(f"Invalid hardware_id")
+        
+        if not (auto_pay and private_key) and not tx_hash:
+            raise SwanAPIException(f"auto_pay off or tx_hash not provided, please provide a tx_hash or set auto_pay to True and provide private_key")
 
-            if not tx_hash:
-                tx_hash = self.renew_payment(task_uuid=task_uuid, duration=duration, private_key=private_key, hardware_id=hardware_id)
-            else:
-                logging.info(f"Using given payment transaction hash, {tx_hash=}")
+        if not tx_hash:
+            try:
+                tx_hash = self._send_payment(task_uuid, private_key, duration, hardware_id, renew=True)
+            except SwanDeadlineExceeded as e:
+                progress["tx_hash"] = e.tx_hash
+                raise
+        else:
+            logging.info(f"Using given payment transaction hash, {tx_hash=}")
 
-            if tx_hash and task_uuid:
-                params = {
-                    "task_uuid": task_uuid,
-                    "duration": duration,
-                    "tx_hash": tx_hash
-                }
+        progress.update(phase="renewal", tx_hash=tx_hash)
+        if tx_hash and task_uuid:
+            params = {
+                "task_uuid": task_uuid,
+                "duration": duration,
+                "tx_hash": tx_hash
+            }
 
-                result = self._request_with_params(
-                        POST, 
-                        RENEW_TASK, 
-                        self.swan_url, 
-                        params, 
-                        self.token, 
-                        None
-                    )
-                result.update({
-                    "tx_hash": tx_hash,
-                    "task_uuid": task_uuid
-                })
-                logging.info(f"Task renewal request sent successfully, {task_uuid=} {tx_hash=}, {duration=}")
-                return result
-            else:
-                raise SwanAPIException(f"{tx_hash=} or {task_uuid=} invalid")
-        except Exception as e:
-            logging.error(str(e) + traceback.format_exc())
-            return None
-        
+            result = self._request_with_params(
+                    POST, 
+                    RENEW_TASK, 
+                    self.swan_url, 
+                    params, 
+                    self.token, 
+                    None
+                )
+            result.update({
+                "tx_hash": tx_hash,
+                "task_uuid": task_uuid
+            })
+            if self.inventory is not None:
+                self.inventory.record_payment(task_uuid, tx_hash, kind="renewal")
+            logging.info(f"Task renewal request sent successfully, {task_uuid=} {tx_hash=}, {duration=}")
+            return result
+        else:
+            raise SwanAPIException(f"{tx_hash=} or {task_uuid=} invalid")
 
     def get_config_order_status(self, task_uuid: str, tx_hash: str):
         """
@@ -667,10 +1099,12 @@ class Orchestrator(APIClient):
             task_uuid: uuid of space task, in deployment response.
 
         Returns:
-            Deployment info.
+            DeploymentInfo, the JSON response with `task`, `jobs` and `real_urls` accessors.
         """
         try:
-            response = self._request_without_params(GET, DEPLOYMENT_INFO+task_uuid, self.swan_url, self.token)
+            response = as_model(DeploymentInfo, self._request_without_params(GET, DEPLOYMENT_INFO+task_uuid, self.swan_url, self.token))
+            if self.inventory is not None and response and response.get("data"):
+                self.inventory.update_from_deployment_info(task_uuid, response)
             return response
         except Exception as e:
             logging.error(str(e) + traceback.format_exc())
@@ -694,30 +1128,50 @@ class Orchestrator(APIClient):
 
     def get_payment_info(self):
         """Retrieve payment information from the orchestrator after making the payment.
+
+        The whole history is downloaded at once, use `iter_payments` for long histories.
+
+        Returns:
+            PaymentInfo, the JSON response with a `payments` accessor.
         """
         try:
-            payment_info = self._request_without_params(
+            payment_info = as_model(PaymentInfo, self._request_without_params(
                 GET, PROVIDER_PAYMENTS, self.swan_url, self.token
-            )
+            ))
             return payment_info
         except:
             logging.error("An error occurred while executing get_payment_info()")
             return None
 
-    def _verify_hardware_region(self, hardware_name: str, region: str):
+    def iter_payments(self, cursor=None, page_size: int = PAYMENTS_PAGE_SIZE):
+        """Iterate over the payment history page by page, in constant memory.
+
+        Args:
+            cursor: Optional. `cursor` of an earlier history or a timestamp, only later payments are returned.
+            page_size: Optional. Payments requested per page.
+
+        Returns:
+            PaymentHistory yielding Payment records, its `cursor` marks the newest payment seen.
+            Iterating raises SwanAPIException when the orchestrator fails to answer.
+        """
+        from swan.api.payments import PaymentHistory
+        return PaymentHistory(self, self.swan_url, self.token, page_size=page_size, cursor=cursor)
+
+    def _verify_hardware_region(self, hardware_name: str, region: str, hardware_snapshot=None):
         """Verify if the hardware exist in given region.
 
         Args:
             hardware_name: cfg name
             region: geological regions.
+            hardware_snapshot: Optional. HardwareSnapshot to check, the cached catalog is used if not given.
 
         Returns:
             True when hardware exist in given region.
             False when hardware does not exist or do not exit in given region.
         """
-        self.get_hardware_config()  # make sure all_hardware is updated all the time
-        for hardware in self.all_hardware:
-            if hardware.name == hardware_name:
-                if region in hardware.region or (region.lower() == 'global' and hardware.status == 'available'):
-                    return True
+        if hardware_snapshot is None:
+            hardware_snapshot = self._get_all_hardware()
+        for hardware in hardware_snapshot.named(hardware_name):
+            if region in hardware.region or (region.lower() == 'global' and hardware.status == 'available'):
+                return True
         return False
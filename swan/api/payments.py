@@ -0,0 +1,134 @@
+# ./swan/api/payments.py
+
+import logging
+
+from swan.common.codec import JSONArrayStream, loads
+from swan.common.constant import *
+from swan.common.exception import SwanAPIException
+from swan.object.response import Payment
+
+
+def parse_cursor(cursor):
+    """Split a payment cursor into (timestamp, tx_hashes at that timestamp).
+
+    Args:
+        cursor: PaymentHistory.cursor string, or a plain timestamp.
+    """
+    if cursor is None or cursor == "":
+        return None, frozenset()
+    if isinstance(cursor, (int, float)):
+        return float(cursor), frozenset()
+    timestamp, _, tx_hashes = str(cursor).partition(":")
+    return float(timestamp), frozenset(tx_hash for tx_hash in tx_hashes.split(",") if tx_hash)
+
+
+def format_cursor(timestamp, tx_hashes):
+    if timestamp is None:
+        return ""
+    timestamp = int(timestamp) if float(timestamp).is_integer() else timestamp
+    return f"{timestamp}:{','.join(sorted(tx_hashes))}"
+
+
+class PaymentHistory:
+    """Payment history of the account, read page by page.
+
+    Every page is streamed and decoded one record at a time, so memory stays
+    constant for any history length. A server ignoring the page parameters
+    sends the whole history in one response, it is streamed the same way.
+
+    After (or while) iterating, `cursor` marks the newest payment seen. Pass
+    it as `cursor` of a later `Orchestrator.iter_payments` to only get the
+    payments made since, e.g. for incremental reconciliation. Resuming relies
+    on the `created_at` of the records.
+
+    e.g.
+        history = orchestrator.iter_payments(cursor=saved_cursor)
+        for payment in history:
+            reconcile(payment.tx_hash, payment.amount)
+        saved_cursor = history.cursor
+    """
+
+    def __init__(self, client, swan_url: str, token: str, page_size: int = PAYMENTS_PAGE_SIZE, cursor=None, chunk_size: int = STREAM_CHUNK_SIZE):
+        """Initialize the history, nothing is requested before iterating.
+
+        Args:
+            client: APIClient doing the requests, e.g. an Orchestrator.
+            swan_url: orchestrator url.
+            token: orchestrator token.
+            page_size: Optional. Payments requested per page.
+            cursor: Optional. Cursor of an earlier history, or a timestamp, only later payments are yielded.
+            chunk_size: Optional. Bytes read from the response at a time.
+        """
+        self.client = client
+        self.swan_url = swan_url
+        self.token = token
+        self.page_size = page_size
+        self.chunk_size = chunk_size
+        self.pages = 0
+        self._since, self._seen_at_since = parse_cursor(cursor)
+        self._newest, self._seen_at_newest = self._since, set(self._seen_at_since)
+
+    @property
+    def cursor(self):
+        """Cursor of the newest payment seen, "" when none was seen."""
+        return format_cursor(self._newest, self._seen_at_newest)
+
+    def _is_new(self, payment):
+        if self._since is None:
+            return True
+        created_at = float(payment.created_at or 0)
+        return created_at > self._since or (created_at == self._since and payment.tx_hash not in self._seen_at_since)
+
+    def _advance(self, payment):
+        created_at = payment.created_at
+        if created_at is None:
+            return
+        created_at = float(created_at)
+        if self._newest is None or created_at > self._newest:
+            self._newest, self._seen_at_newest = created_at, {payment.tx_hash}
+        elif created_at == self._newest:
+            self._seen_at_newest.add(payment.tx_hash)
+
+    def _page(self, page: int):
+        """Stream one page, yields the raw payment records."""
+        response = self.client._open_stream(
+            PROVIDER_PAYMENTS, self.swan_url, {"page": page, "size": self.page_size}, self.token
+        )
+        try:
+            if response.status_code >= 400:
+                raise SwanAPIException(f"Payment history page {page} failed with HTTP {response.status_code}")
+            stream = JSONArrayStream(response.iter_content(self.chunk_size), ("payments", "data"))
+            yield from stream
+            if not stream.found:
+                try:
+                    message = loads(stream.head).get("message", "")
+                except ValueError:
+                    message = stream.head[:200]
+                raise SwanAPIException(f"Payment history page {page} failed: {message}")
+        finally:
+            response.close()
+
+    def __iter__(self):
+        page = 1
+        previous_first = None
+        while True:
+            count = 0
+            first = None
+            for record in self._page(page):
+                if count == 0:
+                    first = record
+                    # a server ignoring `page` sends the same full page again
+                    if first == previous_first:
+                        return
+                count += 1
+                payment = Payment(record)
+                self._advance(payment)
+                if self._is_new(payment):
+                    yield payment
+            self.pages += 1
+            logging.debug(f"Payment history page {page}, {count} payments")
+            if count != self.page_size:
+                # a short page is the last one, a longer one means the server does not paginate
+                return
+            previous_first = first
+            page += 1
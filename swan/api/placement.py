@@ -0,0 +1,158 @@
+# ./swan/api/placement.py
+
+import re
+from functools import lru_cache
+
+_VCPU = re.compile(r"(\d+)\s*vCPU", re.IGNORECASE)
+_MEMORY = re.compile(r"(\d+(?:\.\d+)?)\s*GiB", re.IGNORECASE)
+
+
+class HardwareSpec:
+    """Resources parsed from a `hardware_description`, e.g. 'Nvidia 3080 · 4 vCPU · 8 GiB'."""
+
+    __slots__ = ("vcpu", "memory", "gpu")
+
+    def __init__(self, vcpu: int = 0, memory: float = 0, gpu: str = None):
+        self.vcpu = vcpu
+        # GiB
+        self.memory = memory
+        self.gpu = gpu
+
+    def __repr__(self):
+        return f"HardwareSpec(vcpu={self.vcpu}, memory={self.memory}, gpu={self.gpu!r})"
+
+
+@lru_cache(maxsize=1024)
+def parse_spec(description: str):
+    """HardwareSpec of a hardware description, missing parts are 0 or None."""
+    description = description or ""
+    vcpu = _VCPU.search(description)
+    memory = _MEMORY.search(description)
+    first = description.split("·")[0].strip()
+    gpu = None if not first or first.lower().startswith("cpu") or _VCPU.search(first) or _MEMORY.search(first) else first
+    return HardwareSpec(int(vcpu.group(1)) if vcpu else 0, float(memory.group(1)) if memory else 0, gpu)
+
+
+class PlacementRequirements:
+    """What a task needs from its hardware.
+
+    e.g.
+        PlacementRequirements(hardware_type="GPU", gpu="3080", min_memory=8, regions=["Quebec-CA"], max_price=12)
+    """
+
+    def __init__(
+            self,
+            hardware_type: str = None,
+            min_vcpu: int = 0,
+            min_memory: float = 0,
+            gpu: str = None,
+            regions=None,
+            max_price: float = None,
+            available_only: bool = True,
+        ):
+        """Initialize requirements, anything not given is not restricted.
+
+        Args:
+            hardware_type: Optional. 'CPU' or 'GPU'.
+            min_vcpu: Optional. Minimum number of vCPUs.
+            min_memory: Optional. Minimum memory in GiB.
+            gpu: Optional. Text the GPU model has to contain, e.g. '3080'.
+            regions: Optional. Allowed regions in order of preference, any region if not given or 'global'.
+            max_price: Optional. Highest price per hour in SWAN.
+            available_only: Optional. Skip hardware that is not available (Default = True).
+        """
+        self.hardware_type = hardware_type
+        self.min_vcpu = min_vcpu
+        self.min_memory = min_memory
+        self.gpu = gpu
+        if isinstance(regions, str):
+            regions = [regions]
+        self.regions = None if not regions or any(region.lower() == "global" for region in regions) else list(regions)
+        self.max_price = max_price
+        self.available_only = available_only
+
+    @classmethod
+    def of(cls, requirements):
+        """Requirements from a PlacementRequirements or a dict of its arguments."""
+        if requirements is None or isinstance(requirements, cls):
+            return requirements or cls()
+        return cls(**requirements)
+
+    def accepts(self, hardware, spec: HardwareSpec):
+        if self.available_only and hardware.status != "available":
+            return False
+        if self.hardware_type and (hardware.type or "").upper() != self.hardware_type.upper():
+            return False
+        if spec.vcpu < self.min_vcpu or spec.memory < self.min_memory:
+            return False
+        if self.gpu and (spec.gpu is None or self.gpu.lower() not in spec.gpu.lower()):
+            return False
+        if self.max_price is not None and _price(hardware) > self.max_price:
+            return False
+        return True
+
+
+class Placement:
+    """A hardware and region a task can be created on."""
+
+    __slots__ = ("hardware", "region", "price", "spec")
+
+    def __init__(self, hardware, region: str, price: float, spec: HardwareSpec):
+        self.hardware = hardware
+        self.region = region
+        self.price = price
+        self.spec = spec
+
+    @property
+    def hardware_id(self):
+        return self.hardware.id
+
+    def __repr__(self):
+        return f"Placement({self.hardware.name}, {self.region}, {self.price})"
+
+
+def _price(hardware):
+    try:
+        return float(hardware.price)
+    except (TypeError, ValueError):
+        return float("inf")
+
+
+def rank(hardware_snapshot, requirements=None):
+    """Hardware and regions meeting the requirements, best first.
+
+    Available hardware comes first, then the cheaper one, then the preferred
+    region, then the smaller spec, so a task does not take more than it needs.
+
+    Args:
+        hardware_snapshot: HardwareSnapshot to choose from.
+        requirements: Optional. PlacementRequirements or a dict of its arguments.
+
+    Returns:
+        list of Placement.
+    """
+    requirements = PlacementRequirements.of(requirements)
+    candidates = hardware_snapshot
+    if requirements.hardware_type:
+        candidates = hardware_snapshot.of_type(requirements.hardware_type)
+    placements = []
+    for hardware in candidates:
+        spec = parse_spec(hardware.description)
+        if not requirements.accepts(hardware, spec):
+            continue
+        price = _price(hardware)
+        if requirements.regions is None:
+            placements.append((0, Placement(hardware, "global", price, spec)))
+            continue
+        for preference, region in enumerate(requirements.regions):
+            if region in hardware.region:
+                placements.append((preference, Placement(hardware, region, price, spec)))
+    placements.sort(key=lambda item: (
+        item[1].hardware.status != "available",
+        item[1].price,
+        item[0],
+        item[1].spec.vcpu,
+        item[1].spec.memory,
+        item[1].hardware.id,
+    ))
+    return [placement for _, placement in placements]
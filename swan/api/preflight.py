@@ -0,0 +1,262 @@
+# ./swan/api/preflight.py
+
+import logging
+
+from swan.api.placement import rank
+from swan.common.concurrency import run_bounded
+from swan.common.constant import *
+
+
+class PreflightIssue:
+    """A problem found before launching, `index` is the task spec it concerns, None for the whole batch."""
+
+    __slots__ = ("index", "message")
+
+    def __init__(self, index, message: str):
+        self.index = index
+        self.message = message
+
+    def __str__(self):
+        return f"task {self.index}: {self.message}" if self.index is not None else self.message
+
+    def __repr__(self):
+        return f"PreflightIssue({self.index!r}, {self.message!r})"
+
+
+class PreflightReport:
+    """Everything wrong with a launch plan, found before anything is created or paid.
+
+    `ok` is True when no issue was found. `warnings` do not stop a launch,
+    e.g. the approval transaction a payment batch will send first.
+    """
+
+    def __init__(self, count: int):
+        self.count = count
+        self.issues = []
+        self.warnings = []
+        # per task spec, resolved hardware and region, and estimated cost in wei
+        self.hardware_ids = [None] * count
+        self.regions = [None] * count
+        self.costs = [None] * count
+        self.payer = None
+        self.balance = None
+        self.allowance = None
+
+    @property
+    def ok(self):
+        return not self.issues
+
+    @property
+    def total_cost(self):
+        return sum(cost for cost in self.costs if cost is not None)
+
+    def add_issue(self, index, message: str):
+        self.issues.append(PreflightIssue(index, message))
+
+    def issues_of(self, index: int):
+        return [issue for issue in self.issues if issue.index == index]
+
+    def __str__(self):
+        lines = [str(issue) for issue in self.issues]
+        lines += [f"warning: {warning}" for warning in self.warnings]
+        lines.append(
+            f"Preflight: {self.count} tasks, {len(self.issues)} issues, "
+            f"estimated cost {self.total_cost} wei"
+            + (f", balance {self.balance} wei" if self.balance is not None else "")
+            + "."
+        )
+        return "\n".join(lines)
+
+
+def _image_names(response):
+    """Names of the premade images, None when the response does not list them."""
+    if not isinstance(response, dict) or response.get("status") != "success":
+        return None
+    data = response.get("data")
+    if isinstance(data, dict) and "url" not in data:
+        return set(data)
+    if isinstance(data, list):
+        return {item.get("name") if isinstance(item, dict) else item for item in data}
+    return None
+
+
+class Preflight:
+    """Check a batch of task specs against the orchestrator and the chain in one pass.
+
+    The hardware list, the premade image list, the payer's SWAN balance,
+    allowance and gas, and the on-chain price of every hardware used are
+    fetched concurrently, once for the whole batch. Every spec is then
+    checked locally against the same snapshot.
+
+    e.g.
+        report = orchestrator.preflight([
+            {"wallet_address": "0x...", "hardware_id": 1, "region": "North Carolina-US", "app_repo_image": "hello_world"},
+        ] * 300, private_key=private_key)
+        if not report.ok:
+            print(report)
+    """
+
+    def __init__(self, orchestrator, private_key: str = None, wallet_address: str = None, require_allowance: bool = False, max_workers: int = BULK_MAX_WORKERS):
+        """Initialize preflight.
+
+        Args:
+            orchestrator: Orchestrator the tasks would be created with.
+            private_key: Optional. Private key of the paying wallet.
+            wallet_address: Optional. Paying wallet address when no private key is given.
+            require_allowance: Optional. Report a too small allowance as an issue instead of a warning.
+            max_workers: Optional. Maximum number of requests in flight.
+        """
+        self.orchestrator = orchestrator
+        self.private_key = private_key
+        self.wallet_address = wallet_address
+        self.require_allowance = require_allowance
+        self.max_workers = max_workers
+
+    def _contract(self):
+        if self.orchestrator.contract_info is None:
+            return None
+        return self.orchestrator.contract_factory.get(self.private_key or "")
+
+    def _fetch(self, jobs):
+        """Run the named fetch jobs concurrently, returns dict of name -> result or exception."""
+        results = run_bounded(lambda job: job[1](), list(jobs.items()), max_workers=self.max_workers, retries=0)
+        return {job[0]: (error if error is not None else result) for job, result, error in results}
+
+    def run(self, specs):
+        """Check task specs.
+
+        Args:
+            specs: list of dicts of `create_task` arguments, e.g. wallet_address, hardware_id, region,
+            duration, app_repo_image, job_source_uri, repo_uri or placement.
+
+        Returns:
+            PreflightReport.
+        """
+        specs = list(specs)
+        report = PreflightReport(len(specs))
+        orchestrator = self.orchestrator
+        contract = self._contract()
+        payer = self.wallet_address
+        if contract is not None and contract.account is not None:
+            payer = contract.account.address
+        report.payer = payer
+
+        jobs = {
+            "hardware": orchestrator._get_all_hardware,
+            "images": lambda: orchestrator.get_app_repo_image(),
+        }
+        if contract is not None:
+            for hardware_id in {spec.get("hardware_id") for spec in specs if spec.get("hardware_id") is not None}:
+                jobs[("price", hardware_id)] = lambda hardware_id=hardware_id: contract.hardware_info(hardware_id)
+            if payer:
+                jobs["balance"] = lambda: contract._get_swan_balance(payer)
+                jobs["allowance"] = lambda: contract.get_allowance(payer)
+                jobs["gas"] = lambda: contract.w3.eth.get_balance(payer)
+        fetched = self._fetch(jobs)
+
+        snapshot = fetched["hardware"]
+        if isinstance(snapshot, Exception):
+            report.add_issue(None, f"Hardware list unavailable: {snapshot}")
+            return report
+        images = _image_names(fetched["images"])
+        if images is None:
+            # no list to check against, look the names up one by one
+            names = {spec["app_repo_image"] for spec in specs if spec.get("app_repo_image") and not spec.get("job_source_uri")}
+            lookups = self._fetch({name: lambda name=name: orchestrator.get_app_repo_image(name) for name in names})
+            images = {
+                name for name, response in lookups.items()
+                if isinstance(response, dict) and response.get("status") == "success"
+            }
+
+        for index, spec in enumerate(specs):
+            self._check_spec(report, index, spec, snapshot, images)
+
+        if contract is None:
+            report.warnings.append("No contract info, payments not checked")
+            return report
+        # hardware chosen by placement is only known now
+        missing = {hardware_id for hardware_id in report.hardware_ids if hardware_id is not None and ("price", hardware_id) not in fetched}
+        if missing:
+            fetched.update(self._fetch({("price", hardware_id): lambda hardware_id=hardware_id: contract.hardware_info(hardware_id) for hardware_id in missing}))
+        self._check_costs(report, specs, fetched)
+        self._check_funding(report, fetched)
+        logging.info(f"Preflight of {len(specs)} tasks: {len(report.issues)} issues, estimated cost {report.total_cost} wei")
+        return report
+
+    def _check_spec(self, report, index, spec, snapshot, images):
+        if not spec.get("wallet_address"):
+            report.add_issue(index, "No wallet_address")
+        try:
+            if int(spec.get("duration", 3600)) <= 0:
+                report.add_issue(index, "duration must be positive")
+        except (TypeError, ValueError):
+            report.add_issue(index, f"Invalid duration {spec.get('duration')!r}")
+
+        hardware_id = spec.get("hardware_id")
+        region = spec.get("region") or "global"
+        if hardware_id is None and spec.get("placement") is not None:
+            placements = rank(snapshot, spec["placement"])
+            if not placements:
+                report.add_issue(index, "No hardware meets the placement requirements")
+            else:
+                hardware_id, region = placements[0].hardware_id, placements[0].region
+        elif hardware_id is None:
+            hardware_id = self.orchestrator.hardware_id_free
+        if hardware_id is not None:
+            hardware = snapshot.get(hardware_id)
+            if hardware is None:
+                report.add_issue(index, f"Invalid hardware_id {hardware_id}")
+                hardware_id = None
+            elif not self.orchestrator._verify_hardware_region(hardware.name, region, snapshot):
+                report.add_issue(index, f"No {hardware.name} machine in {region}")
+            elif hardware.status != "available":
+                report.add_issue(index, f"{hardware.name} is {hardware.status}")
+        report.hardware_ids[index] = hardware_id
+        report.regions[index] = region
+
+        image = spec.get("app_repo_image")
+        if not (spec.get("job_source_uri") or image or spec.get("repo_uri")):
+            report.add_issue(index, "Please provide app_repo_image, or job_source_uri, or repo_uri")
+        elif image and not spec.get("job_source_uri") and image not in images:
+            report.add_issue(index, f"Invalid app_repo_image {image}")
+
+    def _check_costs(self, report, specs, fetched):
+        for index, spec in enumerate(specs):
+            hardware_id = report.hardware_ids[index]
+            if hardware_id is None:
+                continue
+            info = fetched.get(("price", hardware_id))
+            if isinstance(info, Exception) or info is None:
+                report.add_issue(index, f"Price of hardware {hardware_id} unavailable: {info}")
+                continue
+            _, price, active = info
+            if not active:
+                report.add_issue(index, f"Hardware {hardware_id} is not payable on chain")
+            try:
+                report.costs[index] = int(price * (int(spec.get("duration", 3600))/3600))
+            except (TypeError, ValueError):
+                pass
+
+    def _check_funding(self, report, fetched):
+        if not report.payer:
+            report.warnings.append("No paying wallet, balance and allowance not checked")
+            return
+        total = report.total_cost
+        balance, allowance, gas = fetched.get("balance"), fetched.get("allowance"), fetched.get("gas")
+        for name, value in (("SWAN balance", balance), ("allowance", allowance), ("gas balance", gas)):
+            if isinstance(value, Exception):
+                report.add_issue(None, f"{name} of {report.payer} unavailable: {value}")
+        if not isinstance(balance, Exception):
+            report.balance = balance
+            if balance < total:
+                report.add_issue(None, f"SWAN balance {balance} wei of {report.payer} is below the estimated total {total} wei")
+        if not isinstance(allowance, Exception):
+            report.allowance = allowance
+            if allowance < total:
+                message = f"Allowance {allowance} wei is below the estimated total {total} wei"
+                if self.require_allowance:
+                    report.add_issue(None, message)
+                else:
+                    report.warnings.append(message + ", payments approve it first")
+        if not isinstance(gas, Exception) and total and gas == 0:
+            report.add_issue(None, f"{report.payer} has no gas to send payments")
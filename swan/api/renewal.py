@@ -0,0 +1,286 @@
+# ./swan/api/renewal.py
+
+import logging
+import threading
+import time
+import traceback
+from collections import deque
+
+from swan.api.inventory import is_final_status
+from swan.common.constant import *
+from swan.common.exception import SwanAPIException
+
+
+def task_hardware_id(orchestrator, task_uuid: str, task_info: dict):
+    """hardware_id a task runs on, None when it cannot be told.
+
+    Args:
+        orchestrator: Orchestrator whose hardware list and created tasks are searched.
+        task_uuid: uuid of the task.
+        task_info: 'task' object of the task's deployment info.
+    """
+    hardware_name = (task_info.get("task_detail") or {}).get("hardware")
+    matches = orchestrator._get_all_hardware().named(hardware_name) if hardware_name else ()
+    if matches:
+        return matches[0].id
+    return orchestrator._task_hardware_id(task_uuid)
+
+
+class RenewalStats:
+    """Counters and latencies of a RenewalScheduler."""
+
+    def __init__(self, max_samples: int = 1000):
+        self.renewed = 0
+        self.failed = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=max_samples)
+        self.errors = deque(maxlen=100)
+        self._lock = threading.Lock()
+
+    def record_success(self, task_uuid: str, latency: float):
+        with self._lock:
+            self.renewed += 1
+            self.latencies.append(latency)
+
+    def record_batch(self):
+        with self._lock:
+            self.batches += 1
+
+    def record_failure(self, task_uuid: str, error):
+        with self._lock:
+            self.failed += 1
+            self.errors.append((time.time(), task_uuid, str(error)))
+
+    def percentile(self, p: float):
+        """Renewal latency percentile in seconds, None without samples.
+
+        Args:
+            p: percentile between 0 and 100.
+        """
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def to_dict(self):
+        return {
+            "renewed": self.renewed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "latency_p50": self.percentile(50),
+            "latency_p99": self.percentile(99),
+        }
+
+
+class RenewalScheduler:
+    """Keep tasks alive by renewing them a lead time before they expire.
+
+    Tasks that become due close together are renewed as one batch: the SWAN
+    amount of the whole batch is approved once and the renewal payments are
+    sent back to back with consecutive nonces, then each renewal is reported
+    to the orchestrator. A payment the orchestrator did not take is kept
+    and only reported again on the next check, it is never paid twice.
+    Tasks that ended, expired or whose renewal payment failed max_failures
+    times in a row are untracked, a renewal of them would only revert again.
+    """
+
+    def __init__(
+            self,
+            orchestrator,
+            private_key: str,
+            duration: int = 3600,
+            lead_time: float = 600,
+            batch_window: float = 60,
+            check_interval: float = 30,
+            max_failures: int = RENEWAL_MAX_FAILURES,
+        ):
+        """Initialize the scheduler.
+
+        Args:
+            orchestrator: Orchestrator used for deployment info and renewals.
+            private_key: private key of the paying wallet.
+            duration: Optional. Default renewal duration in seconds (Default = 3600).
+            lead_time: Optional. Renew this many seconds before expiry (Default = 600).
+            batch_window: Optional. Also renew tasks expiring this many seconds after the first due one, so they share its batch (Default = 60).
+            check_interval: Optional. Seconds between checks of the background thread (Default = 30).
+            max_failures: Optional. Consecutive failed renewals after which a task is untracked (Default = 3).
+        """
+        if not private_key:
+            raise SwanAPIException(f"No private_key provided.")
+        self.orchestrator = orchestrator
+        self.private_key = private_key
+        self.duration = duration
+        self.lead_time = lead_time
+        self.batch_window = batch_window
+        self.check_interval = check_interval
+        self.max_failures = max_failures
+        self.stats = RenewalStats()
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def track(self, task_uuid: str, hardware_id: int = None, duration: int = None, expires_at: float = None):
+        """Start renewing a task.
+
+        Args:
+            task_uuid: uuid of the task.
+            hardware_id: Optional. id of cp/hardware configuration set, read from deployment info if not given.
+            duration: Optional. Renewal duration in seconds, scheduler default if not given.
+            expires_at: Optional. Unix time the task ends, read from deployment info if not given.
+        """
+        with self._lock:
+            self._tasks[task_uuid] = {
+                "task_uuid": task_uuid,
+                "hardware_id": hardware_id,
+                "duration": duration or self.duration,
+                "expires_at": expires_at,
+                "failures": 0,
+                "stale": False,
+                "paid_tx_hash": None,
+            }
+
+    def untrack(self, task_uuid: str):
+        with self._lock:
+            self._tasks.pop(task_uuid, None)
+
+    def tracked(self):
+        with self._lock:
+            return {task_uuid: dict(task) for task_uuid, task in self._tasks.items()}
+
+    def _refresh(self, task: dict):
+        """Fill in expiry and hardware_id of a task from its deployment info."""
+        deployment_info = self.orchestrator.get_deployment_info(task["task_uuid"])
+        task_info = deployment_info["data"]["task"]
+        task["status"] = task_info.get("status")
+        task["expires_at"] = float(task_info["end_at"])
+        task["stale"] = False
+        if task["hardware_id"] is None:
+            hardware_id = task_hardware_id(self.orchestrator, task["task_uuid"], task_info)
+            task["hardware_id"] = hardware_id if hardware_id is not None else self.orchestrator.hardware_id_free
+
+    def due(self, now: float = None):
+        """Tasks to renew in the next batch.
+
+        Returns:
+            list of tracked task dicts, empty when no task is due yet.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            tasks = list(self._tasks.values())
+        for task in tasks:
+            if task["expires_at"] is None or task["hardware_id"] is None or task["stale"]:
+                expires_at = task["expires_at"]
+                try:
+                    self._refresh(task)
+                except Exception as e:
+                    logging.error(f"Failed to get expiry of {task['task_uuid']}: {e}")
+                    continue
+                if task["paid_tx_hash"] and expires_at is not None and task["expires_at"] > expires_at:
+                    # only the answer to the renew_task call was lost
+                    logging.info(f"Renewal {task['paid_tx_hash']} of {task['task_uuid']} was applied")
+                    task["paid_tx_hash"] = None
+        known = []
+        for task in tasks:
+            if task["expires_at"] is None:
+                continue
+            if is_final_status(task.get("status")) or task["expires_at"] <= now:
+                logging.warning(f"Task {task['task_uuid']} ended before its renewal, untracked")
+                self.untrack(task["task_uuid"])
+                continue
+            known.append(task)
+        if not any(task["expires_at"] - self.lead_time <= now for task in known):
+            return []
+        horizon = now + self.lead_time + self.batch_window
+        return [task for task in known if task["expires_at"] <= horizon]
+
+    def run_once(self, now: float = None):
+        """Renew all due tasks as one batch.
+
+        Returns:
+            dict of task_uuid -> renew_task response, None for a failed renewal.
+        """
+        with self._run_lock:
+            return self._renew(self.due(now))
+
+    def _renew(self, batch):
+        if not batch:
+            return {}
+        started = time.monotonic()
+        self.stats.record_batch()
+        results = {}
+        # tasks paid on an earlier check only need their renewal reported again
+        unpaid = [task for task in batch if not task["paid_tx_hash"]]
+        if unpaid:
+            try:
+                contract = self.orchestrator.contract_factory.get(self.private_key)
+                tx_hashes = contract.renew_payments(
+                    [(task["task_uuid"], task["hardware_id"], task["duration"]) for task in unpaid]
+                )
+            except Exception as e:
+                logging.error(f"Renewal batch failed: " + str(e) + traceback.format_exc())
+                tx_hashes = [e] * len(unpaid)
+            for task, tx_hash in zip(unpaid, tx_hashes):
+                if isinstance(tx_hash, Exception):
+                    self._failed(task, tx_hash)
+                    results[task["task_uuid"]] = None
+                else:
+                    task["failures"] = 0
+                    task["paid_tx_hash"] = tx_hash
+
+        for task in batch:
+            task_uuid = task["task_uuid"]
+            if not task["paid_tx_hash"]:
+                continue
+            result = self.orchestrator.renew_task(
+                task_uuid=task_uuid,
+                duration=task["duration"],
+                tx_hash=task["paid_tx_hash"],
+                hardware_id=task["hardware_id"]
+            )
+            if not result or result.get("status") == "failed":
+                # paid already, the next check reports the same payment again
+                self.stats.record_failure(task_uuid, f"renew_task failed, {result=}")
+                task["stale"] = True
+                results[task_uuid] = None
+                continue
+            task["paid_tx_hash"] = None
+            task["expires_at"] += task["duration"]
+            self.stats.record_success(task_uuid, time.monotonic() - started)
+            results[task_uuid] = result
+        logging.info(f"Renewal batch done, {len(batch)} tasks, {self.stats.to_dict()}")
+        return results
+
+    def _failed(self, task: dict, error):
+        """Count a failed renewal payment, untrack the task after max_failures in a row."""
+        self.stats.record_failure(task["task_uuid"], error)
+        task["failures"] += 1
+        # the task may have ended meanwhile, the next check reads its status again
+        task["stale"] = True
+        if task["failures"] >= self.max_failures:
+            logging.error(f"Renewal of {task['task_uuid']} failed {task['failures']} times, untracked: {error}")
+            self.untrack(task["task_uuid"])
+
+    def start(self):
+        """Start checking and renewing in a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="swan-renewal", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(str(e) + traceback.format_exc())
+            self._stop.wait(self.check_interval)
@@ -0,0 +1,258 @@
+# ./swan/api/watcher.py
+
+import logging
+import threading
+import time
+
+from swan.common.constant import *
+
+
+def is_available_in(hardware, region: str = "global"):
+    """True when hardware is available in region, any region for 'global'."""
+    if hardware.status != "available":
+        return False
+    return region.lower() == "global" or region in hardware.region
+
+
+class HardwareDiff:
+    """Hardware added, removed and changed between two snapshots, by hardware id."""
+
+    __slots__ = ("added", "removed", "changed")
+
+    def __init__(self, added=(), removed=(), changed=()):
+        self.added = list(added)
+        self.removed = list(removed)
+        # (old, new) HardwareConfig pairs
+        self.changed = list(changed)
+
+    @classmethod
+    def between(cls, old, new):
+        old_by_id = old.by_id if old is not None else {}
+        new_by_id = new.by_id if new is not None else {}
+        return cls(
+            [hardware for hardware_id, hardware in new_by_id.items() if hardware_id not in old_by_id],
+            [hardware for hardware_id, hardware in old_by_id.items() if hardware_id not in new_by_id],
+            [
+                (old_by_id[hardware_id], hardware) for hardware_id, hardware in new_by_id.items()
+                if hardware_id in old_by_id and old_by_id[hardware_id].to_dict() != hardware.to_dict()
+            ],
+        )
+
+    @property
+    def became_available(self):
+        """Hardware that is available now and was not before."""
+        return self.added_available + [new for old, new in self.changed if new.status == "available" and old.status != "available"]
+
+    @property
+    def added_available(self):
+        return [hardware for hardware in self.added if hardware.status == "available"]
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return f"HardwareDiff(added={len(self.added)}, removed={len(self.removed)}, changed={len(self.changed)})"
+
+
+class HardwareWatcher:
+    """Refresh a hardware catalog in the background while someone listens.
+
+    One daemon thread polls `/cp/machines` for all subscribers and waiters
+    of the catalog, however many there are. It polls every `min_interval`
+    seconds after a change or a new waiter, and backs off by `backoff` up to
+    `max_interval` while nothing changes. Refreshes go through the catalog,
+    so a fresh list fetched by anyone else saves a poll, and every poll
+    updates the list `create_task` checks. The thread ends when the last
+    subscriber or waiter leaves.
+
+    e.g.
+        watcher = orchestrator.hardware_watcher()
+        hardware = watcher.wait_for_capacity("G1ae.small", "Quebec-CA", timeout=600)
+    """
+
+    def __init__(
+            self,
+            catalog,
+            fetch,
+            min_interval: float = HARDWARE_WATCH_MIN_INTERVAL,
+            max_interval: float = HARDWARE_WATCH_MAX_INTERVAL,
+            backoff: float = HARDWARE_WATCH_BACKOFF,
+        ):
+        """Initialize watcher, polling starts with the first subscriber or waiter.
+
+        Args:
+            catalog: HardwareCatalog to refresh.
+            fetch: callable returning the raw `/cp/machines` response.
+            min_interval: Optional. Seconds between polls after a change.
+            max_interval: Optional. Longest seconds between polls.
+            backoff: Optional. Factor the interval grows by after a poll without change.
+        """
+        self.catalog = catalog
+        self.fetch = fetch
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = backoff
+        self.polls = 0
+        self._interval = min_interval
+        self._last_poll = 0.0
+        self._previous = catalog.hardware
+        # bumped on every change, waiters sleep until it moves
+        self._generation = 0
+        self._subscribers = []
+        self._waiters = 0
+        self._thread = None
+        self._stopped = False
+        self._wake = threading.Event()
+        self._condition = threading.Condition()
+
+    @property
+    def hardware(self):
+        """Latest HardwareSnapshot, None before the first fetch."""
+        return self.catalog.hardware
+
+    @property
+    def interval(self):
+        return self._interval
+
+    def subscribe(self, callback):
+        """Call `callback(diff, snapshot)` from the polling thread on every change.
+
+        Returns:
+            callback, to pass to `unsubscribe`.
+        """
+        with self._condition:
+            self._subscribers.append(callback)
+            self._stopped = False
+            self._ensure_running()
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._condition:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def stop(self):
+        """Stop polling, waiters return at their next check."""
+        with self._condition:
+            self._stopped = True
+            self._subscribers.clear()
+            self._condition.notify_all()
+        self._wake.set()
+
+    def refresh(self, max_age: float = 0):
+        """Poll now unless the catalog is younger than max_age.
+
+        Returns:
+            HardwareDiff against the previous snapshot, None when the fetch failed.
+        """
+        self.polls += 1
+        self._last_poll = time.monotonic()
+        try:
+            snapshot = self.catalog.get(self.fetch, max_age=max_age, force=max_age <= 0)
+        except Exception as e:
+            logging.warning(f"Hardware watcher poll failed: {e}")
+            with self._condition:
+                self._interval = self.max_interval
+            return None
+        with self._condition:
+            if snapshot is self._previous:
+                diff = HardwareDiff()
+            else:
+                diff = HardwareDiff.between(self._previous, snapshot)
+                self._previous = snapshot
+            if diff:
+                self._interval = self.min_interval
+                self._generation += 1
+                self._condition.notify_all()
+            else:
+                self._interval = min(self._interval * self.backoff, self.max_interval)
+            subscribers = list(self._subscribers) if diff else []
+        for callback in subscribers:
+            try:
+                callback(diff, snapshot)
+            except Exception as e:
+                logging.error(f"Hardware watcher subscriber failed: {e}")
+        return diff
+
+    def _ensure_running(self):
+        """Start the polling thread, called holding the condition."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="swan-hardware-watcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if self._stopped or not (self._subscribers or self._waiters):
+                    self._thread = None
+                    return
+                next_poll = self._last_poll + self._interval
+            delay = next_poll - time.monotonic()
+            if delay > 0:
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+            self.refresh(max_age=self.min_interval)
+
+    def wait_for(self, predicate, timeout: float = None):
+        """Block until `predicate(snapshot)` returns something truthy.
+
+        Args:
+            predicate: callable taking a HardwareSnapshot.
+            timeout: Optional. Seconds to wait at most, forever if not given.
+
+        Returns:
+            the predicate result, None on timeout or when the watcher is stopped.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._waiters += 1
+            self._stopped = False
+            # a new waiter wants an answer soon, polls speed up again
+            self._interval = self.min_interval
+            self._ensure_running()
+        self._wake.set()
+        try:
+            while True:
+                with self._condition:
+                    generation = self._generation
+                snapshot = self.catalog.hardware
+                if snapshot is not None:
+                    result = predicate(snapshot)
+                    if result:
+                        return result
+                with self._condition:
+                    while generation == self._generation and not self._stopped:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            return None
+                        self._condition.wait(remaining)
+                    if self._stopped:
+                        return None
+        finally:
+            with self._condition:
+                self._waiters -= 1
+
+    def wait_for_capacity(self, hardware_name: str = None, region: str = "global", hardware_id: int = None, timeout: float = None):
+        """Block until hardware is available in region.
+
+        Args:
+            hardware_name: Optional. cfg name, e.g. 'C1ae.medium'.
+            region: Optional. Region the hardware has to be in, any for 'global'.
+            hardware_id: Optional. id of the hardware instead of its name.
+            timeout: Optional. Seconds to wait at most, forever if not given.
+
+        Returns:
+            the available HardwareConfig, None on timeout.
+        """
+        def available(snapshot):
+            if hardware_id is not None:
+                candidates = [snapshot.get(hardware_id)] if snapshot.get(hardware_id) else []
+            else:
+                candidates = snapshot.named(hardware_name)
+            for hardware in candidates:
+                if is_available_in(hardware, region):
+                    return hardware
+            return None
+
+        return self.wait_for(available, timeout)
@@ -1,16 +1,126 @@
 # ./swan/api_client.py
 
 import requests
-import json
+import time
 
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 
-from swan.common.constant import GET, PUT, POST, DELETE
-from swan.common import utils
+from swan.common.constant import GET, PUT, POST, DELETE, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE
+from swan.common import codec, deadlines, metrics, utils, tracing
+from swan.common.exception import SwanDeadlineExceeded
+
+
+def new_http_session(pool_connections: int = HTTP_POOL_CONNECTIONS, pool_maxsize: int = HTTP_POOL_MAXSIZE):
+    """Create a pooled HTTP transport.
+
+    Args:
+        pool_connections: number of host pools to cache.
+        pool_maxsize: maximum number of keep-alive connections per host.
+
+    Returns:
+        requests.Session that reuses connections across requests.
+    """
+    http_session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    http_session.mount("https://", adapter)
+    http_session.mount("http://", adapter)
+    return http_session
+
+
+def _is_server_error(response):
+    return response is None or response.status_code >= 500
+
+
+def _not_connected(error):
+    """True when a request failed before reaching the server, it is safe to send it elsewhere."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError) or not error.args:
+        return False
+    # a MaxRetryError of a refused or unresolved connection, not a connection lost while sending
+    return isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
 
 
 class APIClient(object):
 
+    def __init__(self, http_session: requests.Session = None):
+        """Initialize API client.
+
+        Args:
+            http_session: Optional. Shared pooled transport, a new one is created if not given.
+        """
+        self.http_session = http_session if http_session is not None else new_http_session()
+        # EndpointPool of equivalent orchestrator urls, requests to any of them are routed over all
+        self.endpoints = None
+
     def _request(self, method, request_path, swan_api, params, token, files=False, json_body=False):
+        endpoint = metrics.endpoint_label(request_path)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            # bounded by the current deadline, no timeout outside of one
+            timeout = deadlines.timeout(what=f"{method} {request_path}")
+            with tracing.span("http.request", method=method, endpoint=request_path, server=swan_api) as span:
+                try:
+                    if self.endpoints is not None and swan_api in self.endpoints:
+                        response = self._send_routed(method, request_path, params, token, files, json_body, timeout)
+                    else:
+                        response = self._send(method, request_path, swan_api, params, token, files, json_body, timeout)
+                except requests.exceptions.Timeout as e:
+                    if timeout is None:
+                        raise
+                    raise SwanDeadlineExceeded(f"{method} {request_path} ran out of time") from e
+                status = str(response.status_code)
+                span.set_tag("http_status", response.status_code)
+                return self._decode(response)
+        finally:
+            metrics.HTTP_LATENCY.labels(method, endpoint).observe(time.perf_counter() - started)
+            metrics.HTTP_REQUESTS.labels(method, endpoint, status).inc()
+
+    def _open_stream(self, request_path, swan_api, params, token):
+        """GET without reading the body, the caller reads it with `iter_content` and closes the response."""
+        endpoint = metrics.endpoint_label(request_path)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            timeout = deadlines.timeout(what=f"{GET} {request_path}")
+            with tracing.span("http.request", method=GET, endpoint=request_path, server=swan_api, stream=True) as span:
+                header = {"Authorization": "Bearer " + token} if token else {}
+                path = request_path + (utils.parse_params_to_str(params) if params else "")
+                if self.endpoints is not None and swan_api in self.endpoints:
+                    # not hedged, the losing response would hold a connection until read
+                    response = self.endpoints.call(
+                        lambda url: self.http_session.get(url + path, headers=header, stream=True, timeout=timeout),
+                        is_error=_is_server_error,
+                    )
+                else:
+                    response = self.http_session.get(swan_api + path, headers=header, stream=True, timeout=timeout)
+                status = str(response.status_code)
+                span.set_tag("http_status", response.status_code)
+                return response
+        finally:
+            metrics.HTTP_LATENCY.labels(GET, endpoint).observe(time.perf_counter() - started)
+            metrics.HTTP_REQUESTS.labels(GET, endpoint, status).inc()
+
+    def _send_routed(self, method, request_path, params, token, files=False, json_body=False, timeout=None):
+        """Send over the endpoint pool, reads are hedged, writes only fail over when they could not connect."""
+        def send(swan_api):
+            return self._send(method, request_path, swan_api, params, token, files, json_body, timeout)
+
+        if method == GET:
+            return self.endpoints.call(send, hedge=True, is_error=_is_server_error)
+        return self.endpoints.call(send, failover=_not_connected)
+
+    @staticmethod
+    def _decode(response):
+        content = getattr(response, "content", None)
+        if isinstance(content, (bytes, str)):
+            return codec.loads(content)
+        # transports other than requests, e.g. test doubles, may only provide json()
+        return response.json()
+
+    def _send(self, method, request_path, swan_api, params, token, files=False, json_body=False, timeout=None):
         if method == GET:
             request_path = request_path + utils.parse_params_to_str(params)
         url = swan_api + request_path
@@ -18,31 +128,32 @@ class APIClient(object):
         if token:
             header["Authorization"] = "Bearer " + token
         # send request
+        http = self.http_session
         response = None
         if method == GET:
-            response = requests.get(url, headers=header)
+            response = http.get(url, headers=header, timeout=timeout)
         elif method == PUT:
             # body = json.dumps(params)
-            response = requests.put(url, data=params, headers=header)
+            response = http.put(url, data=params, headers=header, timeout=timeout)
         elif method == POST:
             if files:
                 body = params
-                response = requests.post(url, data=body, headers=header, files=files)
+                response = http.post(url, data=body, headers=header, files=files, timeout=timeout)
             else:
                 if json_body:
-                    body = json.dumps(params)
+                    body = codec.dumps(params)
                 else:
                     body = params
-                response = requests.post(url, data=body, headers=header)
+                response = http.post(url, data=body, headers=header, timeout=timeout)
         elif method == DELETE:
             if params:
-                body = json.dumps(params)
-                response = requests.delete(url, data=body, headers=header)
+                body = codec.dumps(params)
+                response = http.delete(url, data=body, headers=header, timeout=timeout)
             else:
-                response = requests.delete(url, headers=header)
+                response = http.delete(url, headers=header, timeout=timeout)
+
+        return response
 
-        return response.json()
-    
     def _request_without_params(self, method, request_path, swan_api, token):
         return self._request(method, request_path, swan_api, {}, token)
 
@@ -0,0 +1,265 @@
+# ./swan/cli.py
+
+"""Command line entry point for batch operations.
+
+Every command reads its items from a file or stdin, one per line, either a
+JSON object or a bare task uuid, and writes one JSON line per item to stdout
+as soon as the item is done.
+
+e.g.
+    swan status -i tasks.txt
+    cat launches.jsonl | swan create --wallet 0x... --private-key ...
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from swan.common.constant import BULK_MAX_WORKERS, VALIDATE_PAYMENT_DELAY
+
+
+def _read_items(path):
+    """Yield the items of a file or stdin ('-'), skipping blank and comment lines."""
+    stream = sys.stdin if path == "-" else open(path, "r")
+    try:
+        for line in stream:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                yield json.loads(line)
+            else:
+                yield {"task_uuid": line}
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _emit(record):
+    sys.stdout.write(json.dumps(record, default=str) + "\n")
+    sys.stdout.flush()
+
+
+def _emit_result(item, result, error, **extra):
+    """Write the outcome of an item, returns False when it failed or the orchestrator answered 'failed'."""
+    record = dict(item, **extra)
+    if error is not None:
+        record.update({"status": "failed", "message": str(error)})
+    else:
+        record["result"] = result
+    _emit(record)
+    return error is None and not (isinstance(result, dict) and result.get("status") == "failed")
+
+
+def _orchestrator(args, contract: bool = False):
+    """Build the orchestrator, verifying contract info only for commands that pay."""
+    from swan.api.orchestrator import Orchestrator
+
+    orchestrator = Orchestrator(
+        api_key=args.api_key,
+        network=args.network,
+        url_endpoint=args.url_endpoint,
+        verification=contract,
+    )
+    if not orchestrator.token:
+        raise SystemExit("login failed, api key is incorrect")
+    return orchestrator
+
+
+def cmd_status(args):
+    from swan.common.concurrency import iter_bounded
+
+    orchestrator = _orchestrator(args)
+
+    def status(item):
+        response = orchestrator.get_deployment_info(item["task_uuid"])
+        if response is None:
+            raise RuntimeError("deployment info request failed")
+        return response
+
+    ok = True
+    for item, result, error in iter_bounded(status, _read_items(args.input), max_workers=args.max_workers):
+        ok = _emit_result(item, result, error) and ok
+    return ok
+
+
+def cmd_terminate(args):
+    orchestrator = _orchestrator(args)
+    task_uuids = [item["task_uuid"] for item in _read_items(args.input)]
+    if args.claim:
+        results = orchestrator.teardown_tasks(task_uuids, max_workers=args.max_workers, rate_limit=args.rate_limit)
+    else:
+        results = orchestrator.terminate_tasks(task_uuids, max_workers=args.max_workers, rate_limit=args.rate_limit)
+    ok = True
+    for task_uuid, result in results.items():
+        failed = any(
+            (response or {}).get("status") == "failed"
+            for response in ([result] if not args.claim else result.values())
+        )
+        ok = ok and not failed
+        _emit({"task_uuid": task_uuid, "result": result})
+    return ok
+
+
+def cmd_estimate(args):
+    """Estimate from the catalog price, or from the payment contract with --onchain."""
+    orchestrator = _orchestrator(args, contract=args.onchain)
+    hardware = orchestrator._get_all_hardware()
+    ok = True
+    for item in _read_items(args.input):
+        hardware_id = item.get("hardware_id", 0)
+        duration = item.get("duration", 3600)
+        try:
+            if args.onchain:
+                amount = orchestrator.contract_factory.get().estimate_payment(hardware_id, duration/3600)
+                estimate = float(orchestrator.contract_factory.get()._wei_to_swan(amount))
+            else:
+                estimate = float(hardware.get(hardware_id).price) * duration / 3600
+            _emit(dict(item, estimate=estimate))
+        except Exception as e:
+            ok = False
+            _emit(dict(item, status="failed", message=str(e)))
+    return ok
+
+
+def cmd_create(args):
+    from swan.common.concurrency import iter_bounded, run_bounded
+
+    orchestrator = _orchestrator(args, contract=bool(args.private_key))
+
+    def create(item):
+        task_args = dict(item)
+        task_args.setdefault("wallet_address", args.wallet)
+        task_args.pop("private_key", None)
+        task_args["auto_pay"] = False
+        result = orchestrator.create_task(**task_args)
+        if not result or not result.get("task_uuid"):
+            raise RuntimeError("task creation failed")
+        return result
+
+    ok = True
+    created = []
+    # creates are not retried, a retry could start a second task
+    for item, result, error in iter_bounded(create, _read_items(args.input), max_workers=args.max_workers, retries=0):
+        if error is not None or not args.private_key:
+            ok = _emit_result(item, result, error) and ok
+        else:
+            created.append((item, result["task_uuid"], result.get("hardware_id", item.get("hardware_id"))))
+    if not created:
+        return ok
+
+    # the hardware create_task chose, e.g. from a placement
+    payments = [(task_uuid, hardware_id, item.get("duration", 3600)) for item, task_uuid, hardware_id in created]
+    try:
+        tx_hashes = orchestrator.contract_factory.get(args.private_key).submit_payments(payments)
+    except Exception as e:
+        # every created task is still printed, it can be paid for or terminated later
+        tx_hashes = [e] * len(payments)
+    if not all(isinstance(tx_hash, Exception) for tx_hash in tx_hashes):
+        time.sleep(VALIDATE_PAYMENT_DELAY)
+    paid = []
+    for (item, task_uuid, _), tx_hash in zip(created, tx_hashes):
+        if isinstance(tx_hash, Exception):
+            ok = _emit_result(item, None, tx_hash, task_uuid=task_uuid) and ok
+        else:
+            paid.append((item, task_uuid, tx_hash))
+    for (item, task_uuid, tx_hash), result, error in run_bounded(
+        lambda entry: orchestrator.validate_payment(tx_hash=entry[2], task_uuid=entry[1]),
+        paid,
+        max_workers=args.max_workers
+    ):
+        ok = _emit_result(item, result, error, task_uuid=task_uuid, tx_hash=tx_hash) and ok
+    return ok
+
+
+def cmd_renew(args):
+    from swan.api.renewal import task_hardware_id
+    from swan.common.concurrency import run_bounded
+
+    if not args.private_key:
+        raise SystemExit("renew needs --private-key or PRIVATE_KEY")
+    orchestrator = _orchestrator(args, contract=True)
+
+    def hardware_id(item):
+        """hardware_id of the item, else of the task's deployment info, a wrong one pays the wrong price."""
+        if item.get("hardware_id") is not None:
+            return item["hardware_id"]
+        deployment_info = orchestrator.get_deployment_info(item["task_uuid"])
+        if not deployment_info or not (deployment_info.get("data") or {}).get("task"):
+            raise RuntimeError("no deployment info, give the hardware_id of the task")
+        found = task_hardware_id(orchestrator, item["task_uuid"], deployment_info["data"]["task"])
+        if found is None:
+            raise RuntimeError("hardware of the task not found, give its hardware_id")
+        return found
+
+    ok = True
+    items = []
+    renewals = []
+    for item, found, error in run_bounded(hardware_id, _read_items(args.input), max_workers=args.max_workers):
+        if error is not None:
+            ok = _emit_result(item, None, error) and ok
+        else:
+            items.append(item)
+            renewals.append((item["task_uuid"], found, item.get("duration", 3600)))
+    if not renewals:
+        return ok
+    tx_hashes = orchestrator.contract_factory.get(args.private_key).renew_payments(renewals)
+    paid = []
+    for item, renewal, tx_hash in zip(items, renewals, tx_hashes):
+        if isinstance(tx_hash, Exception):
+            ok = _emit_result(item, None, tx_hash) and ok
+        else:
+            paid.append((item, renewal, tx_hash))
+    for (item, renewal, tx_hash), result, error in run_bounded(
+        lambda entry: orchestrator.renew_task(task_uuid=entry[1][0], duration=entry[1][2], tx_hash=entry[2], hardware_id=entry[1][1]),
+        paid,
+        max_workers=args.max_workers
+    ):
+        ok = _emit_result(item, result, error, tx_hash=tx_hash) and ok
+    return ok
+
+
+COMMANDS = {
+    "create": (cmd_create, "create tasks, paying for them when a private key is given"),
+    "status": (cmd_status, "get deployment info of tasks"),
+    "renew": (cmd_renew, "pay for and renew tasks"),
+    "terminate": (cmd_terminate, "terminate tasks"),
+    "estimate": (cmd_estimate, "estimate the price of hardware_id/duration items"),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="swan", description="Batch operations on Swan Orchestrator.")
+    parser.add_argument("--api-key", default=os.getenv("API_KEY"), help="Orchestrator API key (env API_KEY)")
+    parser.add_argument("--network", default=os.getenv("SWAN_NETWORK", "testnet"), choices=["testnet", "mainnet"])
+    parser.add_argument("--url-endpoint", default=None, help="Orchestrator url, overrides --network")
+    parser.add_argument("--max-workers", type=int, default=BULK_MAX_WORKERS, help="requests in flight")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress to stderr")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (func, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        subparser.add_argument("-i", "--input", default="-", help="file with one item per line, '-' for stdin")
+        subparser.set_defaults(func=func)
+        if name in ("create", "renew"):
+            subparser.add_argument("--private-key", default=os.getenv("PRIVATE_KEY"), help="wallet private key (env PRIVATE_KEY)")
+        if name == "create":
+            subparser.add_argument("--wallet", default=os.getenv("WALLET_ADDRESS"), help="default wallet address (env WALLET_ADDRESS)")
+        if name == "terminate":
+            subparser.add_argument("--claim", action="store_true", help="also claim review of each task")
+            subparser.add_argument("--rate-limit", type=float, default=None, help="requests started per second")
+        if name == "estimate":
+            subparser.add_argument("--onchain", action="store_true", help="read prices from the payment contract")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr)
+    return 0 if args.func(args) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# ./swan/common/codec.py
+
+"""JSON codec used for orchestrator responses and request bodies.
+
+orjson or msgspec is used when installed, the standard library otherwise.
+Both decode the response bytes directly, without the intermediate str and
+encoding detection of `requests.Response.json()`. The codec can be chosen
+with the SWAN_JSON_CODEC environment variable or `set_codec`.
+
+e.g.
+    from swan.common import codec
+    codec.set_codec("json")
+    codec.loads(b'{"status": "success"}')
+
+Signed payloads, e.g. the contract info, must not go through this codec:
+their signature covers the exact output of the standard library.
+"""
+
+import codecs
+import json
+import os
+import re
+import threading
+
+
+# a number of 20 digits does not fit in 64 bits, digits are mapped to "0" to find one with a substring search.
+# The payload is mapped one slice at a time, overlapping by 19 characters, so a large response is never
+# copied whole; a regular expression avoids the copy too but scans digit runs an order of magnitude slower.
+_DIGITS_TO_ZERO = bytes.maketrans(b"123456789", b"000000000")
+_DIGITS_TO_ZERO_STR = str.maketrans("123456789", "000000000")
+_LONG_NUMBER = "0" * 20
+_LONG_NUMBER_BYTES = _LONG_NUMBER.encode()
+_SCAN_CHUNK = 16 * 1024
+
+
+def _has_long_number(data):
+    if isinstance(data, str):
+        table, long_number = _DIGITS_TO_ZERO_STR, _LONG_NUMBER
+    else:
+        table, long_number = _DIGITS_TO_ZERO, _LONG_NUMBER_BYTES
+    overlap = len(long_number) - 1
+    for start in range(0, len(data), _SCAN_CHUNK):
+        if long_number in data[start:start + _SCAN_CHUNK + overlap].translate(table):
+            return True
+    return False
+
+
+class StdlibCodec:
+    name = "json"
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._loads = orjson.loads
+        self._dumps = orjson.dumps
+
+    def loads(self, data):
+        # orjson turns integers beyond 64 bits, e.g. amounts in wei, into floats
+        if _has_long_number(data):
+            return json.loads(data)
+        return self._loads(data)
+
+    def dumps(self, obj):
+        try:
+            return self._dumps(obj).decode()
+        except TypeError:
+            # integers beyond 64 bits, the standard library encodes them
+            return json.dumps(obj)
+
+
+class MsgspecCodec:
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+        self._decoder = msgspec.json.Decoder()
+        self._encoder = msgspec.json.Encoder()
+
+    def loads(self, data):
+        return self._decoder.decode(data)
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj).decode()
+
+
+# in order of preference
+CODECS = {
+    OrjsonCodec.name: OrjsonCodec,
+    MsgspecCodec.name: MsgspecCodec,
+    StdlibCodec.name: StdlibCodec,
+}
+
+_codec = None
+_lock = threading.Lock()
+
+
+def _default_codec():
+    requested = os.environ.get("SWAN_JSON_CODEC")
+    if requested:
+        return _new_codec(requested)
+    for codec_class in CODECS.values():
+        try:
+            return codec_class()
+        except ImportError:
+            continue
+
+
+def _new_codec(name: str):
+    codec_class = CODECS.get(name)
+    if codec_class is None:
+        raise ValueError(f"Unknown JSON codec {name}, expected one of {', '.join(CODECS)}")
+    return codec_class()
+
+
+def get_codec():
+    """The codec in use, the fastest installed one unless set."""
+    global _codec
+    if _codec is None:
+        with _lock:
+            if _codec is None:
+                _codec = _default_codec()
+    return _codec
+
+
+def set_codec(codec=None):
+    """Choose the codec.
+
+    Args:
+        codec: name in CODECS, an object with `loads` and `dumps`, or None to pick the default again.
+
+    Returns:
+        the codec in use.
+
+    Raises:
+        ValueError: for an unknown name.
+        ImportError: when the library of the named codec is not installed.
+    """
+    global _codec
+    with _lock:
+        _codec = _new_codec(codec) if isinstance(codec, str) else codec
+    return get_codec()
+
+
+def loads(data):
+    """Decode JSON from bytes or str."""
+    return get_codec().loads(data)
+
+
+def dumps(obj):
+    """Encode to a JSON str."""
+    return get_codec().dumps(obj)
+
+
+class JSONArrayStream:
+    """Items of a JSON array in a document arriving in chunks, decoded one by one.
+
+    Only the current item and the unread part of the last chunk are held in
+    memory, so an array of any length is read in constant memory. The array
+    is the first one found as the value of one of `keys`, e.g.
+    `JSONArrayStream(response.iter_content(65536), ("payments", "data"))`
+    yields the payments of `{"data": {"payments": [...]}}` or `{"data": [...]}`.
+    When no such array is in the document, iterating yields nothing and
+    `found` is False, `head` then holds the whole document, e.g. an error response.
+    """
+
+    def __init__(self, chunks, keys):
+        self._chunks = iter(chunks)
+        self._start = re.compile(r'"(?:' + "|".join(re.escape(key) for key in keys) + r')"\s*:\s*\[')
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self.found = False
+        self.head = ""
+        self.count = 0
+
+    def _read(self):
+        """Next decoded text, None at the end of the document."""
+        for chunk in self._chunks:
+            text = self._text_decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                return text
+        return None
+
+    def __iter__(self):
+        buffer = ""
+        while True:
+            match = self._start.search(buffer)
+            if match is not None:
+                break
+            text = self._read()
+            if text is None:
+                self.head = buffer
+                return
+            buffer += text
+        self.found = True
+        self.head = buffer[:match.start()]
+        buffer, index = buffer[match.end():], 0
+        eof = False
+        while True:
+            while index < len(buffer) and buffer[index] in " \t\r\n,":
+                index += 1
+            if index < len(buffer) and buffer[index] == "]":
+                return
+            try:
+                if index >= len(buffer):
+                    raise ValueError("incomplete")
+                item, end = self._decoder.raw_decode(buffer, index)
+                # a number may continue in the next chunk
+                if end == len(buffer) and not eof:
+                    raise ValueError("incomplete")
+            except ValueError:
+                if eof:
+                    raise ValueError(f"Truncated JSON array after {self.count} items")
+                text = self._read()
+                if text is None:
+                    eof = True
+                else:
+                    buffer = buffer[index:] + text
+                    index = 0
+                continue
+            self.count += 1
+            index = end
+            yield item
@@ -0,0 +1,147 @@
+# ./swan/common/concurrency.py
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from swan.common import deadlines, metrics, tracing
+from swan.common.constant import BULK_MAX_WORKERS, BULK_RETRIES, BULK_RETRY_BACKOFF
+from swan.common.exception import SwanDeadlineExceeded
+
+
+class RateLimiter:
+    """Token bucket limiting how many calls start per second, shared by all threads."""
+
+    def __init__(self, rate: float, burst: int = None):
+        """Initialize rate limiter.
+
+        Args:
+            rate: calls per second.
+            burst: Optional. Calls allowed at once after being idle, defaults to rate rounded up.
+        """
+        self.rate = float(rate)
+        self.burst = burst if burst is not None else max(1, int(rate + 0.999))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call may start."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def call_with_retries(func, retries: int = BULK_RETRIES, backoff: float = BULK_RETRY_BACKOFF, rate_limiter: RateLimiter = None):
+    """Call func, retrying with exponential backoff when it raises.
+
+    Args:
+        func: callable without arguments.
+        retries: number of retries after the first attempt.
+        backoff: seconds before the first retry, doubled on every retry.
+        rate_limiter: Optional. RateLimiter every attempt must pass.
+
+    Returns:
+        return value of func, the last exception is raised when all attempts fail.
+        A call ended by the current deadline is not retried, see `deadlines`.
+    """
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            with tracing.attempt(attempt):
+                return func()
+        except SwanDeadlineExceeded:
+            raise
+        except Exception:
+            if attempt >= retries:
+                raise
+            metrics.RETRIES.inc()
+            deadlines.sleep(backoff * (2 ** attempt), what="retry")
+            attempt += 1
+
+
+def run_bounded(
+        func,
+        items,
+        max_workers: int = BULK_MAX_WORKERS,
+        retries: int = BULK_RETRIES,
+        backoff: float = BULK_RETRY_BACKOFF,
+        rate_limit: float = None,
+    ):
+    """Call func for every item with bounded concurrency.
+
+    A failing item does not stop the others, its exception is returned in
+    place of its result.
+
+    Args:
+        func: callable taking one item.
+        items: iterable of items.
+        max_workers: maximum number of calls in flight.
+        retries: retries of a failing call.
+        backoff: seconds before the first retry, doubled on every retry.
+        rate_limit: Optional. Maximum calls started per second over all workers.
+
+    Returns:
+        list of (item, result, exception) tuples, in the order of items.
+    """
+    items = list(items)
+    rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    def run(item):
+        try:
+            return item, call_with_retries(lambda: func(item), retries, backoff, rate_limiter), None
+        except Exception as e:
+            logging.error(f"Failed on {item}: {e}")
+            return item, None, e
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        # workers run in a copy of the caller's context, their spans nest under the caller's span
+        futures = [executor.submit(contextvars.copy_context().run, run, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def iter_bounded(
+        func,
+        items,
+        max_workers: int = BULK_MAX_WORKERS,
+        retries: int = BULK_RETRIES,
+        backoff: float = BULK_RETRY_BACKOFF,
+        rate_limit: float = None,
+    ):
+    """Like `run_bounded`, but yield each (item, result, exception) as soon as it is done.
+
+    Items are read lazily, at most max_workers ahead of the finished ones, so
+    long or unbounded inputs (e.g. stdin) stream through with constant memory.
+    """
+    rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    def run(item):
+        try:
+            return item, call_with_retries(lambda: func(item), retries, backoff, rate_limiter), None
+        except Exception as e:
+            logging.error(f"Failed on {item}: {e}")
+            return item, None, e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for item in items:
+            pending.add(executor.submit(contextvars.copy_context().run, run, item))
+            if len(pending) >= max_workers:
+                done = next(as_completed(pending))
+                pending.remove(done)
+                yield done.result()
+        for done in as_completed(pending):
+            yield done.result()
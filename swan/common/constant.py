@@ -35,4 +35,76 @@ CLIENT_CONTRACT_ABI = "ClientPayment.json"
 CONTRACT_TIMEOUT = 300
 MAX_DURATION = 1209600
 ORCHESTRATOR_PUBLIC_ADDRESS_TESTNET = "0x29eD49c8E973696D07E7927f748F6E5Eacd5516D"
-ORCHESTRATOR_PUBLIC_ADDRESS_MAINNET = "0x4B98086A20f3C19530AF32D21F85Bc6399358e20"
\ No newline at end of file
+ORCHESTRATOR_PUBLIC_ADDRESS_MAINNET = "0x4B98086A20f3C19530AF32D21F85Bc6399358e20"
+
+# Session
+HTTP_POOL_CONNECTIONS = 10
+HTTP_POOL_MAXSIZE = 32
+HARDWARE_CACHE_TTL = 10
+SESSION_POOL_SIZE = 32
+# hardware_id of created tasks kept by an Orchestrator as renewal default, least recently used dropped first
+TASK_HARDWARE_CACHE_SIZE = 10000
+
+# Bulk operations
+BULK_MAX_WORKERS = 8
+BULK_RETRIES = 2
+BULK_RETRY_BACKOFF = 0.5
+
+# Task lifecycle
+TASK_STATE_PENDING = "pending"
+TASK_STATE_CREATING = "creating"
+TASK_STATE_CREATED = "created"
+TASK_STATE_APPROVED = "approved"
+TASK_STATE_PAYING = "paying"
+TASK_STATE_PAID = "paid"
+TASK_STATE_VALIDATED = "validated"
+TASK_STATE_DEPLOYED = "deployed"
+VALIDATE_PAYMENT_DELAY = 3
+CREATING_RECONCILE_SLACK = 60
+RENEWAL_MAX_FAILURES = 3
+
+# Task inventory
+FINAL_TASK_STATUSES = ("completed", "terminated", "cancelled", "failed", "finished")
+INVENTORY_SYNC_MAX_AGE = 60
+
+# Payment history
+PAYMENTS_PAGE_SIZE = 100
+STREAM_CHUNK_SIZE = 65536
+
+# Transaction supervision
+TX_STUCK_BLOCKS = 3
+TX_FEE_BUMP = 1.25
+TX_MAX_FEE_PER_GAS = 50 * 10**9
+TX_POLL_INTERVAL = 1
+
+# Payment event index
+PAYMENT_INDEX_CHUNK_BLOCKS = 2000
+PAYMENT_INDEX_CONFIRMATIONS = 3
+PAYMENT_INDEX_MAX_WORKERS = 4
+
+# Hardware watcher
+HARDWARE_WATCH_MIN_INTERVAL = 2
+HARDWARE_WATCH_MAX_INTERVAL = 60
+HARDWARE_WATCH_BACKOFF = 2
+
+# Endpoint selection
+ENDPOINT_EWMA_ALPHA = 0.3
+ENDPOINT_FAILURE_THRESHOLD = 3
+ENDPOINT_COOLDOWN = 30
+ENDPOINT_HEDGE_QUANTILE = 0.9
+ENDPOINT_HEDGE_MIN_DELAY = 0.05
+ENDPOINT_HEDGE_WORKERS = 16
+ENDPOINT_LATENCY_WINDOW = 64
+
+# Bulk payment signing
+BULK_SIGN_MIN_BATCH = 32
+BULK_SIGN_MIN_PARALLEL = 256
+BULK_SIGN_CHUNKS_PER_PROCESS = 4
+BULK_GAS_MARGIN = 1.2
+BULK_BROADCAST_WORKERS = 8
+BULK_SIGN_WORKER_TIMEOUT = 60
+
+# Deadlines
+DEADLINE_POLL_INTERVAL = 0.25
+RECEIPT_POLL_INTERVAL = 0.1
+INCOMPLETE_STATUS = "incomplete"
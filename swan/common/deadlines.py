@@ -0,0 +1,168 @@
+# ./swan/common/deadlines.py
+
+"""Deadlines and cancellation of long SDK calls.
+
+A Deadline is an overall time budget that can also be cancelled from
+another thread. Entering `scope(deadline)` makes it the current deadline
+of the calling context. Like tracing spans, it reaches nested calls and
+`run_bounded` workers without being passed along. Blocking steps then
+bound themselves by what is left:
+- `APIClient._request` sets the HTTP timeout from it
+- `SwanContract.wait_for_receipt` and the transaction supervisor wait at most that long
+- the wait before payment validation in `make_payment` sleeps at most that long
+
+When the budget runs out or the deadline is cancelled they raise
+SwanDeadlineExceeded.
+
+e.g.
+    deadline = Deadline(120)
+    threading.Timer(10, deadline.cancel).start()
+    result = orchestrator.create_task(..., auto_pay=True, deadline=deadline)
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+
+from swan.common.constant import DEADLINE_POLL_INTERVAL
+from swan.common.exception import SwanDeadlineExceeded
+
+_current = contextvars.ContextVar("swan_current_deadline", default=None)
+
+
+class Deadline:
+    """Time budget of an operation, cancellable from any thread.
+
+    A deadline created inside the scope of another one ends at the earlier
+    of both and is cancelled with it.
+    """
+
+    def __init__(self, timeout: float = None, parent=None):
+        """Initialize deadline.
+
+        Args:
+            timeout: Optional. Seconds from now, no time limit if not given.
+            parent: Optional. Enclosing Deadline, the current one if not given.
+        """
+        self.expires_at = time.monotonic() + timeout if timeout is not None else None
+        self.parent = parent if parent is not None else _current.get()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop the operation, blocking steps return within DEADLINE_POLL_INTERVAL seconds."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def remaining(self):
+        """Seconds left, None without time limit, never below 0."""
+        remaining = None
+        if self.expires_at is not None:
+            remaining = max(self.expires_at - time.monotonic(), 0.0)
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining()
+            if parent_remaining is not None and (remaining is None or parent_remaining < remaining):
+                remaining = parent_remaining
+        return remaining
+
+    @property
+    def expired(self):
+        remaining = self.remaining()
+        return self.cancelled or (remaining is not None and remaining <= 0)
+
+    def check(self, what: str = "operation"):
+        """Raise SwanDeadlineExceeded when cancelled or out of time."""
+        if self.cancelled:
+            raise SwanDeadlineExceeded(f"{what} cancelled", cancelled=True)
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise SwanDeadlineExceeded(f"{what} ran out of time")
+
+    def timeout(self, default: float = None, what: str = "operation"):
+        """Seconds a blocking step may take, the lower of default and the time left.
+
+        Raises:
+            SwanDeadlineExceeded: when nothing is left.
+        """
+        self.check(what)
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return remaining if default is None else min(default, remaining)
+
+    def sleep(self, seconds: float, what: str = "operation"):
+        """Sleep, waking up early when cancelled.
+
+        Raises:
+            SwanDeadlineExceeded: when cancelled or out of time before the full sleep.
+        """
+        end = time.monotonic() + seconds
+        while True:
+            left = end - time.monotonic()
+            if left <= 0:
+                return
+            step = min(left, DEADLINE_POLL_INTERVAL)
+            remaining = self.remaining()
+            if remaining is not None:
+                step = min(step, remaining)
+            self.check(what)
+            if self._cancelled.wait(step):
+                self.check(what)
+
+    def __repr__(self):
+        return f"Deadline(remaining={self.remaining()!r}, cancelled={self.cancelled!r})"
+
+
+def current():
+    """Deadline of the calling context, None outside any scope."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def scope(deadline=None):
+    """Make a deadline current for the calls inside the block.
+
+    Args:
+        deadline: Optional. Deadline, or seconds for a new one nested in the current deadline.
+        None keeps the current deadline.
+
+    Yields:
+        the current Deadline, None when there is none.
+    """
+    if deadline is None:
+        yield _current.get()
+        return
+    if not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def check(what: str = "operation"):
+    """Raise SwanDeadlineExceeded when the current deadline is cancelled or out of time."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(what)
+
+
+def timeout(default: float = None, what: str = "operation"):
+    """Timeout for a blocking step under the current deadline, default outside any scope."""
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    return deadline.timeout(default, what)
+
+
+def sleep(seconds: float, what: str = "operation"):
+    """time.sleep that the current deadline cuts short."""
+    deadline = _current.get()
+    if deadline is None:
+        time.sleep(seconds)
+    else:
+        deadline.sleep(seconds, what)
@@ -0,0 +1,222 @@
+# ./swan/common/endpoints.py
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from swan.common import metrics
+from swan.common.constant import *
+
+
+class Endpoint:
+    """Latency and health of one base url."""
+
+    def __init__(self, url: str, order: int):
+        self.url = url
+        self.order = order
+        # exponentially weighted moving average of successful call seconds, None before the first one
+        self.latency = None
+        self.recent = deque(maxlen=ENDPOINT_LATENCY_WINDOW)
+        self.failures = 0
+        self.down_until = 0.0
+
+    @property
+    def healthy(self):
+        return self.failures < ENDPOINT_FAILURE_THRESHOLD or time.monotonic() >= self.down_until
+
+    def quantile(self, q: float):
+        """Latency quantile of the recent successful calls, None without any."""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def __repr__(self):
+        latency = f"{self.latency * 1000:.1f}ms" if self.latency is not None else "unmeasured"
+        return f"Endpoint({self.url}, {latency}, failures={self.failures})"
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _hedge_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(ENDPOINT_HEDGE_WORKERS, thread_name_prefix="swan-hedge")
+    return _executor
+
+
+class EndpointPool:
+    """Route calls over equivalent base urls, fastest healthy one first.
+
+    Every call is timed per endpoint. Healthy endpoints are tried in order
+    of their moving average latency, an endpoint not measured yet is tried
+    first so it gets a latency. An error or a result `is_error` rejects
+    moves the call to the next endpoint. An endpoint that just failed is
+    tried after those that did not, after `ENDPOINT_FAILURE_THRESHOLD`
+    failures in a row only as a last resort for `ENDPOINT_COOLDOWN` seconds.
+
+    A hedged call, for idempotent reads only, is also sent to the second
+    endpoint when the first has not answered within its recent p90 latency.
+    The first good answer wins, so one slow node does not set the tail
+    latency of every read.
+
+    e.g.
+        pool = EndpointPool(["https://orchestrator-a", "https://orchestrator-b"])
+        response = pool.call(lambda url: http.get(url + path), hedge=True)
+    """
+
+    def __init__(self, urls, hedge_quantile: float = ENDPOINT_HEDGE_QUANTILE, hedge_min_delay: float = ENDPOINT_HEDGE_MIN_DELAY):
+        """Initialize pool.
+
+        Args:
+            urls: base urls serving the same API, in order of preference while unmeasured.
+            hedge_quantile: Optional. Latency quantile of the first endpoint after which a read is hedged.
+            hedge_min_delay: Optional. Seconds a read waits at least before it is hedged.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            raise ValueError("An endpoint pool needs at least one url")
+        self.endpoints = [Endpoint(url, order) for order, url in enumerate(urls)]
+        self._by_url = {endpoint.url: endpoint for endpoint in self.endpoints}
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self):
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def __contains__(self, url):
+        return url in self._by_url
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def ranked(self):
+        """Endpoints in the order a call tries them, unhealthy ones last."""
+        with self._lock:
+            return sorted(self.endpoints, key=lambda endpoint: (
+                not endpoint.healthy,
+                endpoint.failures > 0,
+                endpoint.latency if endpoint.latency is not None else 0.0,
+                endpoint.order,
+            ))
+
+    def best(self):
+        return self.ranked()[0].url
+
+    def record(self, url: str, seconds: float = None, ok: bool = True):
+        """Record the outcome of a call made outside the pool."""
+        endpoint = self._by_url.get(url)
+        if endpoint is not None:
+            self._record(endpoint, seconds, ok)
+
+    def _record(self, endpoint: Endpoint, seconds: float, ok: bool):
+        with self._lock:
+            if not ok:
+                endpoint.failures += 1
+                if endpoint.failures >= ENDPOINT_FAILURE_THRESHOLD:
+                    endpoint.down_until = time.monotonic() + ENDPOINT_COOLDOWN
+                    if endpoint.failures == ENDPOINT_FAILURE_THRESHOLD:
+                        logging.warning(f"Endpoint {endpoint.url} failed {endpoint.failures} times, skipped for {ENDPOINT_COOLDOWN}s")
+                return
+            endpoint.failures = 0
+            if seconds is None:
+                return
+            endpoint.recent.append(seconds)
+            if endpoint.latency is None:
+                endpoint.latency = seconds
+            else:
+                endpoint.latency += ENDPOINT_EWMA_ALPHA * (seconds - endpoint.latency)
+
+    def _attempt(self, fn, endpoint: Endpoint, is_error):
+        """Call fn on one endpoint, returns (result, ok), exceptions are recorded and raised."""
+        started = time.perf_counter()
+        try:
+            result = fn(endpoint.url)
+        except Exception:
+            self._record(endpoint, None, False)
+            raise
+        ok = not (is_error is not None and is_error(result))
+        self._record(endpoint, time.perf_counter() - started, ok)
+        return result, ok
+
+    def _hedge_delay(self, endpoint: Endpoint):
+        quantile = endpoint.quantile(self.hedge_quantile)
+        return max(quantile if quantile is not None else self.hedge_min_delay, self.hedge_min_delay)
+
+    def _hedged(self, fn, first: Endpoint, second: Endpoint, is_error):
+        """Race two endpoints, returns the futures in order of completion, the winner first if any."""
+        executor = _hedge_executor()
+        primary = executor.submit(self._attempt, fn, first, is_error)
+        done, _ = wait([primary], timeout=self._hedge_delay(first))
+        if done:
+            return [primary], None
+        backup = executor.submit(self._attempt, fn, second, is_error)
+        pending = {primary, backup}
+        completed = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                completed.append(future)
+                if future.exception() is None and future.result()[1]:
+                    metrics.HEDGED_REQUESTS.labels("won" if future is backup else "lost").inc()
+                    # the slower call finishes in the background, its latency still counts
+                    return [future], None
+        metrics.HEDGED_REQUESTS.labels("failed").inc()
+        return completed, second
+
+    def call(self, fn, hedge: bool = False, is_error=None, failover=None):
+        """Call fn with the base url of the best endpoint, failing over to the others.
+
+        Args:
+            fn: callable taking a base url.
+            hedge: Optional. Also send the call to the second endpoint when the first is slow, idempotent calls only.
+            is_error: Optional. callable telling a result that should be tried on the next endpoint, e.g. HTTP 5xx.
+            failover: Optional. callable telling an exception that may be tried on the next endpoint, any if not given.
+
+        Returns:
+            result of the first good call, else the last rejected result.
+
+        Raises:
+            the exception of the last endpoint when no endpoint returned a result.
+        """
+        endpoints = self.ranked()
+        rejected, error = None, None
+        attempts = endpoints
+        if hedge and len(endpoints) > 1:
+            futures, used = self._hedged(fn, endpoints[0], endpoints[1], is_error)
+            for future in futures:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                result, ok = future.result()
+                if ok:
+                    return result
+                rejected = (result,)
+            attempts = endpoints[2:] if used is not None else endpoints[1:]
+            if error is not None and failover is not None and not failover(error):
+                raise error
+        for index, endpoint in enumerate(attempts):
+            if index > 0 or rejected is not None or error is not None:
+                metrics.ENDPOINT_FAILOVERS.inc()
+            try:
+                result, ok = self._attempt(fn, endpoint, is_error)
+            except Exception as e:
+                if failover is not None and not failover(e):
+                    raise
+                logging.debug(f"Endpoint {endpoint.url} failed: {e}")
+                error = e
+                continue
+            if ok:
+                return result
+            rejected = (result,)
+        if rejected is not None:
+            return rejected[0]
+        raise error
@@ -15,4 +15,15 @@ class SwanRequestException(Exception):
 
 
 class SwanParamsException(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class SwanDeadlineExceeded(SwanAPIException):
+    """An operation ran out of its deadline or was cancelled.
+
+    `tx_hash` is set when a transaction was sent but not seen mined.
+    """
+
+    def __init__(self, message: str = "", tx_hash: str = None, cancelled: bool = False):
+        super().__init__(message)
+        self.tx_hash = tx_hash
+        self.cancelled = cancelled
@@ -0,0 +1,95 @@
+# ./swan/common/journal.py
+
+import json
+import os
+import threading
+import time
+
+
+class TaskJournal:
+    """Append-only local journal of task lifecycle steps.
+
+    Every step is written as one JSON line and flushed to disk before the next
+    step starts, so after a crash the journal tells which network and chain
+    steps of a launch already happened.
+
+    e.g. a line of the journal ->
+    {"launch_id": "web-1", "state": "paid", "time": 1719606552.1, "tx_hash": "0x..."}
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        """Open a journal, replaying existing entries.
+
+        Args:
+            path: journal file path, created if it does not exist.
+            fsync: Optional. Force every entry to disk (Default = True).
+        """
+        self.path = path
+        self.fsync = fsync
+        self._records = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._replay()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _replay(self):
+        with open(self.path, "r", encoding="utf-8") as journal_file:
+            for line in journal_file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # a torn last line from a crash while writing
+                    continue
+                self._apply(entry)
+
+    def _apply(self, entry: dict):
+        record = self._records.setdefault(entry["launch_id"], {"launch_id": entry["launch_id"]})
+        if "error" not in entry:
+            record.pop("error", None)
+        record.update(entry)
+
+    def record(self, launch_id: str, state: str, **data):
+        """Write a lifecycle step.
+
+        Args:
+            launch_id: caller chosen unique id of the launch.
+            state: lifecycle state reached.
+            data: extra fields to keep, e.g. task_uuid or tx_hash.
+
+        Returns:
+            the merged record of the launch.
+        """
+        entry = {"launch_id": launch_id, "state": state, "time": time.time()}
+        entry.update(data)
+        line = json.dumps(entry)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._apply(entry)
+            return dict(self._records[launch_id])
+
+    def get(self, launch_id: str):
+        """Get the merged record of a launch, None if it was never journaled."""
+        with self._lock:
+            record = self._records.get(launch_id)
+            return dict(record) if record is not None else None
+
+    def records(self):
+        """Get the merged records of all launches."""
+        with self._lock:
+            return {launch_id: dict(record) for launch_id, record in self._records.items()}
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,306 @@
+# ./swan/common/metrics.py
+
+"""In-process metrics of the SDK with Prometheus text exposition.
+
+APIClient, the hardware catalog, the retry helpers and SwanContract record
+into the default REGISTRY. Metrics with labels are recorded through a child
+bound to the label values, e.g. `HTTP_REQUESTS.labels("GET", "/v2/task", "200").inc()`.
+Values are sharded per thread, recording is two dict lookups and an add
+without taking a lock.
+
+e.g.
+    from swan.common import metrics
+    print(metrics.REGISTRY.to_prometheus())
+    metrics.start_http_server(9100)
+"""
+
+import re
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+from threading import get_ident
+
+
+# seconds, from a cached lookup to a slow transaction confirmation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class _CounterChild:
+    """Counter values sharded per thread, each thread only adds to its own shard so no lock is taken."""
+
+    __slots__ = ("_shards",)
+
+    def __init__(self):
+        self._shards = {}
+
+    def inc(self, amount=1):
+        try:
+            self._shards[get_ident()][0] += amount
+        except KeyError:
+            self._shards[get_ident()] = [amount]
+
+    @property
+    def value(self):
+        return sum(shard[0] for shard in list(self._shards.values()))
+
+
+class _HistogramChild:
+    """Histogram sharded per thread, a shard holds the bucket counts followed by the sum."""
+
+    __slots__ = ("buckets", "_shards")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._shards = {}
+
+    def observe(self, value: float):
+        shard = self._shards.get(get_ident())
+        if shard is None:
+            shard = self._shards[get_ident()] = [0] * (len(self.buckets) + 1) + [0.0]
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """(bucket counts, sum, count) summed over all threads."""
+        totals = [0] * (len(self.buckets) + 1) + [0.0]
+        for shard in list(self._shards.values()):
+            for index, value in enumerate(shard):
+                totals[index] += value
+        counts = totals[:-1]
+        return counts, totals[-1], sum(counts)
+
+    @property
+    def sum(self):
+        return self.snapshot()[1]
+
+    @property
+    def count(self):
+        return self.snapshot()[2]
+
+    def quantile(self, q: float):
+        """Estimate a quantile (0 to 1) by interpolating inside its bucket, None without samples."""
+        counts, _, total = self.snapshot()
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help_text: str = "", labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Child bound to the label values, in the order of labelnames."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def children(self):
+        with self._lock:
+            return dict(self._children)
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+            if not self.labelnames:
+                self._default = self._children.setdefault((), self._new_child())
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. requests or gas spent."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def value(self, *values):
+        child = self._children.get(values)
+        return child.value if child is not None else 0
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets, e.g. latencies."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str = "", labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+
+class Registry:
+    """Named metrics of a process."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help_text: str = "", labelnames=()):
+        """Get or create a counter."""
+        return self._register(Counter, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str = "", labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Get or create a histogram."""
+        return self._register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def reset(self):
+        """Drop all recorded values, the metrics stay registered."""
+        for metric in self.metrics():
+            metric.clear()
+
+    def to_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for values, child in sorted(metric.children().items()):
+                labels = list(zip(metric.labelnames, values))
+                if metric.kind == "counter":
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(child.value)}")
+                    continue
+                counts, total, count = child.snapshot()
+                cumulative = 0
+                for bound, bucket_count in zip(metric.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    lines.append(f"{metric.name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        name + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+_ID_SEGMENT = re.compile(r"^(0x[0-9a-fA-F]+|[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}|[0-9a-fA-F]{16,}|\d+)$")
+
+
+@lru_cache(maxsize=1024)
+def endpoint_label(request_path: str):
+    """Request path with ids replaced by ':id', e.g. '/v2/task_deployment/<uuid>' -> '/v2/task_deployment/:id'."""
+    return "/".join(":id" if _ID_SEGMENT.match(segment) else segment for segment in request_path.split("/"))
+
+
+def start_http_server(port: int, addr: str = "", registry: Registry = None):
+    """Serve the metrics for Prometheus from a daemon thread.
+
+    Args:
+        port: port to listen on.
+        addr: Optional. Address to bind, all interfaces if not given.
+        registry: Optional. Registry to serve, the default REGISTRY if not given.
+
+    Returns:
+        the running http.server.ThreadingHTTPServer, call `shutdown()` to stop it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry or REGISTRY
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="swan-metrics", daemon=True).start()
+    return server
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "swan_http_requests_total", "Orchestrator requests.", ("method", "endpoint", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "swan_http_request_seconds", "Orchestrator request latency.", ("method", "endpoint")
+)
+RETRIES = REGISTRY.counter("swan_retries_total", "Retried calls of bulk operations.")
+CATALOG_LOOKUPS = REGISTRY.counter(
+    "swan_hardware_catalog_lookups_total", "Hardware catalog lookups by cache result.", ("result",)
+)
+RPC_REQUESTS = REGISTRY.counter("swan_rpc_requests_total", "Chain RPC calls.", ("method", "status"))
+RPC_LATENCY = REGISTRY.histogram("swan_rpc_request_seconds", "Chain RPC latency.", ("method",))
+TRANSACTIONS = REGISTRY.counter("swan_transactions_total", "Transactions sent and their outcome.", ("status",))
+TX_CONFIRMATION = REGISTRY.histogram(
+    "swan_tx_confirmation_seconds", "Seconds from sending a transaction to its receipt."
+)
+TX_REPLACEMENTS = REGISTRY.counter(
+    "swan_tx_replacements_total", "Stuck transactions re-sent with a higher fee."
+)
+GAS_USED = REGISTRY.counter("swan_gas_used_total", "Gas used by mined transactions.")
+FEES_PAID = REGISTRY.counter("swan_tx_fees_wei_total", "Fees paid by mined transactions in wei.")
+HEDGED_REQUESTS = REGISTRY.counter(
+    "swan_hedged_requests_total", "Reads sent to a second endpoint because the first was slow.", ("outcome",)
+)
+ENDPOINT_FAILOVERS = REGISTRY.counter("swan_endpoint_failovers_total", "Calls moved to another endpoint after an error.")
@@ -0,0 +1,279 @@
+# ./swan/common/tracing.py
+
+"""Latency tracing of SDK calls.
+
+Every phase of `create_task`, `make_payment` and `renew_task`, every
+`APIClient._request` and every RPC call of a SwanContract runs in a span.
+Spans go to the registered sinks; without a sink `span` returns a shared
+no-op object, so tracing costs nothing while disabled.
+
+e.g.
+    from swan.common import tracing
+    tracing.add_sink(tracing.LoggingSink())
+"""
+
+import contextvars
+import functools
+import logging
+import threading
+import time
+
+
+_current_span = contextvars.ContextVar("swan_current_span", default=None)
+_current_attempt = contextvars.ContextVar("swan_current_attempt", default=0)
+_sinks = ()
+_sinks_lock = threading.Lock()
+
+
+class Span:
+    """A timed phase of an SDK call with its tags."""
+
+    __slots__ = ("name", "tags", "parent", "start_time", "end_time", "error", "_started", "_token", "context")
+
+    def __init__(self, name: str, tags: dict, parent=None):
+        self.name = name
+        self.tags = tags
+        self.parent = parent
+        self.start_time = None
+        self.end_time = None
+        self.error = None
+        # free slot for sinks to keep their own object, e.g. an OpenTelemetry span
+        self.context = None
+
+    @property
+    def duration(self):
+        """Seconds from start to end, None while running."""
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def set_tag(self, key: str, value):
+        self.tags[key] = value
+
+    def __enter__(self):
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self._token = _current_span.set(self)
+        for sink in _sinks:
+            _notify(sink.on_start, self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_time = self.start_time + time.perf_counter() - self._started
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.error = exc
+            self.tags["status"] = "error"
+        else:
+            self.tags.setdefault("status", "ok")
+        for sink in _sinks:
+            _notify(sink.on_end, self)
+        return False
+
+
+class _NoopSpan:
+    """Span used while no sink is registered."""
+
+    __slots__ = ()
+    name = None
+    tags = {}
+    duration = None
+
+    def set_tag(self, key: str, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _notify(hook, span):
+    try:
+        hook(span)
+    except Exception as e:
+        logging.error(f"Tracing sink failed on {span.name}: {e}")
+
+
+class SpanSink:
+    """Receives finished spans, subclasses override `on_end` and optionally `on_start`."""
+
+    def on_start(self, span: Span):
+        pass
+
+    def on_end(self, span: Span):
+        pass
+
+
+class CallbackSink(SpanSink):
+    """Call a function with every finished span."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def on_end(self, span: Span):
+        self.callback(span)
+
+
+class LoggingSink(SpanSink):
+    """Log every finished span with its duration and tags."""
+
+    def __init__(self, logger: logging.Logger = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger("swan.tracing")
+        self.level = level
+
+    def on_end(self, span: Span):
+        tags = " ".join(f"{key}={value}" for key, value in span.tags.items())
+        self.logger.log(self.level, f"span {span.name} {span.duration * 1000:.1f}ms {tags}")
+
+
+class RecordingSink(SpanSink):
+    """Keep the last finished spans in memory, e.g. for tests and benchmarks."""
+
+    def __init__(self, max_spans: int = 10000):
+        self.max_spans = max_spans
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+            if len(self.spans) > self.max_spans:
+                del self.spans[:len(self.spans) - self.max_spans]
+
+    def named(self, name: str):
+        with self._lock:
+            return [span for span in self.spans if span.name == name]
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+
+class OpenTelemetrySink(SpanSink):
+    """Mirror spans into OpenTelemetry, nested like the SDK calls.
+
+    Needs the optional `opentelemetry-api` package.
+    """
+
+    def __init__(self, tracer=None):
+        """Initialize the sink.
+
+        Args:
+            tracer: Optional. OpenTelemetry tracer, the global 'swan' tracer if not given.
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError("OpenTelemetrySink needs opentelemetry-api, `pip install opentelemetry-api`")
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("swan")
+
+    def on_start(self, span: Span):
+        context = None
+        if span.parent is not None and span.parent.context is not None:
+            context = self._trace.set_span_in_context(span.parent.context)
+        span.context = self.tracer.start_span(
+            span.name, context=context, start_time=int(span.start_time * 1e9)
+        )
+
+    def on_end(self, span: Span):
+        otel_span = span.context
+        if otel_span is None:
+            return
+        for key, value in span.tags.items():
+            otel_span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+        if span.error is not None:
+            otel_span.record_exception(span.error)
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, str(span.error)))
+        otel_span.end(end_time=int(span.end_time * 1e9))
+
+
+def add_sink(sink: SpanSink):
+    """Register a sink, tracing is enabled while at least one sink is registered."""
+    global _sinks
+    with _sinks_lock:
+        _sinks = _sinks + (sink,)
+    return sink
+
+
+def remove_sink(sink: SpanSink):
+    global _sinks
+    with _sinks_lock:
+        _sinks = tuple(registered for registered in _sinks if registered is not sink)
+
+
+def clear_sinks():
+    global _sinks
+    with _sinks_lock:
+        _sinks = ()
+
+
+def enabled():
+    return bool(_sinks)
+
+
+def current_span():
+    """Innermost running span of this thread, None outside of any span."""
+    return _current_span.get()
+
+
+def span(name: str, **tags):
+    """Context manager timing a phase.
+
+    Args:
+        name: name of the phase, e.g. 'http.request'.
+        tags: tags of the span, e.g. endpoint='/v2/task'.
+
+    Returns:
+        Span, or a no-op span while tracing is disabled.
+    """
+    if not _sinks:
+        return NOOP_SPAN
+    attempt = _current_attempt.get()
+    if attempt:
+        tags["retries"] = attempt
+    return Span(name, tags, _current_span.get())
+
+
+class attempt:
+    """Mark the calls made inside as retry number `number`, spans get a 'retries' tag."""
+
+    __slots__ = ("number", "_token")
+
+    def __init__(self, number: int):
+        self.number = number
+
+    def __enter__(self):
+        self._token = _current_attempt.set(self.number)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_attempt.reset(self._token)
+        return False
+
+
+def traced(name: str = None):
+    """Decorator running every call of a function in a span.
+
+    The span status is 'failed' when the function returns None, the way
+    Orchestrator methods report errors.
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _sinks:
+                return func(*args, **kwargs)
+            with span(span_name) as active:
+                result = func(*args, **kwargs)
+                if result is None:
+                    active.set_tag("status", "failed")
+                return result
+        return wrapper
+    return decorator
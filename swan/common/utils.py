@@ -4,6 +4,7 @@ import os
 import json
 import re
 import datetime
+import functools
 
 def parse_params_to_str(params):
     url = "?"
@@ -36,8 +37,9 @@ def read_file_from_url(url):
         print("Failed to get file")
         return None
 
+@functools.lru_cache(maxsize=None)
 def get_contract_abi(abi_name: str):
-    """Get local contract directory.
+    """Get local contract directory, cached after the first read.
 
     Args:
         abi_name: name and extension of the ABI file.
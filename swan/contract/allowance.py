@@ -0,0 +1,87 @@
+# ./swan/contract/allowance.py
+
+import threading
+
+
+class AllowanceReservation:
+    """Amount of SWAN set aside for payments about to be sent."""
+
+    def __init__(self, amount: int, approve_tx_hash: str = None):
+        self.amount = amount
+        # approval sent to cover this reservation, None when the allowance already did
+        self.approve_tx_hash = approve_tx_hash
+
+
+class AllowanceTracker:
+    """Keep the allowance of one wallet covering every payment in flight.
+
+    approve replaces the allowance instead of adding to it, so a payment
+    that approves only its own amount takes the allowance away from payments
+    of the same wallet that were approved and not mined yet. Reservations
+    approve the amount of every reserved or sent, unmined payment instead,
+    and only when the allowance is short of it.
+    """
+
+    def __init__(self, contract):
+        """Initialize allowance tracker.
+
+        Args:
+            contract: SwanContract of the wallet.
+        """
+        self.contract = contract
+        self._held = set()
+        self._sent = {}
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        """Forget sent payments that were mined, the token contract already took their amount."""
+        from web3.exceptions import TransactionNotFound
+
+        for tx_hash in list(self._sent):
+            try:
+                receipt = self.contract.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+            except Exception:
+                # unknown yet, keep counting it
+                continue
+            if receipt is not None:
+                del self._sent[tx_hash]
+
+    def outstanding(self):
+        """Amount of reserved and sent, unmined payments."""
+        with self._lock:
+            self._prune()
+            return sum(reservation.amount for reservation in self._held) + sum(self._sent.values())
+
+    def reserve(self, amount: int):
+        """Set amount aside, approving what all payments in flight need when the allowance is short.
+
+        Returns:
+            AllowanceReservation, pass it to `sent` or `release` once the payments are sent or given up.
+        """
+        with self._lock:
+            self._prune()
+            needed = sum(reservation.amount for reservation in self._held) + sum(self._sent.values()) + amount
+            reservation = AllowanceReservation(amount)
+            if self.contract.get_allowance() < needed:
+                reservation.approve_tx_hash = self.contract._approve_payment(needed)
+            self._held.add(reservation)
+            return reservation
+
+    def sent(self, reservation, payments):
+        """Replace a reservation by the payments sent with it, counted until they are mined.
+
+        Args:
+            reservation: AllowanceReservation from `reserve`.
+            payments: list of (tx_hash, amount) of payments not seen mined yet.
+        """
+        with self._lock:
+            self._held.discard(reservation)
+            for tx_hash, amount in payments:
+                self._sent[tx_hash] = amount
+
+    def release(self, reservation):
+        """Drop a reservation whose payments were mined or never sent."""
+        with self._lock:
+            self._held.discard(reservation)
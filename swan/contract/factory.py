@@ -0,0 +1,75 @@
+# ./swan/contract/factory.py
+
+import threading
+
+from swan.contract.swan_contract import SwanContract, new_web3
+
+
+class SwanContractFactory:
+    """Build SwanContract objects that share one Web3 connection.
+
+    Contracts are cached per private key, so repeated payments from the same
+    wallet reuse the same contract objects.
+    """
+
+    def __init__(self, contract_info: dict, w3=None, rpc_urls=None):
+        """Initialize factory.
+
+        Args:
+            contract_info: contract detail from orchestrator, including rpc_url and contract addresses.
+            w3: Optional. Web3 connection to share, created from rpc_url on first use if not given.
+            rpc_urls: Optional. More rpc urls of the chain, the connection fails over between them and rpc_url.
+        """
+        self.contract_info = contract_info
+        self.rpc_urls = rpc_urls
+        self._w3 = w3
+        self._contracts = {}
+        self._supervision = None
+        self._lock = threading.Lock()
+
+    @property
+    def w3(self):
+        if self._w3 is None:
+            with self._lock:
+                if self._w3 is None:
+                    self._w3 = new_web3(self.contract_info["rpc_url"], rpc_urls=self.rpc_urls)
+        return self._w3
+
+    def get(self, private_key: str = ""):
+        """Get the contract for a wallet.
+
+        Args:
+            private_key: private key for wallet, "" for read only access.
+
+        Returns:
+            SwanContract object.
+        """
+        contract = self._contracts.get(private_key)
+        if contract is None:
+            w3 = self.w3
+            with self._lock:
+                contract = self._contracts.get(private_key)
+                if contract is None:
+                    contract = SwanContract(private_key, self.contract_info, w3=w3)
+                    self._supervise(contract)
+                    self._contracts[private_key] = contract
+        return contract
+
+    def supervise(self, enabled: bool = True, **options):
+        """Re-send stuck transactions of every contract with a higher fee.
+
+        Args:
+            enabled: Optional. False stops supervising.
+            options: TransactionSupervisor options, e.g. stuck_blocks, fee_bump, max_fee_per_gas, timeout.
+        """
+        with self._lock:
+            self._supervision = options if enabled else None
+            for contract in self._contracts.values():
+                self._supervise(contract)
+
+    def _supervise(self, contract):
+        if self._supervision is None or contract.account is None:
+            contract.supervisor = None
+            return
+        from swan.contract.supervisor import TransactionSupervisor
+        contract.supervisor = TransactionSupervisor(contract, **self._supervision)
@@ -0,0 +1,248 @@
+# ./swan/contract/indexer.py
+
+import json
+import logging
+import sqlite3
+import threading
+
+from swan.common import tracing
+from swan.common.concurrency import run_bounded
+from swan.common.constant import *
+from swan.common.exception import SwanAPIException
+from swan.common.utils import get_contract_abi
+from swan.object.response import Payment
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS payments (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    payer TEXT NOT NULL,
+    task_uuid TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS payments_task_uuid ON payments (task_uuid);
+CREATE INDEX IF NOT EXISTS payments_payer ON payments (payer);
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_COLUMNS = ("block_number", "log_index", "tx_hash", "payer", "task_uuid", "amount")
+
+
+def _payment_event_abi():
+    for entry in json.loads(get_contract_abi(CLIENT_CONTRACT_ABI)):
+        if entry.get("type") == "event" and entry.get("name") == "Payment":
+            return entry
+    raise SwanAPIException(f"No Payment event in {CLIENT_CONTRACT_ABI}")
+
+
+class PaymentIndexer:
+    """Local index of the `Payment` events of the ClientPayment contract.
+
+    Every submitted or renewed payment emits `Payment(payer, uuid, amount)`.
+    The indexer reads these logs in block ranges of `chunk_blocks`, several
+    ranges in flight at once, and keeps them in SQLite indexed by task uuid
+    and payer, so "was this task paid, by whom and how much" is a local query
+    instead of an orchestrator request or a receipt lookup per transaction.
+    `sync` continues from the last indexed block, call it again, or run
+    `follow`, to keep up with the chain tip. Blocks younger than
+    `confirmations` are left for a later sync, so a reorg near the tip does
+    not leave removed payments in the index.
+
+    e.g.
+        indexer = orchestrator.payment_indexer("payments.db")
+        indexer.sync()
+        indexer.amount_paid(task_uuid)
+    """
+
+    def __init__(
+            self,
+            contract,
+            path: str = ":memory:",
+            start_block: int = 0,
+            chunk_blocks: int = PAYMENT_INDEX_CHUNK_BLOCKS,
+            confirmations: int = PAYMENT_INDEX_CONFIRMATIONS,
+            max_workers: int = PAYMENT_INDEX_MAX_WORKERS,
+        ):
+        """Open the index, an existing one continues where it stopped.
+
+        Args:
+            contract: SwanContract, read only access is enough.
+            path: Optional. SQLite file of the index, kept in memory if not given.
+            start_block: Optional. First block to scan, e.g. the deployment block of the contract.
+            chunk_blocks: Optional. Blocks per eth_getLogs request.
+            confirmations: Optional. Blocks below the tip not indexed yet.
+            max_workers: Optional. eth_getLogs requests in flight at once.
+
+        Raises:
+            SwanAPIException: when the file indexes another contract.
+        """
+        from eth_utils import event_abi_to_log_topic
+
+        self.contract = contract
+        self.w3 = contract.w3
+        self.address = self.w3.to_checksum_address(contract.client_contract_addr)
+        self.chunk_blocks = max(int(chunk_blocks), 1)
+        self.confirmations = confirmations
+        self.max_workers = max_workers
+        event_abi = _payment_event_abi()
+        self._topic = self.w3.to_hex(event_abi_to_log_topic(event_abi))
+        self._types = [entry["type"] for entry in event_abi["inputs"]]
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.executescript(_SCHEMA)
+        indexed = self._state("address")
+        if indexed is None:
+            with self._db:
+                self._set_state("address", self.address)
+                self._set_state("next_block", str(start_block))
+        elif indexed != self.address:
+            raise SwanAPIException(f"{path} indexes the payments of {indexed}, not {self.address}")
+
+    def _state(self, key: str):
+        row = self._db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _set_state(self, key: str, value: str):
+        self._db.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def next_block(self):
+        """First block not indexed yet."""
+        with self._lock:
+            return int(self._state("next_block"))
+
+    def _get_logs(self, block_range):
+        """Payment logs of a block range, halving the range when the node refuses it as too large."""
+        from_block, to_block = block_range
+        try:
+            return self.w3.eth.get_logs({
+                "address": self.address,
+                "topics": [self._topic],
+                "fromBlock": from_block,
+                "toBlock": to_block,
+            })
+        except ValueError as e:
+            # e.g. "query returned more than 10000 results"
+            if to_block <= from_block:
+                raise
+            middle = (from_block + to_block) // 2
+            logging.debug(f"eth_getLogs {from_block}-{to_block} refused, splitting: {e}")
+            return self._get_logs((from_block, middle)) + self._get_logs((middle + 1, to_block))
+
+    def _decode(self, log):
+        from eth_abi import decode
+
+        payer, task_uuid, amount = decode(self._types, bytes(log["data"]))
+        return (
+            log["blockNumber"],
+            log["logIndex"],
+            self.w3.to_hex(log["transactionHash"]),
+            self.w3.to_checksum_address(payer),
+            task_uuid,
+            str(amount),
+        )
+
+    def sync(self, to_block: int = None):
+        """Index the payments from the last indexed block up to `to_block`.
+
+        Args:
+            to_block: Optional. Last block to index, the tip minus `confirmations` if not given.
+
+        Returns:
+            number of payments added.
+
+        Raises:
+            SwanAPIException: when a block range cannot be read, the ranges before it stay indexed.
+        """
+        if to_block is None:
+            to_block = self.w3.eth.block_number - self.confirmations
+        added = 0
+        with self._lock, tracing.span("indexer.sync", to_block=to_block) as span:
+            next_block = int(self._state("next_block"))
+            ranges = [
+                (start, min(start + self.chunk_blocks - 1, to_block))
+                for start in range(next_block, to_block + 1, self.chunk_blocks)
+            ]
+            # ranges are read in parallel, stored in order so the index never has a gap
+            for block_range, logs, error in run_bounded(self._get_logs, ranges, max_workers=self.max_workers):
+                if error is not None:
+                    span.set_tag("status", "error")
+                    raise SwanAPIException(f"Reading payments of blocks {block_range[0]}-{block_range[1]} failed: {error}")
+                rows = [self._decode(log) for log in logs if not log.get("removed")]
+                with self._db:
+                    self._db.executemany("INSERT OR IGNORE INTO payments VALUES (?, ?, ?, ?, ?, ?)", rows)
+                    self._set_state("next_block", str(block_range[1] + 1))
+                added += len(rows)
+            span.set_tag("payments", added)
+        if ranges:
+            logging.debug(f"Indexed {added} payments of blocks {next_block}-{to_block}")
+        return added
+
+    def follow(self, stop: threading.Event = None, poll_interval: float = TX_POLL_INTERVAL):
+        """Keep syncing with the chain tip until `stop` is set.
+
+        A failed sync is logged and tried again on the next poll.
+
+        Args:
+            stop: Optional. Event ending the loop, runs forever if not given.
+            poll_interval: Optional. Seconds between syncs.
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logging.error(f"Payment index sync failed: {e}")
+            stop.wait(poll_interval)
+
+    def _query(self, where: str = "", params=()):
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM payments {where} ORDER BY block_number, log_index", params
+            ).fetchall()
+        payments = []
+        for row in rows:
+            record = dict(zip(_COLUMNS, row))
+            record["amount"] = int(record["amount"])
+            payments.append(Payment(record))
+        return payments
+
+    def payments(self, task_uuid: str = None, payer: str = None):
+        """Indexed payments, oldest first.
+
+        The first payment of a task is its submission, later ones are renewals.
+
+        Args:
+            task_uuid: Optional. Only the payments of this task.
+            payer: Optional. Only the payments of this wallet address.
+
+        Returns:
+            list of Payment, with task_uuid, payer, amount in wei, tx_hash and block_number.
+        """
+        conditions, params = [], []
+        if task_uuid is not None:
+            conditions.append("task_uuid = ?")
+            params.append(task_uuid)
+        if payer is not None:
+            conditions.append("payer = ?")
+            params.append(self.w3.to_checksum_address(payer))
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        return self._query(where, params)
+
+    def amount_paid(self, task_uuid: str):
+        """Total amount in wei paid for a task, 0 when no payment is indexed."""
+        return sum(payment.amount for payment in self.payments(task_uuid=task_uuid))
+
+    def is_paid(self, task_uuid: str):
+        return bool(self.payments(task_uuid=task_uuid))
+
+    def tasks_paid_by(self, payer: str):
+        """Uuids of the tasks a wallet paid for, in order of their first payment."""
+        return list(dict.fromkeys(payment.task_uuid for payment in self.payments(payer=payer)))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,49 @@
+# ./swan/contract/nonce.py
+
+import threading
+
+
+class NonceManager:
+    """Hand out consecutive nonces of one wallet without asking the node each time.
+
+    Needed when several transactions of a wallet are in flight at once, the
+    node's transaction count only moves after a transaction reaches the pool.
+    """
+
+    def __init__(self, w3, address: str):
+        """Initialize nonce manager.
+
+        Args:
+            w3: Web3 connection.
+            address: wallet address.
+        """
+        self.w3 = w3
+        self.address = address
+        self._next = None
+        self._lock = threading.Lock()
+
+    def next(self):
+        """Reserve the next nonce of the wallet."""
+        with self._lock:
+            if self._next is None:
+                self._next = self.w3.eth.get_transaction_count(self.address, 'pending')
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def reserve(self, count: int):
+        """Reserve `count` consecutive nonces, returns the first one."""
+        with self._lock:
+            if self._next is None:
+                self._next = self.w3.eth.get_transaction_count(self.address, 'pending')
+            nonce = self._next
+            self._next += count
+            return nonce
+
+    def reset(self):
+        """Forget the local nonce, the next call asks the node again.
+
+        Call after a reserved nonce was not used, e.g. a send failed.
+        """
+        with self._lock:
+            self._next = None
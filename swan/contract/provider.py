@@ -0,0 +1,69 @@
+# ./swan/contract/provider.py
+
+from web3 import HTTPProvider
+from web3.providers.base import JSONBaseProvider
+
+from swan.common.endpoints import EndpointPool
+
+# reads with the same answer on every node, sent to a second node when the first is slow
+HEDGED_RPC_METHODS = frozenset({
+    "eth_blockNumber",
+    "eth_call",
+    "eth_chainId",
+    "eth_estimateGas",
+    "eth_feeHistory",
+    "eth_gasPrice",
+    "eth_getBalance",
+    "eth_getBlockByHash",
+    "eth_getBlockByNumber",
+    "eth_getCode",
+    "eth_getLogs",
+    "eth_getTransactionByHash",
+    "eth_getTransactionCount",
+    "eth_getTransactionReceipt",
+    "eth_maxPriorityFeePerGas",
+    "net_version",
+})
+
+
+class FailoverHTTPProvider(JSONBaseProvider):
+    """Web3 provider spreading RPC calls over several nodes of the chain.
+
+    Calls go to the fastest healthy node of an EndpointPool. A node raising
+    a transport or HTTP error is failed over, reads of HEDGED_RPC_METHODS
+    are hedged. A JSON-RPC error answer is a valid answer, it is returned
+    as is. Sending a raw transaction again to another node is safe, the
+    signed transaction has the same hash everywhere.
+
+    e.g.
+        w3 = new_web3(rpc_url, rpc_urls=["https://rpc-b", "https://rpc-c"])
+    """
+
+    def __init__(self, endpoint_uris, request_kwargs: dict = None, pool: EndpointPool = None):
+        """Initialize provider.
+
+        Args:
+            endpoint_uris: RPC urls of the same chain.
+            request_kwargs: Optional. HTTPProvider request options, e.g. timeout.
+            pool: Optional. EndpointPool to share, built from endpoint_uris if not given.
+        """
+        super().__init__()
+        self.pool = pool if pool is not None else EndpointPool(endpoint_uris)
+        self._providers = {url: HTTPProvider(url, request_kwargs=request_kwargs) for url in self.pool.urls}
+
+    @property
+    def endpoint_uri(self):
+        """The node calls currently go to first."""
+        return self.pool.best()
+
+    def make_request(self, method, params):
+        def send(url):
+            return self._providers[url].make_request(method, params)
+
+        return self.pool.call(send, hedge=method in HEDGED_RPC_METHODS)
+
+    def is_connected(self, show_traceback: bool = False):
+        return any(provider.is_connected(show_traceback) for provider in self._providers.values())
+
+    def __str__(self):
+        return f"RPC connection {', '.join(self.pool.urls)}"
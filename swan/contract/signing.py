@@ -0,0 +1,196 @@
+# ./swan/contract/signing.py
+
+"""Sign many transactions of one wallet in parallel.
+
+Signing a transaction is pure CPU work, an ECDSA signature over its RLP
+encoding, milliseconds per transaction in Python and serialized by the GIL.
+Large batches are therefore split into chunks signed by worker processes,
+one per core. The workers are started on first use and reused. Small
+batches are signed in the calling process, where starting the workers
+would cost more than it saves.
+
+Workers are separate interpreters running `python -m swan.contract.signing`,
+not multiprocessing children. multiprocessing's spawn and forkserver
+workers import the caller's `__main__` again, so a script without an
+`if __name__ == "__main__":` guard would run again in every worker, e.g.
+creating and paying its tasks twice. These workers only import this
+module. They are not forked either, so threads of the caller are not copied.
+
+The private key is sent to the workers over a pipe, it is never written
+to disk.
+"""
+
+import atexit
+import logging
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from swan.common.constant import *
+
+_workers = []
+_idle = queue.Queue()
+_lock = threading.Lock()
+
+
+def _sign_chunk(private_key, txs):
+    """Sign transaction dicts, in a worker process or inline.
+
+    Returns:
+        list of (raw transaction bytes, tx_hash hex).
+    """
+    from eth_account import Account
+
+    account = Account.from_key(private_key)
+    signed = []
+    for tx in txs:
+        signed_tx = account.sign_transaction(tx)
+        signed.append((bytes(signed_tx.rawTransaction), "0x" + bytes(signed_tx.hash).hex()))
+    return signed
+
+
+def _write(stream, value):
+    data = pickle.dumps(value)
+    stream.write(len(data).to_bytes(8, "big"))
+    stream.write(data)
+    stream.flush()
+
+
+def _read(stream):
+    header = stream.read(8)
+    if len(header) < 8:
+        raise EOFError("signing worker exited")
+    return pickle.loads(stream.read(int.from_bytes(header, "big")))
+
+
+class _Worker:
+    """A signing process, answers one chunk at a time."""
+
+    def __init__(self):
+        import swan
+        env = dict(os.environ)
+        # the caller may have found swan through a path the worker does not know
+        root = os.path.dirname(os.path.dirname(os.path.abspath(swan.__file__)))
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "swan.contract.signing"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+        )
+
+    def sign(self, private_key, txs):
+        _write(self.process.stdin, (private_key, txs))
+        status, value = _read(self.process.stdout)
+        if status != "ok":
+            raise RuntimeError(f"signing worker failed: {value}")
+        return value
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+
+
+def _serve(stdin, stdout):
+    """Worker loop, signs chunks until the caller closes the pipe."""
+    while True:
+        try:
+            private_key, txs = _read(stdin)
+        except EOFError:
+            return
+        try:
+            result = ("ok", _sign_chunk(private_key, txs))
+        except Exception as e:
+            result = ("error", repr(e))
+        _write(stdout, result)
+
+
+def _ensure_workers(processes: int):
+    with _lock:
+        while len(_workers) < processes:
+            worker = _Worker()
+            _workers.append(worker)
+            _idle.put(worker)
+
+
+def _sign_on_worker(private_key, txs):
+    try:
+        worker = _idle.get(timeout=BULK_SIGN_WORKER_TIMEOUT)
+    except queue.Empty:
+        raise RuntimeError(f"no signing worker free after {BULK_SIGN_WORKER_TIMEOUT} seconds")
+    try:
+        signed = worker.sign(private_key, txs)
+    except Exception:
+        # a broken worker is replaced, its answers may be out of step with its requests
+        worker.close()
+        with _lock:
+            if worker in _workers:
+                _workers.remove(worker)
+        try:
+            _ensure_workers(1)
+        except OSError:
+            pass
+        raise
+    _idle.put(worker)
+    return signed
+
+
+def shutdown():
+    """Stop the worker processes, a later bulk signing starts them again."""
+    with _lock:
+        workers = list(_workers)
+        _workers.clear()
+        while not _idle.empty():
+            _idle.get_nowait()
+    for worker in workers:
+        worker.close()
+
+
+atexit.register(shutdown)
+
+
+def sign_transactions(private_key, txs, processes: int = None, min_parallel: int = BULK_SIGN_MIN_PARALLEL):
+    """Sign transactions of one wallet, in worker processes for large batches.
+
+    Args:
+        private_key: private key of the wallet, hex or bytes.
+        txs: transaction dicts with nonce, gas, fees, chainId, to and data.
+        processes: Optional. Worker processes, one per core if not given.
+        min_parallel: Optional. Smallest batch signed in worker processes.
+
+    Returns:
+        list of (raw transaction bytes, tx_hash hex) in the order of txs.
+    """
+    txs = list(txs)
+    processes = processes or os.cpu_count() or 1
+    if len(txs) < min_parallel or processes < 2:
+        return _sign_chunk(private_key, txs)
+    if isinstance(private_key, bytes):
+        private_key = "0x" + bytes(private_key).hex()
+    chunk_size = max(len(txs) // (processes * BULK_SIGN_CHUNKS_PER_PROCESS), 1)
+    chunks = [txs[start:start + chunk_size] for start in range(0, len(txs), chunk_size)]
+    try:
+        _ensure_workers(processes)
+        with ThreadPoolExecutor(processes) as executor:
+            results = list(executor.map(lambda chunk: _sign_on_worker(private_key, chunk), chunks))
+    except (OSError, EOFError, RuntimeError) as e:
+        logging.warning(f"Signing workers unavailable, signing {len(txs)} transactions in this process: {e}")
+        return _sign_chunk(private_key, txs)
+    signed = []
+    for chunk in results:
+        signed.extend(chunk)
+    return signed
+
+
+if __name__ == "__main__":
+    stdout = sys.stdout.buffer
+    # anything printed by accident must not corrupt the answers
+    sys.stdout = sys.stderr
+    _serve(sys.stdin.buffer, stdout)
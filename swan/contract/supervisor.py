@@ -0,0 +1,242 @@
+# ./swan/contract/supervisor.py
+
+import logging
+import math
+import time
+
+from swan.common import deadlines, metrics, tracing
+from swan.common.constant import *
+from swan.common.exception import SwanAPIException, SwanDeadlineExceeded
+from swan.contract.swan_contract import _record_receipt
+
+# a node only accepts a replacement paying at least 10% more
+MIN_REPLACEMENT_BUMP = 1.1
+
+
+class PendingTransaction:
+    """A transaction of one nonce, with every hash it was sent under."""
+
+    __slots__ = ("tx", "hashes", "mined_hash", "sent_block", "sent_at", "bumps", "capped")
+
+    def __init__(self, tx: dict, tx_hash: str, sent_block: int):
+        self.tx = tx
+        self.hashes = [tx_hash]
+        self.mined_hash = None
+        self.sent_block = sent_block
+        self.sent_at = time.perf_counter()
+        self.bumps = 0
+        self.capped = False
+
+    @property
+    def tx_hash(self):
+        """Hash of the mined version, of the latest version sent before."""
+        return self.mined_hash or self.hashes[-1]
+
+    @property
+    def nonce(self):
+        return self.tx["nonce"]
+
+
+class TransactionSupervisor:
+    """Send transactions of a wallet and re-send those that get stuck.
+
+    A transaction not mined within `stuck_blocks` blocks, e.g. because the
+    base fee rose above its max fee, is signed again with the same nonce and
+    fees raised by `fee_bump`, at most up to `max_fee_per_gas`. Whichever
+    version is mined wins, its hash is the one reported. Waiting ends after
+    `timeout` seconds at the latest, so a payment never blocks longer.
+
+    e.g.
+        orchestrator.contract_factory.supervise(stuck_blocks=2, max_fee_per_gas=100 * 10**9)
+        orchestrator.make_payment(...)  # pays with supervised transactions
+    """
+
+    def __init__(
+            self,
+            contract,
+            stuck_blocks: int = TX_STUCK_BLOCKS,
+            fee_bump: float = TX_FEE_BUMP,
+            max_fee_per_gas: int = TX_MAX_FEE_PER_GAS,
+            timeout: float = CONTRACT_TIMEOUT,
+            poll_interval: float = TX_POLL_INTERVAL,
+        ):
+        """Initialize supervisor.
+
+        Args:
+            contract: SwanContract of the sending wallet.
+            stuck_blocks: Optional. Blocks a transaction may stay pending before its fee is bumped.
+            fee_bump: Optional. Factor applied to the fees of a stuck transaction, at least 1.1.
+            max_fee_per_gas: Optional. Highest max fee per gas in wei a replacement may offer.
+            timeout: Optional. Seconds to wait for a transaction at most.
+            poll_interval: Optional. Seconds between checks of pending transactions.
+        """
+        self.contract = contract
+        self.stuck_blocks = stuck_blocks
+        self.fee_bump = max(fee_bump, MIN_REPLACEMENT_BUMP)
+        self.max_fee_per_gas = max_fee_per_gas
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    @property
+    def w3(self):
+        return self.contract.w3
+
+    def send(self, contract_function, nonce: int = None, fees: dict = None):
+        """Build, sign and send a contract transaction.
+
+        Args:
+            contract_function: bound contract function, e.g. `contract.functions.submitPayment(...)`.
+            nonce: Optional. Nonce to use, the next one of the contract's nonce manager if not given.
+            fees: Optional. Fee fields, from the latest block if not given.
+
+        Returns:
+            PendingTransaction to pass to `wait`.
+        """
+        account = self.contract.account
+        reserved = nonce is None
+        if reserved:
+            # shared with the unsupervised path of the contract, their nonces never collide
+            nonce = self.contract.nonce_manager.next()
+        try:
+            if fees is None:
+                fees = self.contract._fee_params()
+            tx = contract_function.build_transaction({"from": account.address, "nonce": nonce, **fees})
+            sent_block = self.w3.eth.block_number
+            return PendingTransaction(tx, self._send(tx), sent_block)
+        except Exception:
+            if reserved:
+                self.contract.nonce_manager.reset()
+            raise
+
+    def _send(self, tx: dict):
+        signed_tx = self.w3.eth.account.sign_transaction(tx, self.contract.account._private_key)
+        tx_hash = self.w3.to_hex(self.w3.eth.send_raw_transaction(signed_tx.rawTransaction))
+        metrics.TRANSACTIONS.labels("sent").inc()
+        return tx_hash
+
+    def _bumped_fees(self, tx: dict):
+        """Fees of a replacement, None when the cap leaves no room for one."""
+        base_fee = self.w3.eth.get_block("latest").get("baseFeePerGas") or 0
+        if "gasPrice" in tx:
+            gas_price = max(math.ceil(tx["gasPrice"] * self.fee_bump), base_fee * 2)
+            if min(gas_price, self.max_fee_per_gas) < math.ceil(tx["gasPrice"] * MIN_REPLACEMENT_BUMP):
+                return None
+            return {"gasPrice": min(gas_price, self.max_fee_per_gas)}
+        tip = math.ceil(tx["maxPriorityFeePerGas"] * self.fee_bump)
+        max_fee = min(max(math.ceil(tx["maxFeePerGas"] * self.fee_bump), base_fee * 2 + tip), self.max_fee_per_gas)
+        if max_fee < math.ceil(tx["maxFeePerGas"] * MIN_REPLACEMENT_BUMP):
+            return None
+        tip = min(tip, max_fee)
+        if tip < math.ceil(tx["maxPriorityFeePerGas"] * MIN_REPLACEMENT_BUMP):
+            return None
+        return {"maxFeePerGas": max_fee, "maxPriorityFeePerGas": tip}
+
+    def bump(self, pending: PendingTransaction, block_number: int = None):
+        """Re-send a pending transaction with higher fees.
+
+        Returns:
+            the new tx_hash, None when the fee cap is reached.
+        """
+        with tracing.span("contract.fee_bump", nonce=pending.nonce, bumps=pending.bumps) as span:
+            fees = self._bumped_fees(pending.tx)
+            if fees is None:
+                pending.capped = True
+                span.set_tag("status", "capped")
+                logging.warning(f"Transaction {pending.tx_hash} is stuck at the fee cap {self.max_fee_per_gas} wei")
+                return None
+            tx = dict(pending.tx, **fees)
+            try:
+                tx_hash = self._send(tx)
+            except ValueError as e:
+                # e.g. an earlier version was mined meanwhile, the next receipt check finds it
+                logging.warning(f"Replacement of {pending.tx_hash} not accepted: {e}")
+                return None
+            pending.tx = tx
+            pending.hashes.append(tx_hash)
+            pending.bumps += 1
+            pending.sent_block = block_number if block_number is not None else self.w3.eth.block_number
+            metrics.TX_REPLACEMENTS.inc()
+            logging.info(f"Stuck transaction {pending.hashes[-2]} replaced by {tx_hash}, {fees}")
+            return tx_hash
+
+    def _receipt(self, pending: PendingTransaction):
+        from web3.exceptions import TransactionNotFound
+
+        for tx_hash in reversed(pending.hashes):
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+            if receipt is not None:
+                # may be an earlier version than the latest
+                pending.mined_hash = tx_hash
+                return receipt
+        return None
+
+    def wait_all(self, pendings, timeout: float = None):
+        """Wait for transactions, bumping the fees of those that get stuck.
+
+        Args:
+            pendings: list of PendingTransaction.
+            timeout: Optional. Seconds to wait at most, the supervisor's timeout if not given.
+
+        Returns:
+            list of receipts in the order of pendings, a SwanAPIException instead for a transaction
+            not mined in time, a SwanDeadlineExceeded when the current deadline ended the wait.
+            `pending.tx_hash` is the hash of the mined version.
+        """
+        current = deadlines.current()
+        ends_at = time.monotonic() + (self.timeout if timeout is None else timeout)
+        results = [None] * len(pendings)
+        waiting = set(range(len(pendings)))
+        with tracing.span("contract.supervise", transactions=len(pendings)):
+            while True:
+                for index in sorted(waiting):
+                    receipt = self._receipt(pendings[index])
+                    if receipt is not None:
+                        _record_receipt(receipt, pendings[index].sent_at)
+                        results[index] = receipt
+                        waiting.discard(index)
+                if not waiting:
+                    return results
+                if current is not None and current.expired:
+                    for index in waiting:
+                        pending = pendings[index]
+                        results[index] = SwanDeadlineExceeded(
+                            f"Transaction with nonce {pending.nonce} not seen mined before the deadline, sent as {', '.join(pending.hashes)}",
+                            tx_hash=pending.tx_hash,
+                            cancelled=current.cancelled,
+                        )
+                    return results
+                if time.monotonic() >= ends_at:
+                    for index in waiting:
+                        pending = pendings[index]
+                        results[index] = SwanAPIException(
+                            f"Transaction with nonce {pending.nonce} not mined in time, sent as {', '.join(pending.hashes)}"
+                        )
+                    return results
+                block_number = self.w3.eth.block_number
+                for index in sorted(waiting):
+                    pending = pendings[index]
+                    if not pending.capped and block_number - pending.sent_block >= self.stuck_blocks:
+                        self.bump(pending, block_number)
+                step = min(self.poll_interval, max(ends_at - time.monotonic(), 0))
+                if current is not None:
+                    # wake up in time to notice a cancellation
+                    remaining = current.remaining()
+                    step = min(step, DEADLINE_POLL_INTERVAL, remaining if remaining is not None else step)
+                time.sleep(step)
+
+    def wait(self, pending: PendingTransaction, timeout: float = None):
+        """Wait for one transaction, see `wait_all`.
+
+        Returns:
+            transaction receipt.
+
+        Raises:
+            SwanAPIException: when it is not mined in time.
+        """
+        result = self.wait_all([pending], timeout)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
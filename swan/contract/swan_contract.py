@@ -1,20 +1,80 @@
 # ./swan/contract/swan_contract.py
 
-from web3 import Web3
-from web3.middleware import geth_poa_middleware
-from eth_account import Account
+import logging
+import time
 
+from swan.common import deadlines, metrics, tracing
+from swan.common.concurrency import run_bounded
 from swan.common.constant import *
+from swan.common.exception import SwanAPIException, SwanDeadlineExceeded
 from swan.common.utils import get_contract_abi
+from swan.contract.allowance import AllowanceTracker
+from swan.contract.nonce import NonceManager
+
+def new_web3(rpc_url: str, provider=None, rpc_urls=None):
+    """Create a Web3 connection to swan chain.
+
+    Args:
+        rpc_url: rpc url of swan chain for connection.
+        provider: Optional. Web3 provider to use instead of an HTTP provider for rpc_url.
+        rpc_urls: Optional. More rpc urls of swan chain, calls then go to the fastest healthy one.
+
+    Returns:
+        Web3 object with POA middleware injected.
+    """
+    # web3 takes hundreds of milliseconds to import, load it on first connection
+    from web3 import Web3
+    from web3.middleware import geth_poa_middleware
+
+    urls = list(dict.fromkeys([rpc_url, *(rpc_urls or ())]))
+    if provider is None and len(urls) > 1:
+        from swan.contract.provider import FailoverHTTPProvider
+        provider = FailoverHTTPProvider(urls)
+    w3 = Web3(provider if provider is not None else Web3.HTTPProvider(rpc_url))
+    w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+    w3.middleware_onion.add(rpc_instrumentation_middleware, name="swan_instrumentation")
+    return w3
+
+
+def rpc_instrumentation_middleware(make_request, w3):
+    """Web3 middleware recording metrics of every RPC call and running it in an 'rpc.request' span."""
+    endpoint = getattr(w3.provider, "endpoint_uri", None)
+
+    def middleware(method, params):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with tracing.span("rpc.request", method=method, endpoint=endpoint) as span:
+                response = make_request(method, params)
+                if isinstance(response, dict) and response.get("error"):
+                    span.set_tag("status", "error")
+                else:
+                    status = "ok"
+                return response
+        finally:
+            metrics.RPC_LATENCY.labels(method).observe(time.perf_counter() - started)
+            metrics.RPC_REQUESTS.labels(method, status).inc()
+    return middleware
+
+
+def _record_receipt(receipt, sent_at: float):
+    """Record confirmation time, outcome and gas of a mined transaction."""
+    metrics.TX_CONFIRMATION.observe(time.perf_counter() - sent_at)
+    metrics.TRANSACTIONS.labels("mined" if receipt["status"] == 1 else "reverted").inc()
+    gas_used = receipt.get("gasUsed") or 0
+    metrics.GAS_USED.inc(gas_used)
+    metrics.FEES_PAID.inc(gas_used * (receipt.get("effectiveGasPrice") or 0))
+
 
 class SwanContract():
 
-    def __init__(self, private_key: str, contract_info: dict):
+    def __init__(self, private_key: str, contract_info: dict, w3: "Web3" = None):
         """ Initialize swan contract API connection.
 
         Args:
             private_key: private key for wallet.
-            rpc_url: rpc url of swan chain for connection.
+            contract_info: contract detail from orchestrator, including rpc_url and contract addresses.
+            w3: Optional. Shared Web3 connection, a new one is created from rpc_url if not given.
         """
         self.rpc_url = contract_info["rpc_url"]
         self.swan_token_contract_addr = contract_info["swan_token_contract_address"]
@@ -22,10 +82,12 @@ class SwanContract():
         self.client_contract_addr = contract_info["client_contract_address"]
 
         self.account = None
+        self.nonce_manager = None
+        self.allowance = None
         if private_key != "":
+            from eth_account import Account
             self.account = Account.from_key(private_key)
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
-        self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+        self.w3 = w3 if w3 is not None else new_web3(self.rpc_url)
 
         self.client_contract = self.w3.eth.contract(
             self.client_contract_addr,
@@ -42,6 +104,16 @@ class SwanContract():
             abi=get_contract_abi(SWAN_TOKEN_ABI)
         )
 
+        if self.account is not None:
+            self.nonce_manager = NonceManager(self.w3, self.account.address)
+            # shared by every payment of the wallet, approve would otherwise overwrite their allowance
+            self.allowance = AllowanceTracker(self)
+        # TransactionSupervisor re-sending stuck transactions, see SwanContractFactory.supervise
+        self.supervisor = None
+        # batches of at least this many payments are built locally and signed in bulk
+        self.bulk_sign_min_batch = BULK_SIGN_MIN_BATCH
+        self._chain_id = None
+
     def hardware_info(self, hardware_id: int):
         """Retrieve hardware information from payment contract.
 
@@ -72,11 +144,14 @@ class SwanContract():
         return price * duration
 
 
+    @tracing.traced("contract.submit_payment")
     def submit_payment(
             self, 
             task_uuid: str, 
             hardware_id: int, 
-            duration: int
+            duration: int,
+            approve: bool = True,
+            wait: bool = True
         ):
         """
         Submit payment for a task
@@ -85,45 +160,26 @@ class SwanContract():
             task_uuid: unique id returned by `swan_api.create_task`
             hardware_id: id of cp/hardware configuration set
             duration: duration of service runtime (seconds).
+            approve: Optional. Approve the payment amount first (Default = True).
+            wait: Optional. Wait for the transaction receipt (Default = True).
 
         Returns:
             tx_hash
         """
-        
-        # first approve payment
-        amount = int(self.estimate_payment(
-            hardware_id=hardware_id, 
-            duration=duration/3600  # duration in estimate_
-        ))
-        self._approve_payment(amount)
-
-        nonce = self.w3.eth.get_transaction_count(self.account.address)
-        base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
-        max_priority_fee_per_gas = self.w3.to_wei(2, 'gwei')
-        max_fee_per_gas = base_fee + max_priority_fee_per_gas
-        if max_fee_per_gas < max_priority_fee_per_gas:
-            max_fee_per_gas = max_priority_fee_per_gas + base_fee
-        tx = self.client_contract.functions.submitPayment(
-            task_uuid, 
-            hardware_id, 
-            duration
-        ).build_transaction({
-            'from': self.account.address,
-            'nonce': nonce,
-            "maxFeePerGas": max_fee_per_gas,
-            "maxPriorityFeePerGas": max_priority_fee_per_gas,
-        })
-        signed_tx = self.w3.eth.account.sign_transaction(tx, self.account._private_key)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=CONTRACT_TIMEOUT)
-        return self.w3.to_hex(tx_hash)
+        return self._pay_one(
+            self.client_contract.functions.submitPayment(task_uuid, hardware_id, duration),
+            hardware_id, duration, approve, wait
+        )
     
 
+    @tracing.traced("contract.renew_payment")
     def renew_payment(
             self, 
             task_uuid: str, 
             hardware_id: int, 
-            duration: int
+            duration: int,
+            approve: bool = True,
+            wait: bool = True
         ):
         """
         Submit payment for task renewal
@@ -132,116 +188,561 @@ class SwanContract():
             task_uuid: unique id returned by `swan_api.create_task`
             hardware_id: id of cp/hardware configuration set
             duration: duration of service runtime (seconds).
+            approve: Optional. Approve the payment amount first (Default = True).
+            wait: Optional. Wait for the transaction receipt (Default = True).
 
         Returns:
             tx_hash
         """
-        
-        # first approve payment
+        return self._pay_one(
+            self.client_contract.functions.renewPayment(task_uuid, hardware_id, duration),
+            hardware_id, duration, approve, wait
+        )
+
+    def _pay_one(self, contract_function, hardware_id, duration, approve: bool, wait: bool):
+        """Send one payment, its amount reserved in the wallet's allowance until it is mined."""
+        if not approve:
+            return self._send_transaction(contract_function, wait=wait)
         amount = int(self.estimate_payment(
             hardware_id=hardware_id, 
             duration=duration/3600  # duration in estimate_
         ))
-        self._approve_payment(amount)
-
-        nonce = self.w3.eth.get_transaction_count(self.account.address)
-        base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
-        max_priority_fee_per_gas = self.w3.to_wei(2, 'gwei')
-        max_fee_per_gas = base_fee + max_priority_fee_per_gas
-        if max_fee_per_gas < max_priority_fee_per_gas:
-            max_fee_per_gas = max_priority_fee_per_gas + base_fee
-        tx = self.client_contract.functions.renewPayment(
-            task_uuid, 
-            hardware_id, 
-            duration
-        ).build_transaction({
-            'from': self.account.address,
-            'nonce': nonce,
-            "maxFeePerGas": max_fee_per_gas,
-            "maxPriorityFeePerGas": max_priority_fee_per_gas,
-        })
-        signed_tx = self.w3.eth.account.sign_transaction(tx, self.account._private_key)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=CONTRACT_TIMEOUT)
-        return self.w3.to_hex(tx_hash)
+        reservation = self.allowance.reserve(amount)
+        try:
+            tx_hash = self._send_transaction(contract_function, wait=wait)
+        except Exception as e:
+            # sent but not seen mined, its amount stays counted
+            unmined = [(e.tx_hash, amount)] if getattr(e, "tx_hash", None) else []
+            self.allowance.sent(reservation, unmined)
+            raise
+        self.allowance.sent(reservation, [] if wait else [(tx_hash, amount)])
+        return tx_hash
     
 
-    def _approve_payment(self, amount):
+    def submit_payments(self, payments, approve: bool = True, wait: bool = True):
+        """
+        Submit payments for several tasks as one batch
+
+        Args:
+            payments: list of (task_uuid, hardware_id, duration) tuples, duration in seconds.
+            approve: Optional. Approve the total amount once before paying (Default = True).
+            wait: Optional. Wait for all transaction receipts (Default = True).
+
+        Returns:
+            list of tx_hash in the order of payments, the exception instead for a payment that failed.
+        """
+        return self._pay_batch(self.client_contract.functions.submitPayment, payments, approve, wait)
+
+    def renew_payments(self, renewals, approve: bool = True, wait: bool = True):
+        """
+        Submit payments for several task renewals as one batch
+
+        Args:
+            renewals: list of (task_uuid, hardware_id, duration) tuples, duration in seconds.
+            approve: Optional. Approve the total amount once before paying (Default = True).
+            wait: Optional. Wait for all transaction receipts (Default = True).
+
+        Returns:
+            list of tx_hash in the order of renewals, the exception instead for a renewal that failed.
+        """
+        return self._pay_batch(self.client_contract.functions.renewPayment, renewals, approve, wait)
+
+    @tracing.traced("contract.pay_batch")
+    def _pay_batch(self, payment_function, payments, approve: bool, wait: bool):
+        """Approve once for the batch and the payments in flight, then send all payments back to back with consecutive nonces."""
+        if not approve:
+            return self._send_batch(payment_function, payments, wait)
+        prices = {}
+        amounts = []
+        for _, hardware_id, duration in payments:
+            if hardware_id not in prices:
+                prices[hardware_id] = self.hardware_info(hardware_id)[1]
+            amounts.append(int(prices[hardware_id] * (duration/3600)))
+        reservation = self.allowance.reserve(sum(amounts))
+        try:
+            results = self._send_batch(payment_function, payments, wait)
+        except Exception:
+            self.allowance.release(reservation)
+            raise
+        self.allowance.sent(reservation, [
+            (result if isinstance(result, str) else result.tx_hash, amount)
+            for result, amount in zip(results, amounts)
+            # mined payments already took their amount
+            if (isinstance(result, str) and not wait) or getattr(result, "tx_hash", None)
+        ])
+        return results
+
+    def _send_batch(self, payment_function, payments, wait: bool):
+        fees = self._fee_params()
+        self.nonce_manager.reset()
+        if len(payments) >= self.bulk_sign_min_batch:
+            return self._pay_bulk(payment_function, payments, fees, wait)
+        if wait and self.supervisor is not None:
+            return self._pay_batch_supervised(payment_function, payments, fees)
+        results = []
+        sent_at = []
+        for task_uuid, hardware_id, duration in payments:
+            sent_at.append(time.perf_counter())
+            try:
+                signed_tx = self.sign_transaction(
+                    payment_function(task_uuid, hardware_id, duration),
+                    nonce=self.nonce_manager.next(),
+                    fees=fees
+                )
+                results.append(self.send_signed_transaction(signed_tx, wait=False))
+            except Exception as e:
+                # the nonce was not used, ask the node again for the next one
+                self.nonce_manager.reset()
+                results.append(e)
+
+        if wait:
+            self._wait_payments(results, sent_at)
+        return results
+
+    @tracing.traced("contract.wait_for_receipts")
+    def _wait_payments(self, results, sent_at, timeout: float = CONTRACT_TIMEOUT):
+        """Replace the tx_hash of every sent payment by the exception of a failed one.
+
+        All payments share one timeout, bounded by the current deadline. Payments
+        of a batch have consecutive nonces and are mined in nonce order, so every
+        poll stops at the first payment not mined yet.
+        """
+        from web3.exceptions import TransactionNotFound
+
+        waiting = [i for i, tx_hash in enumerate(results) if not isinstance(tx_hash, Exception)]
+        current = deadlines.current()
+        ends_at = time.monotonic() + timeout
+        while waiting:
+            while waiting:
+                i = waiting[0]
+                try:
+                    receipt = self.w3.eth.get_transaction_receipt(results[i])
+                except TransactionNotFound:
+                    receipt = None
+                except Exception as e:
+                    # a failing node is asked again on the next poll
+                    logging.warning(f"Receipt of {results[i]} unavailable: {e}")
+                    receipt = None
+                if receipt is None:
+                    break
+                _record_receipt(receipt, sent_at[i])
+                if receipt["status"] != 1:
+                    results[i] = SwanAPIException(f"Payment transaction {results[i]} reverted")
+                waiting.pop(0)
+            if not waiting:
+                return
+            if current is not None and current.expired:
+                for i in waiting:
+                    results[i] = SwanDeadlineExceeded(
+                        f"Payment transaction {results[i]} not seen mined before the deadline",
+                        tx_hash=results[i],
+                        cancelled=current.cancelled,
+                    )
+                return
+            left = ends_at - time.monotonic()
+            if left <= 0:
+                for i in waiting:
+                    results[i] = SwanAPIException(f"Payment transaction {results[i]} not mined after {timeout} seconds")
+                return
+            step = min(RECEIPT_POLL_INTERVAL, left)
+            if current is not None:
+                remaining = current.remaining()
+                step = min(step, remaining if remaining is not None else step)
+            time.sleep(step)
+
+    def build_payment_transactions(self, payment_function, payments, fees: dict = None):
+        """Build payment transactions of own wallet locally, without requests per transaction.
+
+        The call data is encoded from the ABI, nonces come from the nonce manager,
+        the gas limit is estimated once for the first payment with a safety margin,
+        chain id and fees are fetched once.
+
+        Args:
+            payment_function: e.g. `client_contract.functions.submitPayment`.
+            payments: list of (task_uuid, hardware_id, duration) tuples, duration in seconds.
+            fees: Optional. Fee fields from `_fee_params`, fetched from latest block if not given.
+
+        Returns:
+            list of transaction dicts, ready to sign.
+        """
+        from eth_abi import encode
+        from eth_utils import function_abi_to_4byte_selector
+
+        first = payment_function(*payments[0])
+        selector = function_abi_to_4byte_selector(first.abi)
+        types = [entry["type"] for entry in first.abi["inputs"]]
+        gas = int(first.estimate_gas({"from": self.account.address}) * BULK_GAS_MARGIN)
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        if fees is None:
+            fees = self._fee_params()
+        nonce = self.nonce_manager.reserve(len(payments))
+        to = self.client_contract.address
+        return [
+            {
+                "to": to,
+                "data": "0x" + (selector + encode(types, list(payment))).hex(),
+                "value": 0,
+                "gas": gas,
+                "nonce": nonce + index,
+                "chainId": self._chain_id,
+                **fees,
+            }
+            for index, payment in enumerate(payments)
+        ]
+
+    def broadcast(self, raw_txs, max_workers: int = BULK_BROADCAST_WORKERS):
+        """Send raw signed transactions in a burst, started in nonce order.
+
+        Args:
+            raw_txs: list of (raw transaction, tx_hash hex) from `signing.sign_transactions`.
+            max_workers: Optional. Transactions in flight at once.
+
+        Returns:
+            list of tx_hash in the order of raw_txs, the exception instead for a transaction not accepted.
+        """
+        def send(signed):
+            raw_tx, tx_hash = signed
+            try:
+                self.w3.eth.send_raw_transaction(raw_tx)
+            except ValueError as e:
+                # a retry of a transaction the node already got
+                if "already known" not in str(e) and "known transaction" not in str(e):
+                    raise
+            metrics.TRANSACTIONS.labels("sent").inc()
+            return tx_hash
+
+        return [
+            error if error is not None else tx_hash
+            for _, tx_hash, error in run_bounded(send, raw_txs, max_workers=max_workers)
+        ]
+
+    @tracing.traced("contract.pay_bulk")
+    def _pay_bulk(self, payment_function, payments, fees, wait: bool):
+        """Build all payments locally, sign them in parallel, then broadcast them at once."""
+        from swan.contract.signing import sign_transactions
+
+        txs = self.build_payment_transactions(payment_function, payments, fees)
+        with tracing.span("contract.sign_bulk", transactions=len(txs)):
+            signed = sign_transactions(self.account.key, txs)
+        sent_block = self.w3.eth.block_number
+        started = time.perf_counter()
+        results = self.broadcast(signed)
+        if any(isinstance(result, Exception) for result in results):
+            self._close_nonce_gaps(txs, signed, results)
+            # the next transaction asks the node again
+            self.nonce_manager.reset()
+        if not wait:
+            return results
+        if self.supervisor is None:
+            self._wait_payments(results, [started] * len(results))
+            return results
+        from swan.contract.supervisor import PendingTransaction
+
+        pendings = {
+            index: PendingTransaction(txs[index], tx_hash, sent_block)
+            for index, tx_hash in enumerate(results) if not isinstance(tx_hash, Exception)
+        }
+        for index, receipt in zip(pendings, self.supervisor.wait_all(list(pendings.values()))):
+            if isinstance(receipt, Exception):
+                results[index] = receipt
+            elif receipt["status"] != 1:
+                results[index] = SwanAPIException(f"Payment transaction {pendings[index].tx_hash} reverted")
+            else:
+                results[index] = pendings[index].tx_hash
+        return results
+
+    def _close_nonce_gaps(self, txs, signed, results):
+        """Fill the nonces of payments that were not sent, so later payments are not stuck behind them.
+
+        The nonces of a bulk batch are reserved up front. A payment the node did
+        not accept leaves a gap, every later payment waits for it and the next
+        batch would reuse its nonce. The gap is filled with an empty transfer to
+        own wallet. When filling fails, the later payments are reported failed too.
+        """
+        last_sent = max((i for i, result in enumerate(results) if not isinstance(result, Exception)), default=-1)
+        for index, result in enumerate(results):
+            if index > last_sent:
+                return
+            if not isinstance(result, Exception):
+                continue
+            tx = txs[index]
+            filler = {
+                "to": self.account.address,
+                "value": 0,
+                "gas": 21000,
+                "nonce": tx["nonce"],
+                "chainId": tx["chainId"],
+                **{key: tx[key] for key in ("maxFeePerGas", "maxPriorityFeePerGas", "gasPrice") if key in tx},
+            }
+            try:
+                self.w3.eth.send_raw_transaction(self.w3.eth.account.sign_transaction(filler, self.account._private_key).rawTransaction)
+                metrics.TRANSACTIONS.labels("sent").inc()
+                logging.warning(f"Payment with nonce {tx['nonce']} not sent ({result}), nonce filled to release later payments")
+                continue
+            except Exception as e:
+                if any(known in str(e) for known in ("already known", "known transaction", "nonce too low", "underpriced")):
+                    # the node did take the payment itself
+                    results[index] = signed[index][1]
+                    continue
+                error = e
+            for later in range(index + 1, len(results)):
+                if not isinstance(results[later], Exception):
+                    results[later] = SwanAPIException(
+                        f"Payment transaction {results[later]} is queued behind nonce {tx['nonce']}, "
+                        f"which could not be sent or filled ({error}), it is mined only once that nonce is used"
+                    )
+            return
+
+    def _pay_batch_supervised(self, payment_function, payments, fees):
+        pendings = []
+        for task_uuid, hardware_id, duration in payments:
+            try:
+                pendings.append(self.supervisor.send(
+                    payment_function(task_uuid, hardware_id, duration),
+                    nonce=self.nonce_manager.next(),
+                    fees=fees
+                ))
+            except Exception as e:
+                self.nonce_manager.reset()
+                pendings.append(e)
+        sent = [pending for pending in pendings if not isinstance(pending, Exception)]
+        receipts = iter(self.supervisor.wait_all(sent))
+        results = []
+        for pending in pendings:
+            if isinstance(pending, Exception):
+                results.append(pending)
+                continue
+            receipt = next(receipts)
+            if isinstance(receipt, Exception):
+                results.append(receipt)
+            elif receipt["status"] != 1:
+                results.append(SwanAPIException(f"Payment transaction {pending.tx_hash} reverted"))
+            else:
+                results.append(pending.tx_hash)
+        return results
+
+    @tracing.traced("contract.approve")
+    def _approve_payment(self, amount, wait: bool = True):
         """
         called in submit_payment
 
         Args:
             amount: amount in wei
+            wait: Optional. Wait for the transaction receipt (Default = True).
         """
-        nonce = self.w3.eth.get_transaction_count(self.account.address)
-        base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
-        max_priority_fee_per_gas = self.w3.to_wei(2, 'gwei')
-        max_fee_per_gas = base_fee + max_priority_fee_per_gas
-        if max_fee_per_gas < max_priority_fee_per_gas:
-            max_fee_per_gas = max_priority_fee_per_gas + base_fee
-        tx = self.token_contract.functions.approve(
-            self.client_contract.address,
-            amount
-        ).build_transaction({
-            'from': self.account.address,
-            'nonce': nonce,
-            "maxFeePerGas": max_fee_per_gas,
-            "maxPriorityFeePerGas": max_priority_fee_per_gas,
-        })
-        signed_tx = self.w3.eth.account.sign_transaction(tx, self.account._private_key)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=CONTRACT_TIMEOUT)
-        return self.w3.to_hex(tx_hash)
+        try:
+            return self._send_transaction(
+                self.token_contract.functions.approve(self.client_contract.address, amount),
+                wait=wait
+            )
+        except SwanDeadlineExceeded as e:
+            # no payment was sent yet, the approval hash is not the one callers report
+            e.tx_hash = None
+            raise
     
 
+    @tracing.traced("contract.transfer")
+    def transfer(self, to: str, amount: int, wait: bool = True):
+        """Transfer SWAN from own wallet.
+
+        Args:
+            to: receiving wallet address.
+            amount: amount in wei.
+            wait: Optional. Wait for the transaction receipt (Default = True).
+
+        Returns:
+            str tx_hash in hex.
+        """
+        return self._send_transaction(
+            self.token_contract.functions.transfer(to, amount),
+            wait=wait
+        )
+
     def lock_revenue(self, task_id: str, hardware_id: int, duration: int):
         """
         deprecated
         """
-        nonce = self.w3.eth.get_transaction_count(self.account.address)
-        base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
-        max_priority_fee_per_gas = self.w3.to_wei(2, 'gwei')
-        max_fee_per_gas = base_fee + max_priority_fee_per_gas
-        if max_fee_per_gas < max_priority_fee_per_gas:
-            max_fee_per_gas = max_priority_fee_per_gas + base_fee
-        tx = self.payment_contract.functions.lockRevenue(
-            task_id, 
-            hardware_id, 
-            duration
-        ).build_transaction({
-            'from': self.account.address,
-            'nonce': nonce,
-            "maxFeePerGas": max_fee_per_gas,
-            "maxPriorityFeePerGas": max_priority_fee_per_gas,
-        })
-        signed_tx = self.w3.eth.account.sign_transaction(tx, self.account._private_key)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=CONTRACT_TIMEOUT)
-        return self.w3.to_hex(tx_hash)
+        return self._send_transaction(
+            self.payment_contract.functions.lockRevenue(task_id, hardware_id, duration)
+        )
     
     def _approve_swan_token(self, amount):
         """
         deprecated
         """
-        nonce = self.w3.eth.get_transaction_count(self.account.address)
+        return self._send_transaction(
+            self.token_contract.functions.approve(self.payment_contract.address, amount)
+        )
+
+    def _send_transaction(self, contract_function, wait: bool = True):
+        """Build, sign and send a contract transaction from own wallet.
+
+        Args:
+            contract_function: bound contract function, e.g. `contract.functions.approve(spender, amount)`.
+            wait: Optional. Wait for the transaction receipt (Default = True).
+
+        Returns:
+            str tx_hash in hex, of the version mined when a supervisor re-sent it with a higher fee.
+        """
+        deadlines.check("transaction")
+        if wait and self.supervisor is not None:
+            pending = self.supervisor.send(contract_function)
+            self.supervisor.wait(pending)
+            return pending.tx_hash
+        sent = False
+        try:
+            signed_tx = self.sign_transaction(contract_function)
+            tx_hash = self.send_signed_transaction(signed_tx, wait=False)
+            sent = True
+        finally:
+            if not sent:
+                # the reserved nonce was not used, ask the node again next time
+                self.nonce_manager.reset()
+        if wait:
+            self.wait_for_receipt(tx_hash)
+        return tx_hash
+
+    def sign_transaction(self, contract_function, nonce: int = None, fees: dict = None):
+        """Build and sign a contract transaction from own wallet without sending it.
+
+        The hash of the signed transaction is known before it is broadcast.
+
+        Args:
+            contract_function: bound contract function, e.g. `contract.functions.submitPayment(...)`.
+            nonce: Optional. Nonce to use, the next one of the nonce manager if not given. It counts
+            pending transactions, a transaction signed while the previous one is unmined gets the next nonce.
+            A transaction signed with it and never sent leaves a gap, call `nonce_manager.reset()` then.
+            fees: Optional. Fee fields from `_fee_params`, fetched from latest block if not given.
+
+        Returns:
+            signed transaction, with `hash` and `rawTransaction`.
+        """
+        reserved = nonce is None
+        if reserved:
+            nonce = self.nonce_manager.next()
+        try:
+            if fees is None:
+                fees = self._fee_params()
+            tx = contract_function.build_transaction({
+                'from': self.account.address,
+                'nonce': nonce,
+                **fees,
+            })
+            return self.w3.eth.account.sign_transaction(tx, self.account._private_key)
+        except Exception:
+            if reserved:
+                self.nonce_manager.reset()
+            raise
+
+    def _fee_params(self):
+        """EIP-1559 fee fields from the latest block, 2 gwei priority fee."""
         base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
         max_priority_fee_per_gas = self.w3.to_wei(2, 'gwei')
         max_fee_per_gas = base_fee + max_priority_fee_per_gas
         if max_fee_per_gas < max_priority_fee_per_gas:
             max_fee_per_gas = max_priority_fee_per_gas + base_fee
-        tx = self.token_contract.functions.approve(
-            self.payment_contract.address, 
-            amount
-        ).build_transaction({
-            'from': self.account.address,
-            'nonce': nonce,
+        return {
             "maxFeePerGas": max_fee_per_gas,
             "maxPriorityFeePerGas": max_priority_fee_per_gas,
-        })
-        signed_tx = self.w3.eth.account.sign_transaction(tx, self.account._private_key)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=CONTRACT_TIMEOUT)
+        }
+
+    def send_signed_transaction(self, signed_tx, wait: bool = True):
+        """Broadcast a signed transaction.
+
+        Args:
+            signed_tx: signed transaction from `sign_transaction`.
+            wait: Optional. Wait for the transaction receipt (Default = True).
+
+        Returns:
+            str tx_hash in hex.
+        """
+        return self.send_raw_transaction(signed_tx.rawTransaction, wait=wait)
+
+    @tracing.traced("contract.send")
+    def send_raw_transaction(self, raw_tx, wait: bool = True):
+        """Broadcast a raw signed transaction.
+
+        Args:
+            raw_tx: raw signed transaction, bytes or hex.
+            wait: Optional. Wait for the transaction receipt (Default = True).
+
+        Returns:
+            str tx_hash in hex.
+        """
+        sent_at = time.perf_counter()
+        tx_hash = self.w3.eth.send_raw_transaction(raw_tx)
+        metrics.TRANSACTIONS.labels("sent").inc()
+        if wait:
+            self.wait_for_receipt(tx_hash, sent_at=sent_at)
         return self.w3.to_hex(tx_hash)
+
+    @tracing.traced("contract.wait_for_receipt")
+    def wait_for_receipt(self, tx_hash: str, timeout: float = CONTRACT_TIMEOUT, sent_at: float = None):
+        """Wait until a transaction is mined.
+
+        Args:
+            tx_hash: transaction hash in hex.
+            timeout: seconds to wait.
+            sent_at: Optional. time.perf_counter() when the transaction was sent, for the confirmation time metric.
+
+        Returns:
+            transaction receipt.
+        """
+        started = sent_at if sent_at is not None else time.perf_counter()
+        deadline = deadlines.current()
+        if deadline is None:
+            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+        else:
+            receipt = self._wait_within(deadline, tx_hash, timeout)
+        _record_receipt(receipt, started)
+        return receipt
+
+    def _wait_within(self, deadline, tx_hash, timeout: float):
+        """Poll for a receipt until timeout, the deadline or its cancellation, whichever comes first."""
+        from web3.exceptions import TimeExhausted, TransactionNotFound
+
+        ends_at = time.monotonic() + timeout
+        while True:
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+                if receipt is not None:
+                    return receipt
+            except TransactionNotFound:
+                pass
+            left = ends_at - time.monotonic()
+            if left <= 0:
+                raise TimeExhausted(f"Transaction {self.w3.to_hex(tx_hash)} is not in the chain after {timeout} seconds")
+            try:
+                deadline.sleep(min(RECEIPT_POLL_INTERVAL, left), what="transaction wait")
+            except SwanDeadlineExceeded as e:
+                # sent, it may still be mined
+                e.tx_hash = self.w3.to_hex(tx_hash)
+                raise
+
+    def get_allowance(self, owner: str = None):
+        """Retrieve SWAN allowance of a wallet for the client payment contract.
+
+        Args:
+            owner: wallet address. If None, retrieve own allowance.
+
+        Returns:
+            int allowance in wei (18 decimal, 1e-18 swan).
+        """
+        if not owner:
+            owner = self.account.address
+        return self.token_contract.functions.allowance(owner, self.client_contract.address).call()
+
+    def amount_paid(self, task_uuid: str):
+        """Retrieve the amount paid for a task from client payment contract.
+
+        Args:
+            task_uuid: unique id returned by `swan_api.create_task`
+
+        Returns:
+            int amount in wei (18 decimal, 1e-18 swan).
+        """
+        return self.client_contract.functions.amountPaid(task_uuid).call()
     
     def _get_swan_balance(self, address=None):
         """Retrieve swan token balance of any wallet from Swan token contract.
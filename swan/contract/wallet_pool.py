@@ -0,0 +1,257 @@
+# ./swan/contract/wallet_pool.py
+
+import logging
+import threading
+
+from swan.common.concurrency import run_bounded
+from swan.common.exception import SwanAPIException
+
+
+class _Wallet:
+    """A pool wallet, its contract and the SWAN it has promised to payments in flight."""
+
+    def __init__(self, contract):
+        self.contract = contract
+        self.address = contract.account.address
+        self.balance = None
+        self.reserved = 0
+        self.in_flight = 0
+        # one payment sequence at a time per wallet, its nonces stay consecutive
+        self.lock = threading.Lock()
+
+    @property
+    def available(self):
+        return (self.balance or 0) - self.reserved
+
+
+class WalletPool:
+    """Spread payments over several funded wallets.
+
+    Every wallet sends its own payments in sequence with its own nonces and
+    allowance, different wallets pay in parallel. A payment goes to the least
+    busy wallet that can still cover it, from the SWAN balance minus what its
+    payments in flight will spend.
+
+    e.g.
+        pool = orchestrator.wallet_pool([key_1, key_2, key_3])
+        tx_hashes = pool.submit_payments([(task_uuid, hardware_id, 3600), ...])
+    """
+
+    def __init__(self, contract_factory, private_keys):
+        """Initialize the pool, balances are read on first use.
+
+        Args:
+            contract_factory: SwanContractFactory building the wallet contracts.
+            private_keys: private keys of the pool wallets.
+        """
+        if not private_keys:
+            raise SwanAPIException("A wallet pool needs at least one private key")
+        self._wallets = [_Wallet(contract_factory.get(private_key)) for private_key in private_keys]
+        self._by_address = {wallet.address: wallet for wallet in self._wallets}
+        self._prices = {}
+        # task_uuid -> address of the wallet that paid it, renewals prefer the same wallet
+        self._payers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def addresses(self):
+        return [wallet.address for wallet in self._wallets]
+
+    def refresh(self):
+        """Read the SWAN balance of every wallet from the chain.
+
+        Returns:
+            dict of address -> balance in wei.
+        """
+        balances = {wallet.address: wallet.contract._get_swan_balance() for wallet in self._wallets}
+        with self._lock:
+            for wallet in self._wallets:
+                wallet.balance = balances[wallet.address]
+        return balances
+
+    def balances(self):
+        """SWAN balance of every wallet in wei as last read, minus the payments in flight."""
+        self._ensure_balances()
+        with self._lock:
+            return {wallet.address: wallet.available for wallet in self._wallets}
+
+    def payer(self, task_uuid: str):
+        """Address of the pool wallet that paid a task, None if not paid through this pool."""
+        return self._payers.get(task_uuid)
+
+    def _ensure_balances(self):
+        if any(wallet.balance is None for wallet in self._wallets):
+            self.refresh()
+
+    def estimate(self, hardware_id: int, duration: int):
+        """Payment amount in wei of a task, hardware prices are read once per pool."""
+        price = self._prices.get(hardware_id)
+        if price is None:
+            price = self._prices[hardware_id] = self._wallets[0].contract.hardware_info(hardware_id)[1]
+        return int(price * (duration/3600))
+
+    def _reserve(self, amount: int, preferred: str = None):
+        """Pick the wallet for a payment and reserve its amount."""
+        with self._lock:
+            candidates = [wallet for wallet in self._wallets if wallet.available >= amount]
+            if not candidates:
+                raise SwanAPIException(f"No pool wallet holds {amount} wei of SWAN")
+            wallet = self._by_address.get(preferred)
+            if wallet not in candidates or wallet.in_flight:
+                wallet = min(candidates, key=lambda wallet: (wallet.in_flight, -wallet.available))
+            wallet.reserved += amount
+            wallet.in_flight += 1
+            return wallet
+
+    def _release(self, wallet, amount: int, spent: int):
+        with self._lock:
+            wallet.reserved -= amount
+            wallet.in_flight -= 1
+            wallet.balance -= spent
+
+    def _pay(self, method: str, task_uuid: str, hardware_id: int, duration: int, wait: bool):
+        amount = self.estimate(hardware_id, duration)
+        self._ensure_balances()
+        wallet = self._reserve(amount, self._payers.get(task_uuid))
+        spent = 0
+        try:
+            with wallet.lock:
+                tx_hash = getattr(wallet.contract, method)(task_uuid, hardware_id, duration, wait=wait)
+            spent = amount
+            self._payers[task_uuid] = wallet.address
+            return tx_hash
+        finally:
+            self._release(wallet, amount, spent)
+
+    def submit_payment(self, task_uuid: str, hardware_id: int, duration: int, wait: bool = True):
+        """Pay for a task from the best suited pool wallet.
+
+        Args:
+            task_uuid: unique id returned by `swan_api.create_task`
+            hardware_id: id of cp/hardware configuration set
+            duration: duration of service runtime (seconds).
+            wait: Optional. Wait for the transaction receipt (Default = True).
+
+        Returns:
+            tx_hash
+
+        Raises:
+            SwanAPIException: when no wallet holds enough SWAN.
+        """
+        return self._pay("submit_payment", task_uuid, hardware_id, duration, wait)
+
+    def renew_payment(self, task_uuid: str, hardware_id: int, duration: int, wait: bool = True):
+        """Pay for a task renewal, from the wallet that paid the task when it is free and funded.
+
+        Args and returns as `submit_payment`.
+        """
+        return self._pay("renew_payment", task_uuid, hardware_id, duration, wait)
+
+    def _pay_many(self, method: str, payments, wait: bool):
+        self._ensure_balances()
+        # shard the payments, each wallet then sends its share as one batch
+        shards = {}
+        results = [None] * len(payments)
+        for index, (task_uuid, hardware_id, duration) in enumerate(payments):
+            amount = self.estimate(hardware_id, duration)
+            try:
+                wallet = self._reserve(amount, self._payers.get(task_uuid))
+            except SwanAPIException as e:
+                results[index] = e
+                continue
+            shards.setdefault(wallet.address, []).append((index, amount, (task_uuid, hardware_id, duration)))
+
+        def pay_shard(address):
+            wallet = self._by_address[address]
+            shard = shards[address]
+            with wallet.lock:
+                return getattr(wallet.contract, method)([payment for _, _, payment in shard], wait=wait)
+
+        for address, shard_results, error in run_bounded(pay_shard, list(shards), max_workers=len(self._wallets), retries=0):
+            wallet = self._by_address[address]
+            shard = shards[address]
+            if error is not None:
+                shard_results = [error] * len(shard)
+            for (index, amount, payment), result in zip(shard, shard_results):
+                failed = isinstance(result, Exception)
+                self._release(wallet, amount, 0 if failed else amount)
+                if not failed:
+                    self._payers[payment[0]] = address
+                results[index] = result
+        logging.info(f"Pool paid {len(payments)} payments from {len(shards)} wallets")
+        return results
+
+    def submit_payments(self, payments, wait: bool = True):
+        """Pay for many tasks, spread over the pool wallets.
+
+        Args:
+            payments: list of (task_uuid, hardware_id, duration) tuples, duration in seconds.
+            wait: Optional. Wait for all transaction receipts (Default = True).
+
+        Returns:
+            list of tx_hash in the order of payments, the exception instead for a payment that failed.
+        """
+        return self._pay_many("submit_payments", payments, wait)
+
+    def renew_payments(self, renewals, wait: bool = True):
+        """Pay for many task renewals, spread over the pool wallets.
+
+        Args and returns as `submit_payments`.
+        """
+        return self._pay_many("renew_payments", renewals, wait)
+
+    def plan_rebalance(self, targets: dict = None, min_transfer: int = 0):
+        """Transfers evening out the SWAN of the pool wallets.
+
+        Args:
+            targets: Optional. dict of address -> wanted balance in wei, an equal share of the total if not given.
+            min_transfer: Optional. Smallest transfer in wei worth sending.
+
+        Returns:
+            list of (from address, to address, amount in wei).
+        """
+        balances = self.refresh()
+        if targets is None:
+            share = sum(balances.values()) // len(balances)
+            targets = {address: share for address in balances}
+        surplus = sorted(
+            ((balances[address] - targets.get(address, 0), address) for address in balances if balances[address] > targets.get(address, 0)),
+            reverse=True,
+        )
+        deficit = sorted(
+            ((targets[address] - balances.get(address, 0), address) for address in targets if balances.get(address, 0) < targets[address]),
+            reverse=True,
+        )
+        transfers = []
+        surplus = [list(item) for item in surplus]
+        for needed, receiver in deficit:
+            for donor in surplus:
+                if needed <= 0:
+                    break
+                amount = min(needed, donor[0])
+                if amount <= 0 or amount < min_transfer:
+                    continue
+                transfers.append((donor[1], receiver, amount))
+                donor[0] -= amount
+                needed -= amount
+        return transfers
+
+    def rebalance(self, targets: dict = None, min_transfer: int = 0, wait: bool = True):
+        """Move SWAN between the pool wallets, see `plan_rebalance`.
+
+        Returns:
+            list of (from address, to address, amount in wei, tx_hash or the exception of a failed transfer).
+        """
+        results = []
+        for sender, receiver, amount in self.plan_rebalance(targets, min_transfer):
+            wallet = self._by_address[sender]
+            try:
+                with wallet.lock:
+                    tx_hash = wallet.contract.transfer(receiver, amount, wait=wait)
+            except Exception as e:
+                logging.error(f"Rebalance transfer of {amount} wei from {sender} to {receiver} failed: {e}")
+                tx_hash = e
+            results.append((sender, receiver, amount, tx_hash))
+        if wait:
+            self.refresh()
+        return results
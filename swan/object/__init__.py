@@ -1,3 +1,4 @@
 # ./swan/object/__init__.py
 
-from swan.object.cp_config import HardwareConfig
\ No newline at end of file
+from swan.object.cp_config import HardwareConfig
+from swan.object.response import DeploymentInfo, Payment, PaymentInfo, Response, TaskCreation, as_model
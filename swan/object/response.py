@@ -0,0 +1,203 @@
+# ./swan/object/response.py
+
+"""Typed views of the orchestrator responses used on hot paths.
+
+A response model is the decoded JSON dict itself, so existing code reading
+`result['data']['task']['uuid']` keeps working, with attributes for the
+fields callers dig for, e.g. `result.task.uuid`. Nested objects are wrapped
+when first accessed and never copied, a caller reading one field of a
+large deployment or payment list pays for that field only.
+"""
+
+from functools import cached_property
+
+
+class _View:
+    """Attribute access to a nested JSON object, `view.raw` is the dict itself."""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw):
+        self.raw = raw if raw is not None else {}
+
+    def get(self, key, default=None):
+        return self.raw.get(key, default)
+
+    def __getitem__(self, key):
+        return self.raw[key]
+
+    def __eq__(self, other):
+        return isinstance(other, type(self)) and self.raw == other.raw
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.raw!r})"
+
+
+class Task(_View):
+    __slots__ = ()
+
+    @property
+    def uuid(self):
+        return self.raw.get("uuid")
+
+    @property
+    def status(self):
+        return self.raw.get("status")
+
+    @property
+    def end_at(self):
+        return self.raw.get("end_at")
+
+    @property
+    def region(self):
+        return self.raw.get("region")
+
+    @property
+    def detail(self):
+        return self.raw.get("task_detail") or {}
+
+
+class Job(_View):
+    __slots__ = ()
+
+    @property
+    def real_uri(self):
+        return self.raw.get("job_real_uri")
+
+    @property
+    def status(self):
+        return self.raw.get("status")
+
+
+class Payment(_View):
+    __slots__ = ()
+
+    @property
+    def task_uuid(self):
+        return self.raw.get("task_uuid")
+
+    @property
+    def tx_hash(self):
+        return self.raw.get("tx_hash")
+
+    @property
+    def payer(self):
+        return self.raw.get("payer")
+
+    @property
+    def status(self):
+        return self.raw.get("status")
+
+    @property
+    def type(self):
+        return self.raw.get("type")
+
+    @property
+    def amount(self):
+        return self.raw.get("amount")
+
+    @property
+    def duration(self):
+        return self.raw.get("duration")
+
+    @property
+    def created_at(self):
+        return self.raw.get("created_at")
+
+    @property
+    def block_number(self):
+        return self.raw.get("block_number")
+
+
+class _LazyList:
+    """Read-only sequence wrapping the items of a JSON list on access."""
+
+    __slots__ = ("_items", "_wrap")
+
+    def __init__(self, items, wrap):
+        self._items = items if items is not None else []
+        self._wrap = wrap
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._wrap(item) for item in self._items[index]]
+        return self._wrap(self._items[index])
+
+    def __iter__(self):
+        wrap = self._wrap
+        return (wrap(item) for item in self._items)
+
+    def __repr__(self):
+        return f"[{', '.join(repr(item) for item in self)}]"
+
+
+class Response(dict):
+    """Orchestrator response with `status`, `message` and `data`."""
+
+    @property
+    def status(self):
+        return self.get("status")
+
+    @property
+    def message(self):
+        return self.get("message")
+
+    @property
+    def ok(self):
+        return self.get("status") == "success"
+
+    @property
+    def data(self):
+        data = self.get("data")
+        return data if data is not None else {}
+
+
+class TaskCreation(Response):
+    """Response of creating a task."""
+
+    @cached_property
+    def task(self):
+        return Task(self.data.get("task"))
+
+    @property
+    def task_uuid(self):
+        return self.get("task_uuid") or self.task.uuid
+
+
+class DeploymentInfo(Response):
+    """Response of `/v2/task_deployment/<task_uuid>`."""
+
+    @cached_property
+    def task(self):
+        return Task(self.data.get("task"))
+
+    @cached_property
+    def jobs(self):
+        return _LazyList(self.data.get("jobs"), Job)
+
+    @property
+    def config_orders(self):
+        return _LazyList(self.data.get("config_orders"), Payment)
+
+    @property
+    def real_urls(self):
+        return [job["job_real_uri"] for job in self.data.get("jobs") or () if job.get("job_real_uri")]
+
+
+class PaymentInfo(Response):
+    """Response of `/provider/payments`."""
+
+    @cached_property
+    def payments(self):
+        data = self.get("data")
+        return _LazyList(data if isinstance(data, list) else (data or {}).get("payments"), Payment)
+
+
+def as_model(model, response):
+    """Wrap a decoded response in a model, anything but a dict is returned as is."""
+    if isinstance(response, dict) and not isinstance(response, model):
+        return model(response)
+    return response
@@ -1,17 +1,22 @@
 import os
 import logging
+import threading
 import traceback
+from collections import OrderedDict
 
+from swan.api.catalog import HardwareCatalog
 from swan.api.orchestrator import Orchestrator
-from swan.api_client import APIClient
+from swan.api_client import APIClient, new_http_session
 from swan.common.constant import *
 from swan.common.exception import SwanAPIException
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 class Session:
     """
-    A session stores configuration states
+    A session stores configuration states.
+
+    The session owns the pooled transport, the token, the verified contract info,
+    the hardware catalogs and the contract factories, and hands them to every
+    resource it creates.
     """
 
     def __init__(
@@ -20,9 +25,13 @@ class Session:
         network: str = "testnet",
         login_url: str = None,
         login: bool = True, 
+        http_session = None,
+        rpc_urls = None,
     ):
-        
+        # configured on first session instead of at import, importing swan has no side effects
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
         self.token = None
+        self.network = network
         if api_key:
             self.api_key = api_key
         else:
@@ -35,7 +44,14 @@ class Session:
         else:
             self.login_url = ORCHESTRATOR_API_TESTNET
 
-        self.api_client = APIClient()
+        self.http_session = http_session if http_session is not None else new_http_session()
+        # more rpc urls of the chain, contract calls fail over between them and the contract info rpc_url
+        self.rpc_urls = rpc_urls
+        self.api_client = APIClient(self.http_session)
+        self._lock = threading.Lock()
+        self._contract_info = {}
+        self._hardware_catalogs = {}
+        self._contract_factories = {}
         self.login = login
         if login:
             self.api_key_login()
@@ -62,8 +78,54 @@ class Session:
         except Exception as e:
             logging.error(str(e) + traceback.format_exc())
     
+    def get_contract_info(self, swan_url: str, verification: bool = True):
+        """Get cached contract info of an orchestrator.
+
+        Args:
+            swan_url: orchestrator url the contract info was fetched from.
+            verification: only return contract info whose signature was verified.
+
+        Returns:
+            contract detail dict, None if not cached.
+        """
+        cached = self._contract_info.get(swan_url)
+        if cached is None:
+            return None
+        contract_info, verified = cached
+        if verification and not verified:
+            return None
+        return contract_info
+
+    def set_contract_info(self, swan_url: str, contract_info: dict, verified: bool):
+        with self._lock:
+            cached = self._contract_info.get(swan_url)
+            # never replace verified contract info with an unverified one
+            if cached is None or verified or not cached[1]:
+                self._contract_info[swan_url] = (contract_info, verified)
+
+    def get_hardware_catalog(self, swan_url: str):
+        """Get the hardware catalog shared by all resources using the same orchestrator url."""
+        with self._lock:
+            catalog = self._hardware_catalogs.get(swan_url)
+            if catalog is None:
+                catalog = HardwareCatalog()
+                self._hardware_catalogs[swan_url] = catalog
+            return catalog
+
+    def get_contract_factory(self, contract_info: dict, rpc_urls=None):
+        """Get the contract factory shared by all resources using the same contracts and rpc urls."""
+        rpc_urls = tuple(rpc_urls or self.rpc_urls or ())
+        key = (contract_info["rpc_url"], contract_info["client_contract_address"], rpc_urls)
+        with self._lock:
+            factory = self._contract_factories.get(key)
+            if factory is None:
+                from swan.contract.factory import SwanContractFactory
+                factory = SwanContractFactory(contract_info, rpc_urls=rpc_urls)
+                self._contract_factories[key] = factory
+            return factory
+
     # login = False, because should already be logged into session
-    def resource(self, service_name: str, network=None, login=False, url_endpoint=None, verification=True):
+    def resource(self, service_name: str, network=None, login=False, url_endpoint=None, verification=True, inventory=None):
         if service_name.lower() == 'orchestrator':
             resource = Orchestrator(
                 api_key=self.api_key, 
@@ -71,7 +133,107 @@ class Session:
                 url_endpoint=url_endpoint, 
                 token=self.token, 
                 login=login, 
-                verification=verification
+                verification=verification,
+                session=self,
+                inventory=inventory
             )
             return resource
-        
\ No newline at end of file
+
+
+class SessionPool:
+    """
+    A bounded pool of sessions, one per (api_key, network, login_url).
+
+    Every session in the pool shares one pooled transport but keeps its own
+    token, contract info and caches. The least recently used session is
+    evicted when the pool is full.
+    """
+
+    def __init__(self, max_size: int = SESSION_POOL_SIZE, http_session = None):
+        """Initialize an empty pool.
+
+        Args:
+            max_size: maximum number of sessions kept.
+            http_session: Optional. Transport shared by all sessions, a new one is created if not given.
+        """
+        self.max_size = max_size
+        self.http_session = http_session if http_session is not None else new_http_session()
+        self._sessions = OrderedDict()
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(api_key: str = None, network: str = "testnet", login_url: str = None):
+        network = network or "testnet"
+        if not login_url:
+            login_url = ORCHESTRATOR_API_MAINNET if network == "mainnet" else ORCHESTRATOR_API_TESTNET
+        return (api_key or os.getenv("API_KEY"), network, login_url)
+
+    def _lookup(self, key):
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+            return session
+
+    def get(self, api_key: str = None, network: str = "testnet", login_url: str = None, login: bool = True):
+        """Get the session of a tenant, logging in on first use.
+
+        Args:
+            api_key: Orchestrator API key, API_KEY environment variable if not given.
+            network: network of the session, 'testnet' or 'mainnet'.
+            login_url: Optional. Orchestrator url to log into.
+            login: Login on first use.
+
+        Returns:
+            Session object, None if login failed.
+        """
+        key = self.key(api_key, network, login_url)
+        session = self._lookup(key)
+        if session is not None:
+            return session
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # logins of the same tenant are serialized, other tenants are not blocked
+        try:
+            with key_lock:
+                session = self._lookup(key)
+                if session is not None:
+                    return session
+                session = Session(
+                    api_key=key[0],
+                    network=key[1],
+                    login_url=key[2],
+                    login=login,
+                    http_session=self.http_session
+                )
+                if session.login and session.token is None:
+                    return None
+                self.put(session, key)
+                return session
+        finally:
+            with self._lock:
+                self._key_locks.pop(key, None)
+
+    def put(self, session: Session, key = None):
+        """Add a session to the pool, evicting the least recently used ones when full."""
+        if key is None:
+            key = self.key(session.api_key, session.network, session.login_url)
+        with self._lock:
+            self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_size:
+                self._sessions.popitem(last=False)
+
+    def evict(self, api_key: str = None, network: str = "testnet", login_url: str = None):
+        """Remove a tenant's session from the pool."""
+        with self._lock:
+            return self._sessions.pop(self.key(api_key, network, login_url), None)
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,20 @@
+# ./swan/testing/__init__.py
+
+"""Local stand-ins of the Orchestrator API and swan chain for tests and load tests.
+
+FakeChain needs the web3 stack and is imported on first use.
+"""
+
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    "FakeOrchestrator": "swan.testing.server",
+    "FakeChain": "swan.testing.chain",
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
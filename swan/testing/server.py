@@ -0,0 +1,399 @@
+# ./swan/testing/server.py
+
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from swan.common.constant import *
+
+
+DEFAULT_HARDWARE = [
+    {
+        "hardware_id": 0,
+        "hardware_name": "C1ae.small",
+        "hardware_description": "CPU only · 2 vCPU · 2 GiB",
+        "hardware_type": "CPU",
+        "region": ["North Carolina-US", "Quebec-CA"],
+        "hardware_price": "0.0",
+        "hardware_status": "available",
+    },
+    {
+        "hardware_id": 1,
+        "hardware_name": "C1ae.medium",
+        "hardware_description": "CPU only · 4 vCPU · 4 GiB",
+        "hardware_type": "CPU",
+        "region": ["North Carolina-US"],
+        "hardware_price": "1.0",
+        "hardware_status": "available",
+    },
+    {
+        "hardware_id": 12,
+        "hardware_name": "G1ae.small",
+        "hardware_description": "Nvidia 3080 · 4 vCPU · 8 GiB",
+        "hardware_type": "GPU",
+        "region": ["Quebec-CA"],
+        "hardware_price": "10.0",
+        "hardware_status": "available",
+    },
+]
+
+DEFAULT_IMAGES = {"hello_world": "https://github.com/swanchain/awesome-swanchain/tree/main/hello_world"}
+
+
+class FakeOrchestrator:
+    """Local stand-in for the Orchestrator HTTP API.
+
+    Serves the endpoints of swan/common/constant.py from memory on
+    127.0.0.1, with configurable latency and error injection. With a
+    FakeChain, `/contract_info` serves the chain's contracts and payments
+    are validated against the chain, so the create, pay, validate, renew
+    cycle runs without network.
+
+    e.g.
+        with FakeOrchestrator(chain=chain) as server:
+            orchestrator = Orchestrator(api_key="key", url_endpoint=server.url, verification=False)
+    """
+
+    def __init__(
+            self,
+            chain=None,
+            hardware=None,
+            api_keys=None,
+            latency: float = 0,
+            error_rate: float = 0,
+            seed: int = None,
+            port: int = 0,
+            paginate_payments: bool = True,
+        ):
+        """Initialize the server, `start` begins serving.
+
+        Args:
+            chain: Optional. FakeChain holding the payments, payments are not checked without it.
+            hardware: Optional. `/cp/machines` hardware list, DEFAULT_HARDWARE if not given.
+            api_keys: Optional. Accepted api keys, any key is accepted if not given.
+            latency: Optional. Seconds added to every request.
+            error_rate: Optional. Fraction of requests answered with HTTP 500.
+            seed: Optional. Seed of the error injection.
+            port: Optional. Port to listen on, a free one if not given.
+            paginate_payments: Optional. Answer `page` and `size` of `/provider/payments`, otherwise always send all payments.
+        """
+        self.chain = chain
+        self.hardware = [dict(item) for item in (hardware if hardware is not None else DEFAULT_HARDWARE)]
+        self.images = dict(DEFAULT_IMAGES)
+        self.api_keys = set(api_keys) if api_keys else None
+        self.latency = latency
+        self.error_rate = error_rate
+        self.port = port
+        self.paginate_payments = paginate_payments
+        self.tasks = {}
+        self.payments = []
+        self.tokens = set()
+        self.requests = Counter()
+        self._failures = {}
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._server = None
+        if chain is not None:
+            # the payment contract prices the same hardware
+            for hardware in self.hardware:
+                chain.set_hardware(
+                    hardware["hardware_id"],
+                    hardware["hardware_name"],
+                    int(float(hardware["hardware_price"]) * 10**18),
+                    hardware["hardware_status"] == "available"
+                )
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def contract_info(self):
+        if self.chain is not None:
+            return self.chain.contract_info
+        return {
+            "rpc_url": "http://127.0.0.1:8545",
+            "client_contract_address": "0x000000000000000000000000000000000000C11e",
+            "payment_contract_address": "0x0000000000000000000000000000000000009A11",
+            "swan_token_contract_address": "0x0000000000000000000000000000000000005a4E",
+        }
+
+    def start(self):
+        handler = type("FakeOrchestratorHandler", (_Handler,), {"fake": self})
+        self._server = _Server(("127.0.0.1", self.port), handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="swan-fake-orchestrator", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def fail(self, path: str, times: int = 1, status: int = 500):
+        """Answer the next `times` requests of a path with an error status."""
+        with self._lock:
+            self._failures[path] = [times, status]
+
+    # --- request handling
+
+    def _injected_failure(self, path):
+        with self._lock:
+            failure = self._failures.get(path)
+            if failure is not None and failure[0] > 0:
+                failure[0] -= 1
+                return failure[1]
+            if self.error_rate and self._random.random() < self.error_rate:
+                return 500
+        return None
+
+    def handle(self, method: str, path: str, params: dict, token: str):
+        """Route a request, returns (HTTP status, JSON body)."""
+        with self._lock:
+            self.requests[(method, path if not path.startswith(DEPLOYMENT_INFO) else DEPLOYMENT_INFO)] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        status = self._injected_failure(path)
+        if status is not None:
+            return status, {"status": "failed", "message": "injected error"}
+
+        if method == POST and path == SWAN_APIKEY_LOGIN:
+            return self._login(params)
+        if token not in self.tokens:
+            return 401, {"status": "failed", "message": "invalid token"}
+
+        routes = {
+            (GET, GET_CONTRACT_INFO): self._contract_info,
+            (GET, GET_CP_CONFIG): self._machines,
+            (GET, PREMADE_IMAGE): self._premade_image,
+            (GET, GET_ABI_VERSION): lambda params: (200, {"status": "success", "data": {"version": "fake"}}),
+            (POST, GET_SOURCE_URI): self._source_uri,
+            (POST, CREATE_TASK): self._create_task,
+            (POST, "/v2/task_payment_validate"): self._validate_payment,
+            (POST, RENEW_TASK): self._renew_task,
+            (POST, TERMINATE_TASK): self._terminate_task,
+            (POST, CLAIM_REVIEW): self._claim_review,
+            (POST, CONFIG_ORDER_STATUS): self._config_order_status,
+            (GET, PROVIDER_PAYMENTS): self._provider_payments,
+        }
+        if method == GET and path.startswith(DEPLOYMENT_INFO):
+            return self._deployment_info(path[len(DEPLOYMENT_INFO):])
+        route = routes.get((method, path))
+        if route is None:
+            return 404, {"status": "failed", "message": f"{method} {path} not found"}
+        with self._lock:
+            return route(params)
+
+    def _login(self, params):
+        api_key = params.get("api_key")
+        if not api_key or (self.api_keys is not None and api_key not in self.api_keys):
+            return 200, {"status": "failed", "message": "invalid api key"}
+        token = "fake-token-" + uuid.uuid4().hex
+        with self._lock:
+            self.tokens.add(token)
+        return 200, {"status": "success", "data": token}
+
+    def _contract_info(self, params):
+        return 200, {
+            "status": "success",
+            "data": {"contract_info": {"contract_detail": self.contract_info}, "signature": "0x"},
+        }
+
+    def _machines(self, params):
+        return 200, {"status": "success", "data": {"hardware": self.hardware}}
+
+    def _premade_image(self, params):
+        if not params.get("name"):
+            return 200, {"status": "success", "data": dict(self.images)}
+        url = self.images.get(params.get("name"))
+        if url is None:
+            return 200, {"status": "failed", "message": "image not found"}
+        return 200, {"status": "success", "data": {"url": url}}
+
+    def _source_uri(self, params):
+        if not params.get("repo_uri") or not params.get("wallet_address"):
+            return 200, {"status": "failed", "message": "repo_uri and wallet_address required"}
+        return 200, {"status": "success", "data": {"job_source_uri": f"{self.url}/source/{uuid.uuid4().hex}"}}
+
+    def _hardware_named(self, name):
+        for hardware in self.hardware:
+            if hardware["hardware_name"] == name:
+                return hardware
+        return None
+
+    def _create_task(self, params):
+        hardware = self._hardware_named(params.get("cfg_name"))
+        if hardware is None:
+            return 200, {"status": "failed", "message": "invalid cfg_name"}
+        if not params.get("wallet") or not params.get("job_source_uri"):
+            return 200, {"status": "failed", "message": "wallet and job_source_uri required"}
+        region = params.get("region") or "global"
+        if region != "global" and region not in hardware["region"]:
+            return 200, {"status": "failed", "message": f"no {hardware['hardware_name']} in {region}"}
+        if hardware["hardware_status"] != "available":
+            return 200, {"status": "failed", "message": f"no capacity for {hardware['hardware_name']}"}
+        now = int(time.time())
+        duration = int(params.get("duration", 3600))
+        task_uuid = str(uuid.uuid4())
+        task = {
+            "uuid": task_uuid,
+            "status": "initialized",
+            "created_at": now,
+            "end_at": now + duration,
+            "region": region,
+            "duration": duration,
+            "wallet": params["wallet"],
+            "task_detail": {"hardware": hardware["hardware_name"], "duration": duration, "region": region},
+        }
+        self.tasks[task_uuid] = {"task": task, "jobs": [], "config_orders": [], "hardware_id": hardware["hardware_id"]}
+        return 200, {
+            "status": "success",
+            "message": "Task_uuid initialized.",
+            "data": {"task": task},
+        }
+
+    def _paid(self, task_uuid, tx_hash):
+        """Check a payment on the chain, every payment is accepted without a chain."""
+        if self.chain is None:
+            return True
+        receipt = self.chain.receipts.get(bytes.fromhex(tx_hash[2:] if tx_hash.startswith("0x") else tx_hash))
+        return receipt is not None and receipt["status"] == 1 and self.chain.amount_paid.get(task_uuid, 0) > 0
+
+    def _record_payment(self, task_uuid, tx_hash, kind, duration):
+        order = {"task_uuid": task_uuid, "tx_hash": tx_hash, "type": kind, "duration": duration, "status": "paid", "created_at": int(time.time())}
+        self.tasks[task_uuid]["config_orders"].append(order)
+        self.payments.append(order)
+        return order
+
+    def _validate_payment(self, params):
+        task_uuid, tx_hash = params.get("task_uuid"), params.get("tx_hash")
+        task = self.tasks.get(task_uuid)
+        if task is None:
+            return 200, {"status": "failed", "message": "task not found"}
+        if not tx_hash or not self._paid(task_uuid, tx_hash):
+            return 200, {"status": "failed", "message": "payment not found"}
+        if task["task"]["status"] == "initialized":
+            self._record_payment(task_uuid, tx_hash, "payment", task["task"]["duration"])
+            task["task"]["status"] = "running"
+            task["jobs"] = [{"job_real_uri": f"{self.url}/job/{task_uuid}", "status": "running"}]
+        return 200, {"status": "success", "message": "payment validated", "data": {"task": task["task"]}}
+
+    def _renew_task(self, params):
+        task_uuid, tx_hash = params.get("task_uuid"), params.get("tx_hash")
+        task = self.tasks.get(task_uuid)
+        if task is None:
+            return 200, {"status": "failed", "message": "task not found"}
+        if not tx_hash or not self._paid(task_uuid, tx_hash):
+            return 200, {"status": "failed", "message": "payment not found"}
+        if any(order["tx_hash"] == tx_hash for order in task["config_orders"]):
+            return 200, {"status": "failed", "message": "tx_hash already used"}
+        duration = int(params.get("duration", 3600))
+        self._record_payment(task_uuid, tx_hash, "renewal", duration)
+        task["task"]["end_at"] += duration
+        return 200, {"status": "success", "message": "task renewed", "data": {"task": task["task"]}}
+
+    def _terminate_task(self, params):
+        task = self.tasks.get(params.get("task_uuid"))
+        if task is None:
+            return 200, {"status": "failed", "message": "task not found"}
+        task["task"]["status"] = "terminated"
+        return 200, {"status": "success", "message": "task terminated"}
+
+    def _claim_review(self, params):
+        if params.get("task_uuid") not in self.tasks:
+            return 200, {"status": "failed", "message": "task not found"}
+        return 200, {"status": "success", "message": "review claimed"}
+
+    def _config_order_status(self, params):
+        task = self.tasks.get(params.get("task_uuid"))
+        orders = [order for order in (task or {}).get("config_orders", []) if order["tx_hash"] == params.get("tx_hash")]
+        if not orders:
+            return 200, {"status": "failed", "message": "config order not found"}
+        return 200, {"status": "success", "data": {"config_order": orders[0]}}
+
+    def _provider_payments(self, params):
+        payments = self.payments
+        if self.paginate_payments and "page" in params:
+            size = int(params.get("size") or 10)
+            start = (int(params["page"]) - 1) * size
+            payments = payments[start:start + size]
+        return 200, {"status": "success", "data": {"payments": list(payments), "total": len(self.payments)}}
+
+    def _deployment_info(self, task_uuid):
+        with self._lock:
+            task = self.tasks.get(task_uuid)
+            if task is None:
+                return 200, {"status": "failed", "message": "task not found"}
+            return 200, {
+                "status": "success",
+                "data": {
+                    "task": dict(task["task"]),
+                    "jobs": list(task["jobs"]),
+                    "config_orders": list(task["config_orders"]),
+                },
+            }
+
+
+class _Server(ThreadingHTTPServer):
+
+    def handle_error(self, request, client_address):
+        # a hedged or timed out client closes its connection before the answer, that is not an error
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake = None
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, with Nagle every response waits for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def _serve(self, method):
+        parts = urlsplit(self.path)
+        params = dict(parse_qsl(parts.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length).decode()
+            if body.lstrip().startswith("{"):
+                params.update(json.loads(body))
+            else:
+                params.update(parse_qsl(body))
+        authorization = self.headers.get("Authorization") or ""
+        token = authorization[len("Bearer "):] if authorization.startswith("Bearer ") else None
+        status, payload = self.fake.handle(method, parts.path, params, token)
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._serve(GET)
+
+    def do_POST(self):
+        self._serve(POST)
+
+    def do_PUT(self):
+        self._serve(PUT)
+
+    def do_DELETE(self):
+        self._serve(DELETE)
+
+    def log_message(self, format, *args):
+        pass
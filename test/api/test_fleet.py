@@ -0,0 +1,118 @@
+""" Test fleet reconciliation """
+
+import itertools
+from unittest.mock import MagicMock, patch
+
+from swan.api.fleet import FleetManifest, FleetReconciler
+from swan.api.inventory import TaskInventory
+
+
+MANIFEST = {
+    "wallet_address": "0xwallet",
+    "deployments": [
+        {"name": "web", "app_repo_image": "hello_world", "hardware_id": 1, "replicas": 2, "duration": 7200},
+    ],
+}
+
+
+class TestFleetReconciler:
+
+    def setup_method(self):
+        uuids = itertools.count()
+        self.orchestrator = MagicMock()
+
+        def create_task(**kwargs):
+            task_uuid = f"task-{next(uuids)}"
+            return {"task_uuid": task_uuid, "data": {"task": {"uuid": task_uuid, "status": "initialized", "end_at": 100000}}}
+
+        self.orchestrator.create_task.side_effect = create_task
+        self.orchestrator.validate_payment.return_value = {"status": "success"}
+        self.orchestrator.get_deployment_info.return_value = {
+            "data": {"task": {"status": "Running", "end_at": 100000}, "jobs": []}
+        }
+        self.contract = self.orchestrator.contract_factory.get.return_value
+        self.contract.submit_payments.side_effect = lambda payments: [f"0x{i}" for i in range(len(payments))]
+        self.inventory = TaskInventory()
+        self.reconciler = FleetReconciler(self.orchestrator, self.inventory, private_key="key")
+
+    @patch("swan.api.fleet.time.sleep")
+    def test_apply_then_reapply_is_a_no_op(self, mock_sleep):
+        plan = self.reconciler.plan(MANIFEST, now=0)
+        assert len(plan.of("create")) == 2
+
+        report = self.reconciler.apply(plan)
+        assert sorted(report["created"]) == ["task-0", "task-1"]
+        self.contract.submit_payments.assert_called_once_with([("task-0", 1, 7200), ("task-1", 1, 7200)])
+
+        self.orchestrator.reset_mock()
+        plan = self.reconciler.plan(MANIFEST, now=0)
+        assert plan.is_empty
+        assert self.reconciler.apply(plan) == {"created": [], "renewed": [], "terminated": [], "failed": []}
+        self.orchestrator.create_task.assert_not_called()
+        self.orchestrator.terminate_tasks.assert_not_called()
+
+    @patch("swan.api.fleet.time.sleep")
+    def test_spec_change_replaces_and_scale_down_terminates(self, mock_sleep):
+        self.reconciler.apply(self.reconciler.plan(MANIFEST, now=0))
+
+        manifest = {"wallet_address": "0xwallet", "deployments": [dict(MANIFEST["deployments"][0], replicas=1, hardware_id=2)]}
+        plan = self.reconciler.plan(FleetManifest(manifest), now=0)
+
+        assert len(plan.of("terminate")) == 2
+        assert len(plan.of("create")) == 1
+
+    @patch("swan.api.fleet.time.sleep")
+    def test_expiring_tasks_are_renewed(self, mock_sleep):
+        self.reconciler.apply(self.reconciler.plan(MANIFEST, now=0))
+
+        plan = self.reconciler.plan(MANIFEST, now=100000 - 60)
+
+        assert [action.op for action in plan.actions] == ["renew", "renew"]
+
+    def test_payments_are_sent_before_the_validation_wait(self):
+        order = []
+        self.contract.submit_payments.side_effect = lambda payments: order.append("submit") or ["0x0", "0x1"]
+
+        with patch("swan.api.fleet.deadlines.sleep", side_effect=lambda *args, **kwargs: order.append("sleep")):
+            self.reconciler.apply(self.reconciler.plan(MANIFEST, now=0))
+
+        assert order == ["submit", "sleep"]
+
+    @patch("swan.api.fleet.time.sleep")
+    def test_unpaid_tasks_are_not_replicas(self, mock_sleep):
+        self.contract.submit_payments.side_effect = lambda payments: [Exception("reverted"), "0x1"]
+        report = self.reconciler.apply(self.reconciler.plan(MANIFEST, now=0))
+        assert report["created"] == ["task-1"]
+
+        plan = self.reconciler.plan(MANIFEST, now=0)
+
+        assert [(action.op, action.task_uuid, action.reason) for action in plan.of("terminate")] == [("terminate", "task-0", "unpaid")]
+        assert len(plan.of("create")) == 1
+
+    def test_no_private_key_creates_nothing(self):
+        reconciler = FleetReconciler(self.orchestrator, self.inventory)
+
+        report = reconciler.apply(reconciler.plan(MANIFEST, now=0))
+
+        assert [failure[0] for failure in report["failed"]] == ["create", "create"]
+        self.orchestrator.create_task.assert_not_called()
+
+    @patch("swan.api.fleet.time.sleep")
+    def test_renewed_tasks_are_not_renewed_again_before_sync(self, mock_sleep):
+        self.reconciler.apply(self.reconciler.plan(MANIFEST, now=0))
+        self.contract.renew_payments.side_effect = lambda renewals: [f"0x{i}" for i in range(len(renewals))]
+        self.orchestrator.renew_task.return_value = {"status": "success"}
+
+        report = self.reconciler.apply(self.reconciler.plan(MANIFEST, now=100000 - 60))
+        assert sorted(report["renewed"]) == ["task-0", "task-1"]
+
+        assert self.reconciler.plan(MANIFEST, now=100000 - 60).is_empty
+
+    def test_failed_payment_batch_keeps_the_report(self):
+        self.contract.submit_payments.side_effect = ValueError("insufficient funds")
+
+        report = self.reconciler.apply(self.reconciler.plan(MANIFEST, now=0))
+
+        assert report["created"] == []
+        assert sorted(task_uuid for _, task_uuid, _ in report["failed"]) == ["task-0", "task-1"]
+        assert all("insufficient funds" in message for _, _, message in report["failed"])
@@ -0,0 +1,63 @@
+""" Test task inventory """
+
+from unittest.mock import MagicMock
+
+from swan.api.inventory import TaskInventory
+
+
+def deployment_info(status, end_at, region="North Carolina-US"):
+    return {
+        "data": {
+            "task": {"status": status, "end_at": end_at, "task_detail": {"hardware": "C1ae.small"}},
+            "config_orders": [{"region": region}],
+            "jobs": [{"job_real_uri": "https://job.example"}, {"job_real_uri": None}],
+        },
+        "status": "success",
+    }
+
+
+class TestTaskInventory:
+
+    def setup_method(self):
+        self.inventory = TaskInventory()
+        self.inventory.record_task("a", {"status": "initialized", "end_at": 2000}, region="global", hardware="C1ae.small", hardware_id=0)
+        self.inventory.record_task("b", {"status": "initialized", "end_at": 3000}, region="global", hardware="G1ae.small", hardware_id=5)
+
+    def test_query(self):
+        self.inventory.update_from_deployment_info("a", deployment_info("Running", 2500))
+        self.inventory.record_payment("a", "0x1")
+
+        task = self.inventory.get("a")
+        assert task["status"] == "Running"
+        assert task["region"] == "North Carolina-US"
+        assert task["job_uris"] == ["https://job.example"]
+        assert task["hardware_id"] == 0
+        assert [t["task_uuid"] for t in self.inventory.query(expires_before=2800)] == ["a"]
+        assert [t["task_uuid"] for t in self.inventory.query(hardware="G1ae.small")] == ["b"]
+        assert self.inventory.payments("a")[0]["tx_hash"] == "0x1"
+
+    def test_sync_refreshes_only_stale_unfinished_tasks(self):
+        self.inventory.update_from_deployment_info("b", deployment_info("Terminated", 3000))
+        orchestrator = MagicMock()
+        orchestrator.get_deployment_info.return_value = deployment_info("Running", 2500)
+
+        assert self.inventory.sync(orchestrator) == {"refreshed": 1, "failed": 0}
+        assert orchestrator.get_deployment_info.call_count == 1
+
+        # everything is fresh or final now
+        assert self.inventory.sync(orchestrator) == {"refreshed": 0, "failed": 0}
+        assert self.inventory.query(include_final=False)[0]["task_uuid"] == "a"
+
+    def test_sync_counts_missing_tasks_as_failed(self):
+        orchestrator = MagicMock()
+        orchestrator.get_deployment_info.return_value = {"status": "failed", "message": "task not found", "data": None}
+
+        assert self.inventory.sync(orchestrator, max_workers=1) == {"refreshed": 0, "failed": 2}
+        assert sorted(self.inventory.stale()) == ["a", "b"]
+
+    def test_answer_without_task_is_not_stored(self):
+        self.inventory.update_from_deployment_info("a", {"status": "failed", "message": "task not found", "data": None})
+
+        task = self.inventory.get("a")
+        assert task["synced_at"] is None and not task["final"]
+        assert task["deployment_info"] is None
@@ -0,0 +1,167 @@
+""" Test task lifecycle pipeline """
+
+import threading
+from unittest.mock import MagicMock
+
+from swan.api.inventory import TaskInventory
+from swan.api.lifecycle import TaskLifecycle
+from swan.api.orchestrator import Orchestrator
+from swan.common.journal import TaskJournal
+from swan.contract.allowance import AllowanceTracker
+from swan.testing import FakeChain, FakeOrchestrator
+
+SWAN = 10**18
+
+
+class TestTaskLifecycle:
+
+    def setup_method(self):
+        self.orchestrator = MagicMock()
+        self.orchestrator.hardware_id_free = 0
+        self.orchestrator.create_task.return_value = {"task_uuid": "uuid-1"}
+        self.orchestrator.validate_payment.return_value = {"status": "success"}
+
+        self.contract = self.orchestrator.contract_factory.get.return_value
+        self.contract.estimate_payment.return_value = 10
+        self.contract.get_allowance.return_value = 0
+        self.contract._approve_payment.return_value = "0xapprove"
+        signed_tx = MagicMock(hash=b"\x01", rawTransaction=b"\x02")
+        self.contract.sign_transaction.return_value = signed_tx
+        self.contract.w3.to_hex.side_effect = lambda value: "0x" + value.hex()
+        self.contract.wait_for_receipt.return_value = {"status": 1}
+        self.contract.allowance = AllowanceTracker(self.contract)
+
+    def test_launch_walks_all_states(self, tmp_path):
+        journal = TaskJournal(str(tmp_path / "journal.jsonl"), fsync=False)
+        pipeline = TaskLifecycle(self.orchestrator, journal, "key", validate_delay=0)
+
+        record = pipeline.launch("web-1", wallet_address="0xwallet", hardware_id=1, duration=7200)
+
+        assert record["state"] == "validated"
+        assert record["task_uuid"] == "uuid-1"
+        assert record["tx_hash"] == "0x01"
+        self.orchestrator.create_task.assert_called_once()
+        assert self.orchestrator.create_task.call_args.kwargs["auto_pay"] is False
+        self.contract.estimate_payment.assert_called_once_with(1, 2)
+
+    def test_placement_hardware_is_journaled(self, tmp_path):
+        journal = TaskJournal(str(tmp_path / "journal.jsonl"), fsync=False)
+        self.orchestrator.create_task.return_value = {"task_uuid": "uuid-1", "hardware_id": 13}
+        pipeline = TaskLifecycle(self.orchestrator, journal, "key", validate_delay=0)
+
+        record = pipeline.launch("gpu-1", wallet_address="0xwallet", placement={"hardware_type": "GPU"})
+
+        assert record["hardware_id"] == 13
+        self.contract.estimate_payment.assert_called_once_with(13, 1)
+
+    def test_resume_skips_completed_steps(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        self.orchestrator.validate_payment.return_value = None
+        pipeline = TaskLifecycle(self.orchestrator, TaskJournal(path, fsync=False), "key", validate_delay=0)
+
+        record = pipeline.launch("web-1", wallet_address="0xwallet")
+        assert record["state"] == "paid"
+        assert "error" in record
+
+        # restart from the journal on disk
+        self.orchestrator.validate_payment.return_value = {"status": "success"}
+        pipeline = TaskLifecycle(self.orchestrator, TaskJournal(path, fsync=False), "key", validate_delay=0)
+        record = pipeline.launch("web-1", wallet_address="0xwallet")
+
+        assert record["state"] == "validated"
+        assert "error" not in record
+        self.orchestrator.create_task.assert_called_once()
+        self.contract.send_signed_transaction.assert_called_once()
+        self.contract.send_raw_transaction.assert_not_called()
+
+    def test_interrupted_create_adopts_the_inventory_task(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        self.orchestrator.create_task.return_value = None
+        pipeline = TaskLifecycle(self.orchestrator, TaskJournal(path, fsync=False), "key", validate_delay=0)
+
+        record = pipeline.launch("web-1", wallet_address="0xwallet", hardware_id=1)
+        assert record["state"] == "creating"
+        assert record["intent_id"]
+
+        # the task was created, only its response was lost
+        self.orchestrator.inventory = TaskInventory()
+        self.orchestrator.inventory.record_task("uuid-lost", hardware_id=1, wallet="0xwallet")
+        self.orchestrator.inventory.record_task("uuid-other", hardware_id=1, wallet="0xother")
+        pipeline = TaskLifecycle(self.orchestrator, TaskJournal(path, fsync=False), "key", validate_delay=0)
+        record = pipeline.launch("web-1", wallet_address="0xwallet", hardware_id=1)
+
+        assert record["state"] == "validated"
+        assert record["task_uuid"] == "uuid-lost"
+        self.orchestrator.create_task.assert_called_once()
+
+    def test_unknown_create_outcome_waits_for_resolve(self, tmp_path):
+        journal = TaskJournal(str(tmp_path / "journal.jsonl"), fsync=False)
+        self.orchestrator.inventory = TaskInventory()
+        self.orchestrator.create_task.side_effect = [None, {"task_uuid": "uuid-2"}]
+        pipeline = TaskLifecycle(self.orchestrator, journal, "key", validate_delay=0)
+
+        pipeline.launch("web-1", wallet_address="0xwallet")
+        record = pipeline.launch("web-1", wallet_address="0xwallet")
+        assert record["state"] == "creating"
+        assert "resolve_creating" in record["error"]
+        assert self.orchestrator.create_task.call_count == 1
+
+        pipeline.resolve_creating("web-1")
+        record = pipeline.launch("web-1", wallet_address="0xwallet")
+        assert record["state"] == "validated"
+        assert record["task_uuid"] == "uuid-2"
+
+    def test_approval_covers_unpaid_launches(self, tmp_path):
+        journal = TaskJournal(str(tmp_path / "journal.jsonl"), fsync=False)
+        pipeline = TaskLifecycle(self.orchestrator, journal, "key", validate_delay=0)
+        # the payments of both launches are not mined yet
+        self.contract.wait_for_receipt.side_effect = Exception("not mined")
+        self.orchestrator.create_task.side_effect = [{"task_uuid": "uuid-1"}, {"task_uuid": "uuid-2"}]
+
+        pipeline.launch("web-1", wallet_address="0xwallet")
+        self.contract.get_allowance.return_value = 10
+        pipeline.launch("web-2", wallet_address="0xwallet")
+
+        assert [call.args for call in self.contract._approve_payment.call_args_list] == [(10,), (20,)]
+
+
+class TestTaskLifecycleOnChain:
+
+    def setup_method(self):
+        self.chain = FakeChain(automine=False)
+        self.server = FakeOrchestrator(chain=self.chain).start()
+        self.orchestrator = self.chain.attach(
+            Orchestrator(api_key="key", url_endpoint=self.server.url, verification=False)
+        )
+        self.account = self.chain.new_account(100 * SWAN)
+        self.stop = threading.Event()
+        self.miner = threading.Thread(target=self.mine, daemon=True)
+        self.miner.start()
+
+    def teardown_method(self):
+        self.stop.set()
+        self.miner.join()
+        self.server.stop()
+
+    def mine(self):
+        while not self.stop.wait(0.05):
+            self.chain.mine()
+
+    def test_concurrent_payments_are_all_mined(self, tmp_path):
+        pipeline = TaskLifecycle(
+            self.orchestrator,
+            TaskJournal(str(tmp_path / "journal.jsonl"), fsync=False),
+            self.account.key.hex(),
+            validate_delay=0
+        )
+        launch_args = {
+            "wallet_address": self.account.address,
+            "hardware_id": 1,
+            "region": "North Carolina-US",
+            "app_repo_image": "hello_world",
+        }
+
+        records = pipeline.run({f"web-{index}": launch_args for index in range(4)}, max_workers=4)
+
+        assert all(record["state"] == "validated" for record in records.values())
+        assert all(self.chain.amount_paid[record["task_uuid"]] == SWAN for record in records.values())
@@ -107,11 +107,11 @@ class TestOrchestrator:
     @patch("swan.api.orchestrator.Orchestrator.get_source_uri")
     def test_create_task_repo(
         self, 
-        mock_estimate_payment, 
-        mock__verify_hardware_region, 
-        mock__request_with_params,
+        mock_get_source_uri,
         mock_make_payment,
-        mock_get_source_uri
+        mock__request_with_params,
+        mock__verify_hardware_region, 
+        mock_estimate_payment, 
     ):
         mock_estimate_payment.return_value = 0
         mock__verify_hardware_region.return_value = True
@@ -206,3 +206,20 @@ class TestOrchestrator:
         assert response['status'] == "success"
         assert response['tx_hash'] == "1"
         mock_request_with_params.assert_called_once()
+
+
+    @patch("swan.api.orchestrator.Orchestrator._request_with_params")
+    def test_terminate_tasks(self, mock_request_with_params):
+        def terminate(method, request_path, swan_api, params, token, files):
+            if params["task_uuid"] == "bad":
+                raise ConnectionError("connection reset")
+            return {"status": "success", "data": params["task_uuid"]}
+        mock_request_with_params.side_effect = terminate
+
+        results = self.orchestrator.terminate_tasks(["a", "bad", "b"], retries=1)
+
+        assert results["a"] == {"status": "success", "data": "a"}
+        assert results["b"]["status"] == "success"
+        assert results["bad"]["status"] == "failed"
+        # one attempt and one retry for the failing task
+        assert mock_request_with_params.call_count == 4
@@ -0,0 +1,58 @@
+""" Test the streaming payment history """
+
+import pytest
+
+from swan.api.orchestrator import Orchestrator
+from swan.common.exception import SwanAPIException
+from swan.testing import FakeOrchestrator
+
+
+def payment(index):
+    return {"task_uuid": f"task-{index}", "tx_hash": f"0x{index:064x}", "amount": str(10**20), "status": "paid", "created_at": 1000 + index // 2}
+
+
+class TestPaymentHistory:
+
+    def start(self, payments, **kwargs):
+        self.server = FakeOrchestrator(**kwargs).start()
+        self.server.payments.extend(payment(index) for index in range(payments))
+        return Orchestrator(api_key="key", url_endpoint=self.server.url, verification=False)
+
+    def teardown_method(self):
+        self.server.stop()
+
+    def test_pages_and_resume_from_cursor(self):
+        orchestrator = self.start(250)
+
+        history = orchestrator.iter_payments(page_size=100)
+        tx_hashes = [record.tx_hash for record in history]
+
+        assert tx_hashes == [payment(index)["tx_hash"] for index in range(250)]
+        assert history.pages == 3
+        assert self.server.requests[("GET", "/provider/payments")] == 3
+
+        # 249 shares its timestamp with 248, only the unseen payments follow the cursor
+        self.server.payments.extend(payment(index) for index in range(250, 253))
+        resumed = orchestrator.iter_payments(cursor=history.cursor, page_size=100)
+
+        assert [record.task_uuid for record in resumed] == ["task-250", "task-251", "task-252"]
+        assert resumed.cursor.startswith("1126:")
+        assert list(orchestrator.iter_payments(cursor=resumed.cursor)) == []
+
+    @pytest.mark.parametrize("payments", [100, 250])
+    def test_unpaginated_server_is_streamed_once(self, payments):
+        orchestrator = self.start(payments, paginate_payments=False)
+
+        history = orchestrator.iter_payments(page_size=100)
+        history.chunk_size = 97
+        records = list(history)
+
+        assert len(records) == payments
+        assert records[-1].amount == str(10**20)
+
+    def test_failure_is_raised(self):
+        orchestrator = self.start(10)
+        self.server.fail("/provider/payments")
+
+        with pytest.raises(SwanAPIException):
+            list(orchestrator.iter_payments())
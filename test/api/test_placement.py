@@ -0,0 +1,109 @@
+""" Test hardware placement """
+
+from unittest.mock import patch
+
+from swan.api.catalog import HardwareSnapshot
+from swan.api.orchestrator import Orchestrator
+from swan.api.placement import PlacementRequirements, parse_spec, rank
+from swan.common.constant import GET_SOURCE_URI
+from swan.object import HardwareConfig
+from swan.testing import FakeOrchestrator
+from swan.testing.server import DEFAULT_HARDWARE
+
+HARDWARE = DEFAULT_HARDWARE + [
+    {
+        "hardware_id": 13,
+        "hardware_name": "G1ae.medium",
+        "hardware_description": "Nvidia 3080 · 8 vCPU · 16 GiB",
+        "hardware_type": "GPU",
+        "region": ["Quebec-CA", "North Carolina-US"],
+        "hardware_price": "12.0",
+        "hardware_status": "available",
+    },
+    {
+        "hardware_id": 14,
+        "hardware_name": "G1ae.large",
+        "hardware_description": "Nvidia 4090 · 16 vCPU · 32 GiB",
+        "hardware_type": "GPU",
+        "region": ["Quebec-CA"],
+        "hardware_price": "20.0",
+        "hardware_status": "unavailable",
+    },
+]
+
+
+class TestPlacement:
+
+    def setup_method(self):
+        self.snapshot = HardwareSnapshot([HardwareConfig(item) for item in HARDWARE])
+
+    def test_parse_spec(self):
+        spec = parse_spec("Nvidia 3080 · 4 vCPU · 8 GiB")
+        assert (spec.vcpu, spec.memory, spec.gpu) == (4, 8, "Nvidia 3080")
+        assert parse_spec("CPU only · 2 vCPU · 2 GiB").gpu is None
+
+    def test_rank_by_availability_price_and_region(self):
+        placements = rank(self.snapshot, PlacementRequirements(hardware_type="gpu", regions=["North Carolina-US", "Quebec-CA"]))
+        assert [(item.hardware_id, item.region) for item in placements] == [
+            (12, "Quebec-CA"), (13, "North Carolina-US"), (13, "Quebec-CA"),
+        ]
+
+        placements = rank(self.snapshot, {"gpu": "4090", "available_only": False})
+        assert [item.hardware_id for item in placements] == [14]
+
+    def test_requirements_filter(self):
+        placements = rank(self.snapshot, {"min_vcpu": 4, "min_memory": 4, "max_price": 12})
+        assert [item.hardware_id for item in placements] == [1, 12, 13]
+        assert [item.region for item in placements] == ["global"] * 3
+        assert rank(self.snapshot, {"hardware_type": "GPU", "max_price": 5}) == []
+
+
+class TestCreateTaskPlacement:
+
+    def setup_method(self):
+        self.server = FakeOrchestrator(hardware=HARDWARE).start()
+        self.orchestrator = Orchestrator(api_key="key", url_endpoint=self.server.url, verification=False)
+
+    def teardown_method(self):
+        self.server.stop()
+
+    def test_falls_back_to_next_placement(self):
+        # the cached list still shows G1ae.small, the orchestrator has no capacity left
+        self.orchestrator._get_all_hardware()
+        self.server.hardware[2]["hardware_status"] = "unavailable"
+
+        result = self.orchestrator.create_task(
+            wallet_address="0xabc",
+            app_repo_image="hello_world",
+            placement={"hardware_type": "GPU", "regions": ["Quebec-CA"]},
+        )
+
+        assert result["status"] == "success"
+        assert self.server.tasks[result["task_uuid"]]["hardware_id"] == 13
+        assert self.orchestrator._task_hardware[result["task_uuid"]] == 13
+        assert (result["hardware_id"], result["region"]) == (13, "Quebec-CA")
+
+        self.orchestrator.terminate_task(result["task_uuid"])
+
+        assert result["task_uuid"] not in self.orchestrator._task_hardware
+
+    @patch("swan.api.orchestrator.TASK_HARDWARE_CACHE_SIZE", 2)
+    def test_task_hardware_is_bounded(self):
+        for task_uuid, hardware_id in [("a", 1), ("b", 2)]:
+            self.orchestrator._remember_hardware(task_uuid, hardware_id)
+        self.orchestrator._task_hardware_id("a")
+        self.orchestrator._remember_hardware("c", 3)
+
+        assert dict(self.orchestrator._task_hardware) == {"a": 1, "c": 3}
+
+    def test_region_is_checked_before_the_source_upload(self):
+        assert self.orchestrator.create_task(
+            wallet_address="0xabc", hardware_id=13, region="Tokyo-JP", app_repo_image="hello_world"
+        ) is None
+        assert self.server.requests[("POST", GET_SOURCE_URI)] == 0
+
+    def test_no_feasible_placement(self):
+        assert self.orchestrator.create_task(
+            wallet_address="0xabc", app_repo_image="hello_world", placement={"max_price": -1}
+        ) is None
+        assert [item.hardware_id for item in self.orchestrator.place(hardware_type="GPU", max_price=12)] == [12, 13]
@@ -0,0 +1,76 @@
+""" Test batch preflight """
+
+from swan.api.orchestrator import Orchestrator
+from swan.common.constant import PREMADE_IMAGE
+from swan.testing import FakeChain, FakeOrchestrator
+
+SWAN = 10**18
+
+
+class TestPreflight:
+
+    def setup_method(self):
+        self.chain = FakeChain()
+        self.server = FakeOrchestrator(chain=self.chain).start()
+        self.orchestrator = self.chain.attach(
+            Orchestrator(api_key="key", url_endpoint=self.server.url, verification=False)
+        )
+        self.account = self.chain.new_account(3 * SWAN)
+
+    def teardown_method(self):
+        self.server.stop()
+
+    def spec(self, **overrides):
+        spec = {
+            "wallet_address": self.account.address,
+            "hardware_id": 1,
+            "region": "North Carolina-US",
+            "app_repo_image": "hello_world",
+            "duration": 3600,
+        }
+        spec.update(overrides)
+        return spec
+
+    def test_whole_batch_reported_in_one_pass(self):
+        specs = [
+            self.spec(),
+            self.spec(hardware_id=99),
+            self.spec(region="Quebec-CA"),
+            self.spec(app_repo_image="no_such_image"),
+            self.spec(wallet_address=None, duration=0),
+        ]
+        before = sum(self.server.requests.values())
+
+        report = self.orchestrator.preflight(specs, private_key=self.account.key.hex())
+
+        assert not report.ok
+        assert report.issues_of(0) == []
+        assert [issue.message for issue in report.issues_of(1)] == ["Invalid hardware_id 99"]
+        assert [issue.message for issue in report.issues_of(2)] == ["No C1ae.medium machine in Quebec-CA"]
+        assert [issue.message for issue in report.issues_of(3)] == ["Invalid app_repo_image no_such_image"]
+        assert len(report.issues_of(4)) == 2
+        # one hardware list and one image list for the whole batch
+        assert sum(self.server.requests.values()) - before <= 2
+        assert self.server.requests[("GET", PREMADE_IMAGE)] == 1
+        assert self.server.tasks == {}
+
+    def test_total_cost_against_balance_and_allowance(self):
+        report = self.orchestrator.preflight([self.spec()] * 4, private_key=self.account.key.hex())
+
+        assert report.total_cost == 4 * SWAN
+        assert report.balance == 3 * SWAN
+        assert [issue.index for issue in report.issues] == [None]
+        assert "below the estimated total" in report.issues[0].message
+        assert report.warnings and "approve" in report.warnings[0]
+
+        report = self.orchestrator.preflight([self.spec()] * 3, wallet_address=self.account.address, require_allowance=True)
+        assert [issue.message.split(" ")[0] for issue in report.issues] == ["Allowance"]
+
+    def test_placement_specs_are_resolved(self):
+        report = self.orchestrator.preflight(
+            [self.spec(hardware_id=None, region=None, placement={"hardware_type": "GPU"})],
+            private_key=self.account.key.hex(),
+        )
+
+        assert report.hardware_ids == [12]
+        assert report.costs == [10 * SWAN]
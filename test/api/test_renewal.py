@@ -0,0 +1,83 @@
+""" Test renewal scheduler """
+
+from unittest.mock import MagicMock
+
+from swan.api.renewal import RenewalScheduler
+
+
+class TestRenewalScheduler:
+
+    def setup_method(self):
+        self.orchestrator = MagicMock()
+        self.orchestrator.renew_task.return_value = {"status": "success"}
+        self.contract = self.orchestrator.contract_factory.get.return_value
+        self.scheduler = RenewalScheduler(self.orchestrator, "key", lead_time=600, batch_window=60)
+
+    def test_due_tasks_are_renewed_in_one_batch(self):
+        self.contract.renew_payments.return_value = ["0x1", "0x2"]
+        self.scheduler.track("a", hardware_id=1, expires_at=1500)
+        self.scheduler.track("b", hardware_id=2, expires_at=1650, duration=7200)
+        self.scheduler.track("c", hardware_id=1, expires_at=5000)
+
+        results = self.scheduler.run_once(now=1000)
+
+        assert set(results) == {"a", "b"}
+        self.contract.renew_payments.assert_called_once_with([("a", 1, 3600), ("b", 2, 7200)])
+        assert self.orchestrator.renew_task.call_count == 2
+        assert self.scheduler.tracked()["a"]["expires_at"] == 1500 + 3600
+        assert self.scheduler.stats.renewed == 2
+
+    def test_nothing_renewed_before_lead_time(self):
+        self.scheduler.track("a", hardware_id=1, expires_at=5000)
+
+        assert self.scheduler.run_once(now=1000) == {}
+        self.contract.renew_payments.assert_not_called()
+
+    def test_failed_payment_is_reported(self):
+        self.contract.renew_payments.return_value = [Exception("reverted")]
+        self.scheduler.track("a", hardware_id=1, expires_at=1500)
+
+        results = self.scheduler.run_once(now=1000)
+
+        assert results == {"a": None}
+        self.orchestrator.renew_task.assert_not_called()
+        assert self.scheduler.stats.failed == 1
+        assert self.scheduler.tracked()["a"]["expires_at"] == 1500
+
+    def test_ended_task_is_untracked_after_a_failure(self):
+        self.contract.renew_payments.return_value = [Exception("reverted")]
+        self.orchestrator.get_deployment_info.return_value = {"data": {"task": {"status": "Terminated", "end_at": 1500}}}
+        self.scheduler.track("a", hardware_id=1, expires_at=1500)
+
+        self.scheduler.run_once(now=1000)
+        assert self.scheduler.run_once(now=1000 + 30) == {}
+
+        assert "a" not in self.scheduler.tracked()
+        self.contract.renew_payments.assert_called_once()
+
+    def test_renewal_gives_up_after_max_failures(self):
+        self.contract.renew_payments.return_value = [Exception("reverted")]
+        self.orchestrator.get_deployment_info.return_value = {"data": {"task": {"status": "Running", "end_at": 1500}}}
+        self.scheduler.track("a", hardware_id=1, expires_at=1500)
+
+        for check in range(5):
+            self.scheduler.run_once(now=1000 + check)
+
+        assert "a" not in self.scheduler.tracked()
+        assert self.contract.renew_payments.call_count == 3
+
+    def test_unreported_renewal_is_not_paid_again(self):
+        self.contract.renew_payments.return_value = ["0x1"]
+        self.orchestrator.renew_task.return_value = None
+        self.orchestrator.get_deployment_info.return_value = {"data": {"task": {"status": "Running", "end_at": 1500}}}
+        self.scheduler.track("a", hardware_id=1, expires_at=1500)
+
+        for check in range(4):
+            self.scheduler.run_once(now=1000 + check)
+        self.orchestrator.renew_task.return_value = {"status": "success"}
+        results = self.scheduler.run_once(now=1010)
+
+        assert results == {"a": {"status": "success"}}
+        self.contract.renew_payments.assert_called_once()
+        assert {call.kwargs["tx_hash"] for call in self.orchestrator.renew_task.call_args_list} == {"0x1"}
+        assert self.scheduler.tracked()["a"]["expires_at"] == 1500 + 3600
@@ -0,0 +1,91 @@
+""" Test the hardware watcher """
+
+import threading
+
+from swan.api.catalog import HardwareCatalog
+from swan.api.orchestrator import Orchestrator
+from swan.api.watcher import HardwareDiff
+from swan.common.constant import GET_CP_CONFIG
+from swan.testing import FakeOrchestrator
+from swan.testing.server import DEFAULT_HARDWARE
+
+
+def machines(statuses):
+    hardware = [dict(item) for item in DEFAULT_HARDWARE]
+    for item in hardware:
+        item["hardware_status"] = statuses.get(item["hardware_id"], item["hardware_status"])
+    return {"status": "success", "data": {"hardware": hardware}}
+
+
+class TestHardwareWatcher:
+
+    def setup_method(self):
+        self.server = FakeOrchestrator().start()
+        self.set_status(12, "unavailable")
+        self.orchestrator = Orchestrator(api_key="key", url_endpoint=self.server.url, verification=False)
+
+    def teardown_method(self):
+        self.orchestrator.hardware_watcher().stop()
+        self.server.stop()
+
+    def set_status(self, hardware_id, status):
+        with self.server._lock:
+            for item in self.server.hardware:
+                if item["hardware_id"] == hardware_id:
+                    item["hardware_status"] = status
+
+    def test_waiters_share_one_poller(self):
+        watcher = self.orchestrator.hardware_watcher(min_interval=0.02, max_interval=0.05)
+        before = self.server.requests[("GET", GET_CP_CONFIG)]
+        results = []
+        waiters = [
+            threading.Thread(target=lambda: results.append(
+                self.orchestrator.wait_for_capacity(hardware_name="G1ae.small", region="Quebec-CA", timeout=5)
+            ))
+            for _ in range(8)
+        ]
+        for waiter in waiters:
+            waiter.start()
+        threading.Event().wait(0.2)
+        self.set_status(12, "available")
+        for waiter in waiters:
+            waiter.join()
+
+        assert [hardware.id for hardware in results] == [12] * 8
+        # one poll per interval, not one per waiter
+        assert 0 < self.server.requests[("GET", GET_CP_CONFIG)] - before <= watcher.polls < 8 * 5
+
+    def test_wait_times_out(self):
+        self.orchestrator.hardware_watcher(min_interval=0.01, max_interval=0.02)
+
+        assert self.orchestrator.wait_for_capacity(hardware_id=12, timeout=0.1) is None
+        assert self.orchestrator.wait_for_capacity(hardware_id=1, region="North Carolina-US", timeout=1).id == 1
+
+    def test_interval_backs_off_without_change(self):
+        catalog = HardwareCatalog()
+        watcher = catalog.watcher(lambda: machines({}), min_interval=1, max_interval=4)
+
+        watcher.refresh()
+        for _ in range(3):
+            watcher.refresh()
+
+        assert watcher.interval == 4
+        watcher.fetch = lambda: machines({1: "unavailable"})
+        diff = watcher.refresh()
+        assert [(old.status, new.status) for old, new in diff.changed] == [("available", "unavailable")]
+        assert watcher.interval == 1
+
+    def test_subscribers_get_diffs(self):
+        catalog = HardwareCatalog()
+        watcher = catalog.watcher(lambda: machines({12: "unavailable"}), min_interval=0.01)
+        diffs = []
+        watcher.subscribe(lambda diff, snapshot: diffs.append(diff))
+        watcher.refresh()
+
+        watcher.fetch = lambda: machines({})
+        watcher.refresh()
+        watcher.stop()
+
+        assert len(diffs[0].added) == len(DEFAULT_HARDWARE)
+        assert [hardware.id for hardware in diffs[-1].became_available] == [12]
+        assert not HardwareDiff.between(catalog.hardware, catalog.hardware)
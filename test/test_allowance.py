@@ -0,0 +1,54 @@
+""" Test the allowance shared by payments of one wallet """
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from swan.contract.factory import SwanContractFactory
+from swan.testing import FakeChain
+
+SWAN = 10**18
+
+
+class TestAllowanceTracker:
+
+    def setup_method(self):
+        self.chain = FakeChain(automine=False)
+        self.chain.set_hardware(1, "C1ae.medium", SWAN)
+        self.account = self.chain.new_account(100 * SWAN)
+        factory = SwanContractFactory(self.chain.contract_info, w3=self.chain.web3())
+        self.contract = factory.get(self.account.key.hex())
+        self.stop = threading.Event()
+        self.miner = threading.Thread(target=self.mine, daemon=True)
+        self.miner.start()
+
+    def teardown_method(self):
+        self.stop.set()
+        self.miner.join()
+
+    def mine(self):
+        while not self.stop.wait(0.05):
+            self.chain.mine()
+
+    def test_concurrent_payments_keep_each_others_allowance(self):
+        with ThreadPoolExecutor(4) as executor:
+            tx_hashes = list(executor.map(lambda index: self.contract.submit_payment(f"task-{index}", 1, 3600), range(4)))
+
+        assert len(set(tx_hashes)) == 4
+        assert all(self.chain.amount_paid[f"task-{index}"] == SWAN for index in range(4))
+        assert self.contract.allowance.outstanding() == 0
+
+    def test_unmined_payment_is_covered_by_the_next_approval(self):
+        self.contract._approve_payment(SWAN)
+        self.teardown_method()
+        self.contract.submit_payment("task-a", 1, 3600, wait=False)
+        assert self.contract.allowance.outstanding() == SWAN
+
+        # approving task-b's amount alone would leave task-a to revert
+        self.stop.clear()
+        self.miner = threading.Thread(target=self.mine, daemon=True)
+        self.miner.start()
+        self.contract.submit_payment("task-b", 1, 7200)
+
+        assert self.chain.amount_paid["task-a"] == SWAN
+        assert self.chain.amount_paid["task-b"] == 2 * SWAN
+        assert self.contract.allowance.outstanding() == 0
@@ -0,0 +1,29 @@
+""" Test the benchmark harness """
+
+from benchmarks.harness import compare, measure
+
+
+class TestBenchmarkHarness:
+
+    def test_measure_per_operation(self):
+        calls = []
+
+        stats = measure(lambda: calls.append(1), rounds=5, warmup=1, ops=10)
+
+        assert len(calls) == 6
+        assert stats["rounds"] == 5
+        assert 0 <= stats["min"] <= stats["median"]
+
+    def test_self_timed(self):
+        stats = measure(lambda: 2.0, rounds=3, warmup=0, ops=2, self_timed=True)
+
+        assert stats["min"] == stats["median"] == 1.0
+
+    def test_compare_flags_regressions_above_threshold(self):
+        baseline = {"fast": {"min": 1.0}, "slow": {"min": 1.0}}
+        results = {"fast": {"min": 1.1}, "slow": {"min": 2.0}, "new": {"min": 1.0}}
+
+        rows, regressions = compare(results, baseline, threshold=0.5)
+
+        assert [row[0] for row in rows] == ["fast", "slow"]
+        assert regressions == [("slow", 1.0, 2.0, 1.0)]
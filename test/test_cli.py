@@ -0,0 +1,94 @@
+""" Test command line entry point """
+
+import json
+from unittest.mock import MagicMock, patch
+
+from swan import cli
+
+
+class TestCli:
+
+    def setup_method(self):
+        self.orchestrator = MagicMock()
+        self.orchestrator.inventory = None
+
+    def run(self, argv, tmp_path, lines, capsys):
+        input_file = tmp_path / "input.txt"
+        input_file.write_text("\n".join(lines) + "\n")
+        with patch("swan.cli._orchestrator", return_value=self.orchestrator):
+            code = cli.main(["--api-key", "key"] + argv + ["-i", str(input_file)])
+        return code, [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    def test_status_streams_one_line_per_task(self, tmp_path, capsys):
+        self.orchestrator.get_deployment_info.side_effect = lambda task_uuid: {"data": task_uuid}
+
+        code, records = self.run(["status"], tmp_path, ["# tasks", "a", "", '{"task_uuid": "b"}'], capsys)
+
+        assert code == 0
+        assert sorted(record["result"]["data"] for record in records) == ["a", "b"]
+
+    def test_terminate_reports_failures(self, tmp_path, capsys):
+        self.orchestrator.terminate_tasks.return_value = {
+            "a": {"status": "success"},
+            "b": {"status": "failed", "message": "boom"},
+        }
+
+        code, records = self.run(["terminate"], tmp_path, ["a", "b"], capsys)
+
+        assert code == 1
+        self.orchestrator.terminate_tasks.assert_called_once()
+        assert self.orchestrator.terminate_tasks.call_args[0][0] == ["a", "b"]
+        assert [record["task_uuid"] for record in records] == ["a", "b"]
+
+    def test_create_without_private_key_leaves_tasks_unpaid(self, tmp_path, capsys):
+        self.orchestrator.create_task.return_value = {"task_uuid": "a"}
+
+        code, records = self.run(["create", "--wallet", "0xabc"], tmp_path, ['{"app_repo_image": "hello_world"}'], capsys)
+
+        assert code == 0
+        self.orchestrator.create_task.assert_called_once_with(app_repo_image="hello_world", wallet_address="0xabc", auto_pay=False)
+        assert records[0]["result"]["task_uuid"] == "a"
+
+    def test_renew_looks_up_missing_hardware(self, tmp_path, capsys):
+        self.orchestrator.get_deployment_info.return_value = {"data": {"task": {"task_detail": {"hardware": "C1ae.medium"}}}}
+        self.orchestrator._get_all_hardware.return_value.named.return_value = [MagicMock(id=7)]
+        contract = self.orchestrator.contract_factory.get.return_value
+        contract.renew_payments.return_value = ["0x1", "0x2"]
+        self.orchestrator.renew_task.return_value = {"status": "success"}
+
+        code, records = self.run(
+            ["renew", "--private-key", "key"], tmp_path, ["a", '{"task_uuid": "b", "hardware_id": 2}'], capsys
+        )
+
+        assert code == 0
+        contract.renew_payments.assert_called_once_with([("a", 7, 3600), ("b", 2, 3600)])
+        self.orchestrator.get_deployment_info.assert_called_once_with("a")
+
+    def test_renew_without_known_hardware_fails_the_item(self, tmp_path, capsys):
+        self.orchestrator.get_deployment_info.return_value = None
+
+        code, records = self.run(["renew", "--private-key", "key"], tmp_path, ["a"], capsys)
+
+        assert code == 1
+        assert records[0]["status"] == "failed"
+        self.orchestrator.contract_factory.get.return_value.renew_payments.assert_not_called()
+
+    def test_status_counts_failed_answers(self, tmp_path, capsys):
+        self.orchestrator.get_deployment_info.side_effect = lambda task_uuid: {"status": "failed", "message": "not found"}
+
+        code, records = self.run(["status"], tmp_path, ["a"], capsys)
+
+        assert code == 1
+        assert records[0]["result"]["message"] == "not found"
+
+    def test_created_tasks_are_printed_when_payment_fails(self, tmp_path, capsys):
+        self.orchestrator.create_task.side_effect = [{"task_uuid": "a"}, {"task_uuid": "b"}]
+        self.orchestrator.contract_factory.get.return_value.submit_payments.side_effect = ValueError("insufficient funds")
+
+        code, records = self.run(
+            ["create", "--wallet", "0xabc", "--private-key", "key"], tmp_path, ['{"hardware_id": 1}', '{"hardware_id": 1}'], capsys
+        )
+
+        assert code == 1
+        assert sorted(record["task_uuid"] for record in records) == ["a", "b"]
+        assert all(record["status"] == "failed" and "insufficient funds" in record["message"] for record in records)
@@ -0,0 +1,74 @@
+""" Test the JSON codec and response models """
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from swan.api_client import APIClient
+from swan.common import codec
+from swan.object import DeploymentInfo, PaymentInfo, TaskCreation
+
+
+class TestCodec:
+
+    def teardown_method(self):
+        codec.set_codec(None)
+
+    @pytest.mark.parametrize("name", ["json", "orjson"])
+    def test_roundtrip_keeps_large_integers(self, name):
+        pytest.importorskip(name)
+        codec.set_codec(name)
+        payload = {"amount": 123456789012345678901234, "uuid": "0f3b1a52", "price": 1.5}
+
+        assert codec.get_codec().name == name
+        assert codec.loads(codec.dumps(payload).encode()) == payload
+        assert codec.loads(codec.dumps(payload)) == payload
+
+    @pytest.mark.parametrize("offset", [0, codec._SCAN_CHUNK - 10, codec._SCAN_CHUNK])
+    def test_long_number_found_across_scan_slices(self, offset):
+        padding = "x" * offset
+        data = f'["{padding}", 123456789012345678901234]'
+
+        assert codec._has_long_number(data) and codec._has_long_number(data.encode())
+        assert not codec._has_long_number(data.replace("1234567890123", ""))
+
+    def test_unknown_codec(self):
+        with pytest.raises(ValueError):
+            codec.set_codec("yaml")
+
+    def test_api_client_decodes_response_bytes(self):
+        http_session = MagicMock()
+        http_session.get.return_value.status_code = 200
+        http_session.get.return_value.content = b'{"status": "success", "data": {"task": {"uuid": "abc"}}}'
+
+        result = APIClient(http_session)._request_without_params("GET", "/v2/task_deployment/abc", "https://orchestrator", None)
+
+        assert result == {"status": "success", "data": {"task": {"uuid": "abc"}}}
+        http_session.get.return_value.json.assert_not_called()
+
+
+class TestResponseModels:
+
+    def test_deployment_info(self):
+        info = DeploymentInfo({
+            "status": "success",
+            "data": {
+                "task": {"uuid": "abc", "status": "running", "end_at": 10},
+                "jobs": [{"job_real_uri": "https://a", "status": "running"}, {"job_real_uri": "", "status": "pending"}],
+            },
+        })
+
+        assert info.ok and info.task.uuid == "abc" and info.task.status == "running"
+        assert [job.status for job in info.jobs] == ["running", "pending"]
+        assert info.jobs[0].real_uri == "https://a"
+        assert info.real_urls == ["https://a"]
+        assert info["data"]["task"]["uuid"] == "abc"
+        assert codec.loads(codec.dumps(info)) == info
+
+    def test_task_creation_and_payments(self):
+        created = TaskCreation({"status": "success", "data": {"task": {"uuid": "abc"}}})
+        payments = PaymentInfo({"status": "success", "data": {"payments": [{"tx_hash": "0x1", "task_uuid": "abc"}]}})
+
+        assert created.task_uuid == "abc"
+        assert [payment.tx_hash for payment in payments.payments] == ["0x1"]
+        assert len(PaymentInfo({"status": "failed"}).payments) == 0
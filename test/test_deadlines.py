@@ -0,0 +1,98 @@
+""" Test deadlines and cancellation of long calls """
+
+import threading
+import time
+
+import pytest
+
+from swan.api.orchestrator import Orchestrator
+from swan.common import deadlines
+from swan.common.deadlines import Deadline
+from swan.common.exception import SwanDeadlineExceeded
+from swan.testing import FakeChain, FakeOrchestrator
+
+SWAN = 10**18
+
+
+class TestDeadline:
+
+    def test_nested_deadline_ends_with_its_parent(self):
+        parent = Deadline(0.2)
+        with deadlines.scope(parent):
+            with deadlines.scope(60) as child:
+                assert child.remaining() <= 0.2
+                parent.cancel()
+                assert child.cancelled
+                with pytest.raises(SwanDeadlineExceeded):
+                    deadlines.check()
+        assert deadlines.current() is None
+
+    def test_cancel_wakes_a_sleep(self):
+        deadline = Deadline()
+        threading.Timer(0.1, deadline.cancel).start()
+
+        started = time.perf_counter()
+        with pytest.raises(SwanDeadlineExceeded) as error:
+            deadline.sleep(5)
+        assert error.value.cancelled
+        assert time.perf_counter() - started < 1
+
+
+class TestCreateTaskDeadline:
+
+    def setup_method(self):
+        self.chain = FakeChain()
+        self.server = FakeOrchestrator(chain=self.chain).start()
+        self.orchestrator = self.chain.attach(
+            Orchestrator(api_key="key", url_endpoint=self.server.url, verification=False)
+        )
+        self.account = self.chain.new_account(100 * SWAN)
+
+    def teardown_method(self):
+        self.server.stop()
+
+    def create_task(self, deadline):
+        return self.orchestrator.create_task(
+            wallet_address=self.account.address,
+            hardware_id=1,
+            region="North Carolina-US",
+            app_repo_image="hello_world",
+            private_key=self.account.key.hex(),
+            deadline=deadline,
+        )
+
+    def test_cancelled_before_validation(self):
+        deadline = Deadline(60)
+        threading.Timer(0.5, deadline.cancel).start()
+
+        started = time.perf_counter()
+        result = self.create_task(deadline)
+
+        assert time.perf_counter() - started < 2
+        assert result["status"] == "incomplete"
+        assert result["cancelled"] and result["phase"] == "validation"
+        assert self.chain.amount_paid[result["task_uuid"]] == SWAN
+        assert result["tx_hash"].startswith("0x")
+
+    def test_unmined_payment_runs_out_of_time(self):
+        self.chain.automine = False
+
+        started = time.perf_counter()
+        result = self.create_task(0.5)
+
+        assert time.perf_counter() - started < 2
+        assert result["status"] == "incomplete" and not result["cancelled"]
+        assert result["phase"] == "payment"
+        assert result.task_uuid in self.server.tasks
+        # the approval was not mined, no payment was sent
+        assert result["tx_hash"] is None
+
+    def test_slow_orchestrator_runs_out_of_time(self):
+        self.server.latency = 1
+
+        started = time.perf_counter()
+        result = self.create_task(0.3)
+
+        assert time.perf_counter() - started < 1
+        assert result["status"] == "incomplete" and result["phase"] == "create"
+        assert result["task_uuid"] is None
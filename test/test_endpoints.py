@@ -0,0 +1,111 @@
+""" Test endpoint selection, failover and hedging """
+
+import time
+
+import pytest
+import requests
+
+from swan.api.orchestrator import Orchestrator
+from swan.common import metrics
+from swan.common.constant import ENDPOINT_FAILURE_THRESHOLD
+from swan.common.endpoints import EndpointPool
+from swan.contract.provider import FailoverHTTPProvider
+from swan.contract.swan_contract import new_web3
+from swan.testing import FakeChain, FakeOrchestrator
+
+DEAD_URL = "http://127.0.0.1:1"
+
+
+class TestEndpointPool:
+
+    def setup_method(self):
+        self.pool = EndpointPool(["a", "b", "c"], hedge_min_delay=0.02)
+
+    def test_fastest_healthy_endpoint_first(self):
+        self.pool.record("a", 0.3)
+        self.pool.record("b", 0.01)
+        self.pool.record("c", 0.1)
+        assert self.pool.best() == "b"
+
+        for _ in range(ENDPOINT_FAILURE_THRESHOLD):
+            self.pool.record("b", ok=False)
+        assert [endpoint.url for endpoint in self.pool.ranked()] == ["c", "a", "b"]
+
+    def test_fails_over_on_errors_and_rejected_results(self):
+        def call(url):
+            if url == "a":
+                raise requests.exceptions.ConnectionError("down")
+            return 503 if url == "b" else 200
+
+        assert self.pool.call(call, is_error=lambda status: status >= 500) == 200
+        assert [endpoint.failures for endpoint in self.pool.endpoints] == [1, 1, 0]
+        # every endpoint rejecting gives the last rejected result
+        assert self.pool.call(lambda url: 503, is_error=lambda status: status >= 500) == 503
+
+    def test_failover_can_be_refused(self):
+        def call(url):
+            raise ValueError(url)
+
+        with pytest.raises(ValueError, match="a"):
+            self.pool.call(call, failover=lambda error: False)
+
+    def test_slow_read_is_hedged(self):
+        for url, seconds in (("a", 0.01), ("b", 0.02), ("c", 0.03)):
+            self.pool.record(url, seconds)
+        metrics.HEDGED_REQUESTS.clear()
+
+        def call(url):
+            time.sleep(1 if url == "a" else 0.01)
+            return url
+
+        started = time.perf_counter()
+        assert self.pool.call(call, hedge=True) == "b"
+        assert time.perf_counter() - started < 0.5
+        assert metrics.HEDGED_REQUESTS.labels("won").value == 1
+
+
+class TestOrchestratorEndpoints:
+
+    def setup_method(self):
+        self.fast = FakeOrchestrator().start()
+        self.slow = FakeOrchestrator(latency=0.5).start()
+        # equivalent regions accept each other's tokens
+        self.slow.tokens = self.fast.tokens
+
+    def teardown_method(self):
+        self.fast.stop()
+        self.slow.stop()
+
+    def test_reads_go_to_the_fast_region(self):
+        orchestrator = Orchestrator(api_key="key", url_endpoint=[self.slow.url, self.fast.url], verification=False)
+
+        started = time.perf_counter()
+        for _ in range(5):
+            assert orchestrator.get_hardware_config()
+        assert time.perf_counter() - started < 1.5
+        assert orchestrator.endpoints.best() == self.fast.url
+
+    def test_dead_region_fails_over(self):
+        orchestrator = Orchestrator(api_key="key", url_endpoint=[DEAD_URL, self.fast.url], verification=False)
+
+        assert orchestrator.token is not None
+        assert orchestrator.get_hardware_config()
+        assert orchestrator.endpoints.ranked()[-1].url == DEAD_URL
+
+
+class TestFailoverHTTPProvider:
+
+    def test_rpc_fails_over_to_a_live_node(self):
+        chain = FakeChain()
+        provider = FailoverHTTPProvider([DEAD_URL, "http://fake-node"])
+        provider._providers["http://fake-node"] = chain
+        w3 = new_web3(DEAD_URL, provider=provider)
+
+        assert w3.eth.block_number == chain.block_number
+        assert provider.endpoint_uri == "http://fake-node"
+
+    def test_new_web3_with_several_urls(self):
+        w3 = new_web3(DEAD_URL, rpc_urls=["http://127.0.0.1:2", DEAD_URL])
+
+        assert isinstance(w3.provider, FailoverHTTPProvider)
+        assert w3.provider.pool.urls == [DEAD_URL, "http://127.0.0.1:2"]
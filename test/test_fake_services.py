@@ -0,0 +1,99 @@
+""" Test the local stand-in orchestrator and chain """
+
+import socket
+import struct
+import time
+from unittest.mock import patch
+
+import pytest
+
+from swan.api.orchestrator import Orchestrator
+from swan.common.constant import GET_CP_CONFIG
+from swan.testing import FakeChain, FakeOrchestrator
+
+
+class TestFakeServices:
+
+    def setup_method(self):
+        self.chain = FakeChain()
+        self.server = FakeOrchestrator(chain=self.chain).start()
+        self.orchestrator = self.chain.attach(
+            Orchestrator(api_key="key", url_endpoint=self.server.url, verification=False)
+        )
+        self.account = self.chain.new_account(100 * 10**18)
+
+    def teardown_method(self):
+        self.server.stop()
+
+    @patch("swan.api.orchestrator.time.sleep")
+    def test_create_pay_validate_renew(self, mock_sleep):
+        result = self.orchestrator.create_task(
+            wallet_address=self.account.address,
+            hardware_id=1,
+            region="North Carolina-US",
+            app_repo_image="hello_world",
+            private_key=self.account.key.hex(),
+        )
+        task_uuid = result["task_uuid"]
+        assert result["status"] == "success"
+        assert self.orchestrator.get_deployment_info(task_uuid)["data"]["task"]["status"] == "running"
+        assert self.chain.amount_paid[task_uuid] == 10**18
+
+        end_at = self.server.tasks[task_uuid]["task"]["end_at"]
+        renewal = self.orchestrator.renew_task(task_uuid, duration=1800, auto_pay=True, private_key=self.account.key.hex())
+
+        assert renewal["status"] == "success"
+        assert self.server.tasks[task_uuid]["task"]["end_at"] == end_at + 1800
+        assert self.chain.balances[self.account.address] == 100 * 10**18 - 15 * 10**17
+
+    def test_unpaid_task_is_not_validated(self):
+        task_uuid = self.orchestrator.create_task(
+            wallet_address=self.account.address, app_repo_image="hello_world"
+        )["task_uuid"]
+
+        assert self.orchestrator.validate_payment(tx_hash="0x" + "00" * 32, task_uuid=task_uuid)["status"] == "failed"
+
+    def test_error_injection(self):
+        task_uuid = self.orchestrator.create_task(
+            wallet_address=self.account.address, app_repo_image="hello_world"
+        )["task_uuid"]
+        self.server.fail("/terminate_task", times=1)
+
+        assert self.orchestrator.terminate_tasks([task_uuid])[task_uuid]["status"] == "failed"
+        assert self.orchestrator.terminate_tasks([task_uuid])[task_uuid]["status"] == "success"
+        assert self.server.requests[("POST", "/terminate_task")] == 2
+
+    def test_abandoned_request_is_not_an_error(self, capsys):
+        self.server.latency = 0.2
+        client = socket.create_connection(self.server._server.server_address[:2])
+        client.sendall(f"GET {GET_CP_CONFIG} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        # a reset instead of a clean close, like a hedged client cancelling the slower request
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        client.close()
+        time.sleep(0.5)
+
+        assert "Traceback" not in capsys.readouterr().err
+
+
+class TestFakeChain:
+
+    def test_pending_transaction_replacement(self):
+        chain = FakeChain(automine=False)
+        chain.set_hardware(0, "C1ae.small", 10**18)
+        account = chain.new_account(10**18)
+        w3 = chain.web3()
+        approve = {"to": chain.token_address, "data": "0x", "nonce": 0, "gas": 100000, "chainId": chain.chain_id, "value": 0}
+        first = account.sign_transaction(dict(approve, maxFeePerGas=2 * 10**9, maxPriorityFeePerGas=10**9))
+        cheaper = account.sign_transaction(dict(approve, maxFeePerGas=2 * 10**9 + 1, maxPriorityFeePerGas=10**9))
+        bumped = account.sign_transaction(dict(approve, maxFeePerGas=3 * 10**9, maxPriorityFeePerGas=2 * 10**9))
+
+        w3.eth.send_raw_transaction(first.rawTransaction)
+        with pytest.raises(ValueError, match="underpriced"):
+            w3.eth.send_raw_transaction(cheaper.rawTransaction)
+        w3.eth.send_raw_transaction(bumped.rawTransaction)
+        chain.mine()
+
+        assert w3.eth.get_transaction_receipt(bumped.hash)["blockNumber"] == 1
+        assert chain.receipts.get(bytes(first.hash)) is None
+        assert w3.eth.get_transaction_count(account.address) == 1
+
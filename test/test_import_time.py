@@ -0,0 +1,40 @@
+""" Guard the import time of the package """
+
+import json
+import subprocess
+import sys
+
+# importing web3 alone takes longer than this, loading it by accident fails the budget
+IMPORT_TIME_BUDGET = 0.5
+CHAIN_MODULES = ("web3", "eth_account")
+
+
+def import_in_subprocess(statement):
+    """Run an import in a fresh interpreter, return its seconds and the loaded modules."""
+    code = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        f"{statement}\n"
+        "print(json.dumps([time.perf_counter() - started, sorted(sys.modules)]))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    seconds, modules = json.loads(output.splitlines()[-1])
+    return seconds, set(modules)
+
+
+class TestImportTime:
+
+    def test_import_swan_loads_nothing(self):
+        _, modules = import_in_subprocess("import swan")
+
+        assert not modules & set(CHAIN_MODULES + ("requests", "swan.session", "swan.api.orchestrator"))
+
+    def test_orchestrator_does_not_load_chain_stack(self):
+        _, modules = import_in_subprocess("from swan import Orchestrator, Session, SwanContract")
+
+        assert not modules & set(CHAIN_MODULES)
+
+    def test_import_time_budget(self):
+        seconds = min(import_in_subprocess("from swan import Orchestrator")[0] for _ in range(3))
+
+        assert seconds < IMPORT_TIME_BUDGET, f"importing Orchestrator took {seconds:.3f}s"
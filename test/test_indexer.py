@@ -0,0 +1,84 @@
+""" Test the payment event indexer """
+
+import pytest
+
+from swan.common.exception import SwanAPIException
+from swan.contract.factory import SwanContractFactory
+from swan.contract.indexer import PaymentIndexer
+from swan.testing import FakeChain
+
+SWAN = 10**18
+
+
+class TestPaymentIndexer:
+
+    def setup_method(self):
+        self.chain = FakeChain()
+        self.chain.set_hardware(1, "C1ae.medium", SWAN)
+        self.factory = SwanContractFactory(self.chain.contract_info, w3=self.chain.web3())
+        self.payer = self.chain.new_account(10 * SWAN)
+        self.contract = self.factory.get(self.payer.key.hex())
+
+    def test_payments_are_indexed_by_task_and_payer(self):
+        submit_hash = self.contract.submit_payment("task-a", 1, 3600)
+        self.contract.submit_payment("task-b", 1, 1800)
+        self.contract.renew_payment("task-a", 1, 1800)
+
+        indexer = PaymentIndexer(self.factory.get(), chunk_blocks=2, confirmations=0)
+        assert indexer.sync() == 3
+
+        payments = indexer.payments(task_uuid="task-a")
+        assert [payment.amount for payment in payments] == [SWAN, SWAN // 2]
+        assert payments[0].tx_hash == submit_hash
+        assert payments[0].payer == self.payer.address
+        assert indexer.amount_paid("task-a") == self.chain.amount_paid["task-a"]
+        assert indexer.tasks_paid_by(self.payer.address.lower()) == ["task-a", "task-b"]
+        assert not indexer.is_paid("task-c")
+
+    def test_sync_follows_the_tip_and_resumes_from_file(self, tmp_path):
+        path = str(tmp_path / "payments.db")
+        self.contract.submit_payment("task-a", 1, 3600)
+        indexer = PaymentIndexer(self.factory.get(), path, confirmations=0)
+        indexer.sync()
+        indexer.close()
+
+        self.contract.submit_payment("task-b", 1, 3600)
+        indexer = PaymentIndexer(self.factory.get(), path, confirmations=0)
+        start = indexer.next_block
+
+        assert indexer.sync() == 1
+        assert indexer.next_block == self.chain.block_number + 1 > start
+        assert indexer.sync() == 0
+        assert [payment.task_uuid for payment in indexer.payments()] == ["task-a", "task-b"]
+
+    def test_confirmations_hold_back_recent_blocks(self):
+        self.contract.submit_payment("task-a", 1, 3600)
+        indexer = PaymentIndexer(self.factory.get(), confirmations=self.chain.block_number)
+
+        indexer.sync()
+
+        assert indexer.payments() == []
+
+    def test_refused_range_is_split(self):
+        self.contract.submit_payment("task-a", 1, 3600)
+        self.contract.submit_payment("task-b", 1, 3600)
+        indexer = PaymentIndexer(self.factory.get(), confirmations=0)
+        get_logs = self.chain.get_logs
+
+        def limited_get_logs(address=None, topics=None, from_block=0, to_block=None):
+            logs = get_logs(address, topics, from_block, to_block)
+            if len(logs) > 1:
+                raise ValueError("query returned more than 1 results")
+            return logs
+        self.chain.get_logs = limited_get_logs
+
+        assert indexer.sync() == 2
+
+    def test_other_contract_index_is_refused(self, tmp_path):
+        path = str(tmp_path / "payments.db")
+        PaymentIndexer(self.factory.get(), path).close()
+        other = FakeChain()
+        other.client_address = "0x" + "11" * 20
+
+        with pytest.raises(SwanAPIException):
+            PaymentIndexer(SwanContractFactory(other.contract_info, w3=other.web3()).get(), path)
@@ -0,0 +1,56 @@
+""" Test metrics registry """
+
+import threading
+from unittest.mock import MagicMock
+
+from swan.api_client import APIClient
+from swan.common import metrics
+
+
+class TestMetrics:
+
+    def setup_method(self):
+        self.registry = metrics.Registry()
+
+    def test_counter_across_threads(self):
+        counter = self.registry.counter("requests_total", "Requests.", ("endpoint",))
+        child = counter.labels("/v2/task")
+
+        threads = [threading.Thread(target=lambda: [child.inc() for _ in range(1000)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.value("/v2/task") == 4000
+        assert self.registry.counter("requests_total") is counter
+
+    def test_histogram_and_prometheus_text(self):
+        histogram = self.registry.histogram("latency_seconds", "Latency.", ("method",), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.labels("GET").observe(value)
+        self.registry.counter("retries_total", "Retries.").inc(2)
+
+        text = self.registry.to_prometheus()
+
+        assert 'latency_seconds_bucket{method="GET",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{method="GET",le="1"} 3' in text
+        assert 'latency_seconds_bucket{method="GET",le="+Inf"} 4' in text
+        assert 'latency_seconds_count{method="GET"} 4' in text
+        assert "# TYPE retries_total counter\nretries_total 2" in text
+        assert 0.1 < histogram.labels("GET").quantile(0.5) <= 1
+
+    def test_endpoint_label_hides_ids(self):
+        assert metrics.endpoint_label("/v2/task_deployment/0f3b1a52-3c1e-4a6b-9d6a-2b1f0c9e8d7a") == "/v2/task_deployment/:id"
+        assert metrics.endpoint_label("/v2/task_payment_validate") == "/v2/task_payment_validate"
+
+    def test_api_client_records_requests(self):
+        http_session = MagicMock()
+        http_session.get.return_value.status_code = 200
+        http_session.get.return_value.json.return_value = {}
+        before = metrics.HTTP_REQUESTS.value("GET", "/v2/metrics_test", "200")
+
+        APIClient(http_session)._request_without_params("GET", "/v2/metrics_test", "https://orchestrator", None)
+
+        assert metrics.HTTP_REQUESTS.value("GET", "/v2/metrics_test", "200") == before + 1
+        assert metrics.HTTP_LATENCY.labels("GET", "/v2/metrics_test").count == 1
@@ -0,0 +1,107 @@
+""" Test Session """
+
+from unittest.mock import patch
+
+from swan.session import Session, SessionPool
+from swan.api.orchestrator import Orchestrator
+from swan.common.constant import ORCHESTRATOR_API_TESTNET
+
+
+CONTRACT_RESPONSE = {
+    'data': {
+        'contract_info': {
+            'contract_detail': {
+                'client_contract_address': '0x9c5397F804f6663326151c81bBD82bb1451059E8',
+                'payment_contract_address': '0xB48c5D1c025655BA79Ac4E10C0F19523dB97c816',
+                'rpc_url': 'https://rpc-atom-internal.swanchain.io',
+                'swan_token_contract_address': '0x91B25A65b295F0405552A4bbB77879ab5e38166c'
+            },
+        }
+    },
+    'status': 'success'
+}
+
+HARDWARE_RESPONSE = {
+    'data': {
+        'hardware': [
+            {
+                "hardware_status": "available",
+                "hardware_price": "10",
+                "region": ["ON"],
+                "hardware_type": "CPU",
+                "hardware_description": None,
+                "hardware_id": 0,
+                "hardware_name": "Test1"
+            }
+        ]
+    }
+}
+
+
+def fake_request(method, request_path, swan_api, token):
+    if request_path == "/contract_info":
+        return CONTRACT_RESPONSE
+    return HARDWARE_RESPONSE
+
+
+class TestSession:
+
+    def setup_method(self):
+        self.session = Session(api_key="key", login=False)
+        self.session.token = "token"
+
+    @patch.object(Orchestrator, "_request_without_params", side_effect=fake_request)
+    def test_resources_share_state(self, mock_request_without_params):
+        first = self.session.resource("orchestrator", verification=False)
+        second = self.session.resource("orchestrator", verification=False)
+
+        # contract info and hardware list are fetched once for the whole session
+        assert mock_request_without_params.call_count == 2
+        assert first.http_session is second.http_session is self.session.http_session
+        assert first.hardware_catalog is second.hardware_catalog
+        assert first.contract_info is second.contract_info
+        assert first.contract_factory is second.contract_factory
+        assert first.token == "token"
+
+    @patch.object(Orchestrator, "_request_without_params", side_effect=fake_request)
+    def test_unverified_contract_info_not_reused_for_verification(self, mock_request_without_params):
+        self.session.resource("orchestrator", verification=False)
+
+        assert self.session.get_contract_info(ORCHESTRATOR_API_TESTNET, verification=True) is None
+        assert self.session.get_contract_info(ORCHESTRATOR_API_TESTNET, verification=False) is not None
+
+
+def fake_login(session):
+    session.token = "token-" + session.api_key
+
+
+class TestSessionPool:
+
+    @patch.object(Session, "api_key_login", autospec=True, side_effect=fake_login)
+    def test_sessions_are_reused_per_tenant(self, mock_login):
+        pool = SessionPool(max_size=2)
+
+        first = pool.get(api_key="a")
+        second = pool.get(api_key="b")
+
+        assert pool.get(api_key="a") is first
+        assert mock_login.call_count == 2
+        assert first.token == "token-a" and second.token == "token-b"
+        assert first.http_session is second.http_session is pool.http_session
+        assert first.get_hardware_catalog("url") is not second.get_hardware_catalog("url")
+        assert pool.get(api_key="a", network="mainnet") is not first
+
+    @patch.object(Session, "api_key_login", autospec=True, side_effect=fake_login)
+    def test_least_recently_used_session_is_evicted(self, mock_login):
+        pool = SessionPool(max_size=2)
+
+        first = pool.get(api_key="a")
+        pool.get(api_key="b")
+        pool.get(api_key="a")
+        pool.get(api_key="c")
+
+        assert len(pool) == 2
+        assert pool.get(api_key="a") is first
+        assert mock_login.call_count == 3
+        pool.get(api_key="b")
+        assert mock_login.call_count == 4
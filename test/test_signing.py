@@ -0,0 +1,109 @@
+""" Test bulk payment signing """
+
+import os
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+from swan.common import metrics
+from swan.common.exception import SwanAPIException
+from swan.contract import signing
+from swan.contract.factory import SwanContractFactory
+from swan.testing import FakeChain
+
+SWAN = 10**18
+
+
+class TestBulkSigning:
+
+    def setup_method(self):
+        self.chain = FakeChain()
+        self.chain.set_hardware(1, "C1ae.medium", SWAN)
+        self.account = self.chain.new_account(100 * SWAN)
+        factory = SwanContractFactory(self.chain.contract_info, w3=self.chain.web3())
+        self.contract = factory.get(self.account.key.hex())
+
+    def test_bulk_batch_is_mined(self):
+        self.contract.bulk_sign_min_batch = 10
+        payments = [(f"task-{index}", 1, 1800) for index in range(40)]
+        metrics.TRANSACTIONS.clear()
+
+        results = self.contract.submit_payments(payments)
+
+        assert all(isinstance(tx_hash, str) for tx_hash in results)
+        assert len(set(results)) == 40
+        assert all(self.chain.amount_paid[task_uuid] == SWAN // 2 for task_uuid, _, _ in payments)
+        # the approval and 40 payments
+        assert metrics.TRANSACTIONS.labels("sent").value == 41
+
+    def test_unsent_payment_does_not_block_later_ones(self):
+        self.contract.bulk_sign_min_batch = 10
+        send = self.chain.send_raw_transaction
+
+        def send_except_t5(raw):
+            tx = self.chain._decode_raw_transaction(raw)
+            if tx["to"] == self.chain.client_address and self.chain._client_abi.decode_call(tx["input"])[1][0] == "t5":
+                raise ValueError("injected persistent failure")
+            return send(raw)
+
+        with patch.object(self.chain, "send_raw_transaction", send_except_t5):
+            results = self.contract.submit_payments([(f"t{index}", 1, 3600) for index in range(20)])
+
+        assert isinstance(results[5], Exception)
+        assert all(isinstance(results[index], str) for index in range(20) if index != 5)
+        assert sorted(self.chain.amount_paid) == sorted(f"t{index}" for index in range(20) if index != 5)
+        assert not self.chain.pending
+
+        # the next batch gets fresh nonces
+        results = self.contract.submit_payments([(f"u{index}", 1, 3600) for index in range(12)])
+        assert all(isinstance(tx_hash, str) for tx_hash in results)
+        assert all(f"u{index}" in self.chain.amount_paid for index in range(12))
+
+    def test_unmined_payments_share_one_timeout(self):
+        self.chain.automine = False
+        function = self.contract.client_contract.functions.submitPayment
+        txs = self.contract.build_payment_transactions(function, [(f"task-{index}", 1, 60) for index in range(5)])
+        results = self.contract.broadcast(signing.sign_transactions(self.account.key, txs))
+
+        started = time.perf_counter()
+        self.contract._wait_payments(results, [started] * len(results), timeout=0.3)
+
+        assert time.perf_counter() - started < 1
+        assert all(isinstance(result, SwanAPIException) for result in results)
+
+    def test_calldata_is_encoded_locally(self):
+        function = self.contract.client_contract.functions.submitPayment
+        payments = [("task-a", 1, 3600), ("task-b", 1, 60)]
+
+        txs = self.contract.build_payment_transactions(function, payments)
+
+        assert [tx["data"] for tx in txs] == [function(*payment)._encode_transaction_data() for payment in payments]
+        assert txs[1]["nonce"] == txs[0]["nonce"] + 1
+
+    def test_process_pool_signs_like_the_caller(self):
+        function = self.contract.client_contract.functions.submitPayment
+        txs = self.contract.build_payment_transactions(function, [(f"task-{index}", 1, 60) for index in range(8)])
+        try:
+            parallel = signing.sign_transactions(self.account.key, txs, processes=2, min_parallel=1)
+        finally:
+            signing.shutdown()
+
+        assert parallel == signing.sign_transactions(self.account.key, txs)
+
+    def test_script_without_main_guard_runs_once(self, tmp_path):
+        script = tmp_path / "pay.py"
+        script.write_text(
+            "from eth_account import Account\n"
+            "from swan.contract import signing\n"
+            "print('script body', flush=True)\n"
+            "account = Account.create()\n"
+            "txs = [{'to': account.address, 'value': 0, 'gas': 21000, 'nonce': n, 'chainId': 1, 'gasPrice': 1} for n in range(8)]\n"
+            "print(len(signing.sign_transactions(account.key, txs, processes=2, min_parallel=1)), flush=True)\n"
+        )
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=root)
+        output = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120, env=env).stdout
+
+        assert output.split() == ["script", "body", "8"]
@@ -0,0 +1,68 @@
+""" Test the transaction supervisor """
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from swan.common.exception import SwanAPIException
+from swan.contract.factory import SwanContractFactory
+from swan.testing import FakeChain
+
+GWEI = 10**9
+LOW_FEES = {"maxFeePerGas": 2 * GWEI, "maxPriorityFeePerGas": GWEI}
+
+
+class TestTransactionSupervisor:
+
+    def setup_method(self):
+        self.chain = FakeChain(automine=False, base_fee=GWEI)
+        self.chain.set_hardware(1, "C1ae.medium", 10**18)
+        self.account = self.chain.new_account(10 * 10**18)
+        self.factory = SwanContractFactory(self.chain.contract_info, w3=self.chain.web3())
+        self.factory.supervise(stuck_blocks=2, poll_interval=0.01, timeout=5)
+        self.contract = self.factory.get(self.account.key.hex())
+        self.stop = threading.Event()
+        self.miner = threading.Thread(target=self.mine, daemon=True)
+        self.miner.start()
+
+    def teardown_method(self):
+        self.stop.set()
+        self.miner.join()
+
+    def mine(self):
+        while not self.stop.wait(0.005):
+            self.chain.mine()
+
+    def test_stuck_payment_is_replaced_and_final_hash_reported(self):
+        # the base fee rose above the fee the payment was signed with
+        self.chain.base_fee = 3 * GWEI
+        with patch.object(self.contract, "_fee_params", return_value=LOW_FEES):
+            tx_hash = self.contract.submit_payment("task", 1, 3600)
+
+        receipt = self.chain.receipts[bytes.fromhex(tx_hash[2:])]
+        assert receipt["status"] == 1
+        assert self.chain.transactions[bytes.fromhex(tx_hash[2:])]["maxFeePerGas"] > 3 * GWEI
+        assert self.chain.amount_paid["task"] == 10**18
+
+    def test_batch_waits_for_all_replacements(self):
+        self.chain.base_fee = 3 * GWEI
+        with patch.object(self.contract, "_fee_params", return_value=LOW_FEES):
+            self.contract._approve_payment(10**19)
+            tx_hashes = self.contract.submit_payments([("a", 1, 3600), ("b", 1, 3600)], approve=False)
+
+        assert all(isinstance(tx_hash, str) for tx_hash in tx_hashes)
+        assert all(self.chain.receipts[bytes.fromhex(tx_hash[2:])]["status"] == 1 for tx_hash in tx_hashes)
+
+    def test_fee_cap_bounds_the_wait(self):
+        self.factory.supervise(stuck_blocks=1, poll_interval=0.01, timeout=0.3, max_fee_per_gas=int(2.5 * GWEI))
+        self.chain.base_fee = 3 * GWEI
+        supervisor = self.contract.supervisor
+
+        pending = supervisor.send(self.contract.token_contract.functions.approve(self.chain.client_address, 1), fees=LOW_FEES)
+        with pytest.raises(SwanAPIException):
+            supervisor.wait(pending)
+
+        # one bump up to the cap, then the supervisor gives up raising the fee
+        assert pending.capped and len(pending.hashes) == 2
+        assert pending.tx["maxFeePerGas"] == int(2.5 * GWEI)
@@ -0,0 +1,69 @@
+""" Test latency tracing """
+
+from unittest.mock import MagicMock
+
+from swan.api_client import APIClient
+from swan.common import tracing
+from swan.common.concurrency import call_with_retries, run_bounded
+
+
+class TestTracing:
+
+    def setup_method(self):
+        self.sink = tracing.add_sink(tracing.RecordingSink())
+
+    def teardown_method(self):
+        tracing.clear_sinks()
+
+    def test_disabled_tracing_is_noop(self):
+        tracing.clear_sinks()
+
+        with tracing.span("phase", endpoint="/x") as span:
+            span.set_tag("status", "ok")
+
+        assert span is tracing.NOOP_SPAN
+        assert self.sink.spans == []
+
+    def test_http_request_span(self):
+        http_session = MagicMock()
+        http_session.get.return_value.status_code = 200
+        http_session.get.return_value.json.return_value = {"status": "success"}
+        client = APIClient(http_session)
+
+        assert client._request_without_params("GET", "/v2/task", "https://orchestrator", None) == {"status": "success"}
+
+        span = self.sink.named("http.request")[0]
+        assert span.tags == {"method": "GET", "endpoint": "/v2/task", "server": "https://orchestrator", "http_status": 200, "status": "ok"}
+        assert span.duration >= 0
+
+    def test_retries_and_nesting(self):
+        calls = []
+
+        def flaky(item):
+            with tracing.span("call", item=item):
+                calls.append(item)
+                if calls.count(item) < 2:
+                    raise ValueError("boom")
+                return item
+
+        with tracing.span("bulk") as parent:
+            results = run_bounded(flaky, ["a", "b"], retries=1, backoff=0)
+
+        assert [result for _, result, _ in results] == ["a", "b"]
+        spans = self.sink.named("call")
+        assert sorted((span.tags["item"], span.tags.get("retries", 0), span.tags["status"]) for span in spans) == [
+            ("a", 0, "error"), ("a", 1, "ok"), ("b", 0, "error"), ("b", 1, "ok"),
+        ]
+        assert all(span.parent is parent for span in spans)
+
+    def test_traced_marks_none_as_failed_and_survives_broken_sink(self):
+        tracing.add_sink(tracing.CallbackSink(MagicMock(side_effect=RuntimeError("sink down"))))
+
+        @tracing.traced("lookup")
+        def lookup(found):
+            return {"ok": True} if found else None
+
+        assert lookup(True) == {"ok": True}
+        assert lookup(False) is None
+        assert [span.tags["status"] for span in self.sink.named("lookup")] == ["ok", "failed"]
+        assert call_with_retries(lambda: 1) == 1
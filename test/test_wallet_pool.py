@@ -0,0 +1,58 @@
+""" Test the wallet pool """
+
+import pytest
+
+from swan.common.exception import SwanAPIException
+from swan.contract.factory import SwanContractFactory
+from swan.contract.wallet_pool import WalletPool
+from swan.testing import FakeChain
+
+SWAN = 10**18
+
+
+class TestWalletPool:
+
+    def setup_method(self):
+        self.chain = FakeChain()
+        self.chain.set_hardware(1, "C1ae.medium", SWAN)
+        self.accounts = [self.chain.new_account(amount) for amount in (10 * SWAN, 10 * SWAN, SWAN // 2)]
+        factory = SwanContractFactory(self.chain.contract_info, w3=self.chain.web3())
+        self.pool = WalletPool(factory, [account.key.hex() for account in self.accounts])
+
+    def test_payments_are_spread_over_funded_wallets(self):
+        payments = [(f"task-{index}", 1, 3600) for index in range(8)]
+
+        results = self.pool.submit_payments(payments)
+
+        assert all(isinstance(tx_hash, str) for tx_hash in results)
+        assert all(self.chain.amount_paid[task_uuid] == SWAN for task_uuid, _, _ in payments)
+        payers = {self.pool.payer(task_uuid) for task_uuid, _, _ in payments}
+        # the third wallet cannot cover one hour
+        assert payers == {self.accounts[0].address, self.accounts[1].address}
+        assert sum(self.pool.balances().values()) == 20 * SWAN + SWAN // 2 - 8 * SWAN
+
+    def test_renewal_prefers_the_paying_wallet(self):
+        self.pool.submit_payment("task", 1, 3600)
+        payer = self.pool.payer("task")
+
+        self.pool.renew_payment("task", 1, 1800)
+
+        assert self.pool.payer("task") == payer
+        assert self.chain.balances[payer] == 10 * SWAN - SWAN - SWAN // 2
+
+    def test_payment_beyond_every_balance(self):
+        results = self.pool.submit_payments([("big", 1, 3600 * 11)])
+
+        assert isinstance(results[0], SwanAPIException)
+        with pytest.raises(SwanAPIException):
+            self.pool.submit_payment("big", 1, 3600 * 11)
+
+    def test_rebalance_evens_out_balances(self):
+        transfers = self.pool.rebalance(min_transfer=1)
+
+        assert sorted((sender, receiver) for sender, receiver, _, _ in transfers) == sorted([
+            (self.accounts[0].address, self.accounts[2].address),
+            (self.accounts[1].address, self.accounts[2].address),
+        ])
+        balances = self.pool.balances().values()
+        assert max(balances) - min(balances) <= 1